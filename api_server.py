@@ -6,6 +6,7 @@ import os
 import sys
 import types
 import logging
+import hashlib
 import contextlib
 
 # ─────────────────────────────────────────────────────────────
@@ -21,10 +22,11 @@ _st.session_state = {}
 _st.secrets = {}
 sys.modules["streamlit"] = _st
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, UploadFile, File, Form, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from typing import List, Optional
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -129,8 +131,8 @@ async def chat(request: ChatRequest):
             yield "죄송합니다. 관련 정보를 찾지 못했습니다.\n질문을 더 구체적으로 입력해 주십시오.\n예: '시마즈 TOC-4200 E01 에러 조치방법'"
             return
         try:
-            from logic_ai import generate_3line_summary_stream
-            for chunk in generate_3line_summary_stream(ai_model, query, results):
+            from logic_ai import stream_answer
+            for chunk in stream_answer(ai_model, query, results):
                 yield chunk
         except Exception as e:
             logger.error(f"[CHAT] 스트리밍 오류: {e}")
@@ -139,6 +141,13 @@ async def chat(request: ChatRequest):
     return StreamingResponse(generate(), media_type="text/plain; charset=utf-8")
 
 
+@app.get("/metrics/llm")
+def llm_metrics():
+    """[V249] Gemini 호출 스케줄러 대기열/처리량/429 현황"""
+    from llm_scheduler import get_scheduler
+    return get_scheduler().metrics()
+
+
 @app.post("/knowledge/add")
 async def add_knowledge(request: KnowledgeRequest):
     """현장 경험 지식을 knowledge_base에 등록"""
@@ -167,42 +176,176 @@ async def add_knowledge(request: KnowledgeRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ─────────────────────────────────────────────────────────────
+# [V254] 매뉴얼 학습 작업 (ingest_pipeline)
+# ─────────────────────────────────────────────────────────────
+def _job_summary(job):
+    """체크포인트(state) 원문은 빼고 진행 상황만 반환"""
+    state = job.get("state") or {}
+    summary = {k: v for k, v in job.items() if k not in ("state", "owner")}
+    summary["total_chunks"] = state.get("total_chunks", len(state.get("chunks", [])))
+    summary["done_chunks"] = state.get("next_chunk", 0)
+    summary["graph_count"] = state.get("graph_count", 0)
+    if "tables" in state: summary["tables"] = state["tables"]  # 재임베딩 작업: 테이블별 갱신/실패 수
+    return summary
+
+
+@app.post("/ingest")
+async def ingest_manual(file: UploadFile = File(...), mode: str = Form("vector"), use_ocr: bool = Form(False)):
+    """PDF 매뉴얼 학습 작업을 생성하고 백그라운드에서 실행"""
+    if not (file.filename or "").lower().endswith(".pdf"):
+        raise HTTPException(status_code=400, detail="PDF 파일만 업로드할 수 있습니다.")
+    try:
+        ai_model, db = _get_clients()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"서버 초기화 오류: {str(e)}")
+
+    from ingest_pipeline import IngestionEngine, IngestError
+    engine = IngestionEngine(ai_model, db)
+    try:
+        job = engine.create_job(file.filename, mode, use_ocr)
+    except IngestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    engine.start_background(job["id"], await file.read())
+    logger.info(f"[INGEST] 작업 #{job['id']} 시작: {file.filename} ({mode})")
+    return {"job_id": job["id"], "status": job["status"]}
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: int):
+    """학습 작업 진행률 조회"""
+    try:
+        _, db = _get_clients()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"서버 초기화 오류: {str(e)}")
+    job = db.get_ingest_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return _job_summary(job)
+
+
+@app.post("/jobs/{job_id}/resume")
+async def resume_job(job_id: int, file: UploadFile = File(None)):
+    """중단/실패한 작업을 마지막 체크포인트부터 재개 (추출 단계라면 PDF 재첨부 필요)"""
+    try:
+        ai_model, db = _get_clients()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"서버 초기화 오류: {str(e)}")
+    job = db.get_ingest_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    if job.get("kind", "manual") == "manual" and job["stage"] == "extract" and file is None:
+        raise HTTPException(status_code=400, detail="텍스트 추출 단계부터 재개하려면 PDF 파일이 필요합니다.")
+
+    if job["status"] == "done":
+        return {"job_id": job_id, "status": "done", "stage": job["stage"]}
+
+    if job.get("kind") == "reembed":
+        from reembed_pipeline import ReembedEngine as engine_cls
+    else:
+        from ingest_pipeline import IngestionEngine as engine_cls
+    file_bytes = await file.read() if file else None
+    # 중복 재개(더블 클릭/재시도/Streamlit 과 동시) 방지: 작업 행을 먼저 선점한 쪽만 엔진 시작
+    engine = engine_cls(ai_model, db)
+    if not engine.claim(job_id):
+        raise HTTPException(status_code=409, detail="이미 다른 곳에서 실행 중인 작업입니다.")
+    engine.start_background(job_id, file_bytes)
+    return {"job_id": job_id, "status": "running", "stage": job["stage"]}
+
+
+@app.post("/reembed")
+def start_reembed(profile: str = None):
+    """[V261] 임베딩이 없거나 모델 버전이 다른 행만 재임베딩하는 백그라운드 작업 시작 ([V262] profile 기본: 검색 프로필)"""
+    try:
+        ai_model, db = _get_clients()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"서버 초기화 오류: {str(e)}")
+
+    from ingest_pipeline import IngestError
+    from reembed_pipeline import ReembedEngine
+    engine = ReembedEngine(ai_model, db)
+    try:
+        job = engine.create_job(profile or db.get_active_embedding_profile())
+    except IngestError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    engine.start_background(job["id"])
+    logger.info(f"[REEMBED] 작업 #{job['id']} 시작 ({job.get('mode')})")
+    return {"job_id": job["id"], "status": job["status"], "embedding_model": job.get("mode")}
+
+
+class EmbeddingSwitchRequest(BaseModel):
+    profile: str
+    force: bool = False
+
+
+@app.get("/embedding/status")
+def embedding_status():
+    """[V262] 검색/섀도 임베딩 프로필, 프로필별 컬럼 채움 비율, 마지막 검증 결과"""
+    try:
+        _, db = _get_clients()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"서버 초기화 오류: {str(e)}")
+    from embedding_migration import profile_status
+    return profile_status(db)
+
+
+@app.post("/embedding/switch")
+def embedding_switch(request: EmbeddingSwitchRequest):
+    """[V262] 검색 프로필 전환 (이전 프로필은 섀도로 유지되어 같은 방식으로 롤백)"""
+    try:
+        _, db = _get_clients()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"서버 초기화 오류: {str(e)}")
+    from embedding_migration import switch_profile
+    ok, msg = switch_profile(db, request.profile, request.force)
+    if not ok:
+        raise HTTPException(status_code=409, detail=msg)
+    logger.info(f"[EMBEDDING] {msg}")
+    return {"status": "ok", "message": msg, "active": request.profile}
+
+
 @app.get("/explore/manufacturers")
-async def get_manufacturers():
-    """knowledge_base에 등록된 제조사 목록"""
+async def get_manufacturers(item: str = None):
+    """knowledge_base에 등록된 제조사 목록 ([V273] facet 표에서 건수와 함께, item 으로 좁히기 가능)"""
     try:
         _, db = _get_clients()
-        res = db.supabase.table("knowledge_base").select("manufacturer").execute()
-        items = sorted(set(r["manufacturer"] for r in res.data if r.get("manufacturer")))
-        return {"items": items}
+        facets = db.facet_counts("manufacturer", item=item)
+        return {"items": [f["name"] for f in facets], "facets": facets}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/explore/measurement-items")
-async def get_measurement_items():
-    """knowledge_base에 등록된 측정항목 목록"""
+async def get_measurement_items(manufacturer: str = None):
+    """knowledge_base에 등록된 측정항목 목록 ([V273] facet 표에서 건수와 함께, manufacturer 로 좁히기 가능)"""
     try:
         _, db = _get_clients()
-        res = db.supabase.table("knowledge_base").select("measurement_item").execute()
-        items = sorted(set(r["measurement_item"] for r in res.data if r.get("measurement_item")))
-        return {"items": items}
+        facets = db.facet_counts("measurement_item", manufacturer=manufacturer)
+        return {"items": [f["name"] for f in facets], "facets": facets}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/explore/facets")
+async def get_facets():
+    """[V273] (제조사, 측정항목) 쌍별 지식 건수 - 앱이 한 번 받아 두 축 필터를 로컬에서 계산"""
+    try:
+        _, db = _get_clients()
+        return {"items": [{"manufacturer": m, "measurement_item": i, "count": n}
+                          for m, i, n in db.get_knowledge_facets() if n > 0]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/explore/issues")
-async def get_issues(manufacturer: str = None, item: str = None):
-    """제조사 또는 측정항목으로 이슈 목록 조회"""
+async def get_issues(manufacturer: str = None, item: str = None, fields: str = None, cursor: int = None, limit: int = 50):
+    """제조사 또는 측정항목으로 이슈 목록 조회 ([V273] id 키셋 페이지 + fields 선택, 다음 페이지는 cursor=next_cursor)"""
     try:
         _, db = _get_clients()
-        query = db.supabase.table("knowledge_base").select("id, issue, manufacturer, model_name, measurement_item")
-        if manufacturer:
-            query = query.eq("manufacturer", manufacturer)
-        if item:
-            query = query.eq("measurement_item", item)
-        res = query.execute()
-        return {"items": res.data}
+        rows, next_cursor = db.list_knowledge_issues(_fields(fields), manufacturer, item, cursor, max(1, min(limit, 200)))
+        return {"items": rows, "next_cursor": next_cursor}
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -222,6 +365,182 @@ async def get_solution(issue_id: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+class StockMovement(BaseModel):
+    item_id: int
+    change_type: str                 # 입고 / 출고 / 설정
+    quantity: int
+    worker_name: str
+    reason: str = ""
+    expected_qty: Optional[int] = None
+    allow_negative: bool = False
+
+
+class StockMovementRequest(BaseModel):
+    movements: List[StockMovement]
+
+
+@app.post("/inventory/movements")
+def inventory_movements(request: StockMovementRequest):
+    """[V267] 입고/출고/수량 설정 여러 건을 한 트랜잭션으로 적용 (하나라도 조건에 걸리면 전체 미반영)"""
+    if not request.movements:
+        raise HTTPException(status_code=400, detail="movements 가 비어있습니다.")
+    if any(m.change_type not in ("입고", "출고", "설정") for m in request.movements):
+        raise HTTPException(status_code=400, detail="change_type 은 입고/출고/설정 중 하나여야 합니다.")
+    try:
+        _, db = _get_clients()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"서버 초기화 오류: {str(e)}")
+
+    movements = [m.dict(exclude_none=True) for m in request.movements]
+    ok, res = db.apply_stock_movements(movements)
+    if not ok:
+        # 조건 위반(재고 부족/동시 수정)은 409, 그 외 DB 오류는 500
+        raise HTTPException(status_code=409 if "index" in res else 500, detail=res)
+    return {"status": "ok", "results": res}
+
+
+def _inventory_etag(db, request: Request):
+    """[V269] 재고 버전 + 질의 파라미터로 만든 약한 ETag (버전 설정 전이면 None)"""
+    version = db.get_inventory_version()
+    if version is None: return None
+    params = hashlib.md5(str(sorted(request.query_params.multi_items())).encode()).hexdigest()[:12]
+    return f'W/"inv-{version}-{params}"'
+
+
+def _list_page(db, request: Request, response: Response, fetch):
+    """If-None-Match 가 현재 ETag 와 같으면 목록을 읽지 않고 304"""
+    etag = _inventory_etag(db, request)
+    if etag and etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
+    try:
+        rows, next_cursor = fetch()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if etag: response.headers["ETag"] = etag
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+def _fields(fields: str):
+    return [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+
+@app.get("/inventory/items")
+def list_inventory_items(request: Request, response: Response, fields: str = None, category: str = None,
+                         location: str = None, low_stock: int = None, cursor: int = None, limit: int = 100):
+    """
+    [V269] 품목 목록 (id 키셋 페이지)
+    - fields: 쉼표 구분 (예: id,item_name,current_qty), low_stock: 현재 수량 ≤ 값
+    - 다음 페이지: cursor=<next_cursor>, 변경 없으면 If-None-Match 로 304
+    """
+    try:
+        _, db = _get_clients()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"서버 초기화 오류: {str(e)}")
+    limit = max(1, min(limit, 500))
+    return _list_page(db, request, response, lambda: db.list_inventory_items(
+        _fields(fields), category, location, low_stock, cursor, limit))
+
+
+@app.get("/inventory/logs")
+def list_inventory_logs(request: Request, response: Response, fields: str = None, item_id: int = None,
+                        change_type: str = None, since: str = None, cursor: int = None, limit: int = 100):
+    """[V269] 입/출고 이력 (최신순 id 키셋 페이지, since: ISO 시각 이후만, fields 에 item_name 가능)"""
+    try:
+        _, db = _get_clients()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"서버 초기화 오류: {str(e)}")
+    limit = max(1, min(limit, 500))
+    return _list_page(db, request, response, lambda: db.list_inventory_logs(
+        _fields(fields), item_id, change_type, since, cursor, limit))
+
+
+@app.get("/knowledge/promotions")
+def knowledge_promotions_status():
+    """[V271] 답변 → 지식 승격 대기열 상태별 건수 + 대기/실패 최근 행"""
+    try:
+        _, db = _get_clients()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"서버 초기화 오류: {str(e)}")
+    try:
+        return db.get_promotion_status()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/knowledge/promotions/run")
+def knowledge_promotions_run(retry_failed: bool = False):
+    """[V271] 승격 워커를 백그라운드로 실행 (retry_failed: failed 행을 먼저 재시도 대상으로)"""
+    try:
+        _, db = _get_clients()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"서버 초기화 오류: {str(e)}")
+    from knowledge_promotion import kick
+    retried = db.retry_knowledge_promotions() if retry_failed else 0
+    kick(db)
+    return {"status": "running", "retried": retried}
+
+
+@app.get("/community/feed")
+def community_feed(cursor: int = None, limit: int = 20, manufacturer: str = None, comments: int = 3):
+    """
+    [V270] 커뮤니티 글 목록 (최신순 id 키셋)
+    - 글마다 comment_count 와 앞쪽 댓글 comments(최대 comments 개)를 한 번의 조회로 포함
+    - 나머지 댓글은 GET /community/posts/{post_id}/comments 로 펼칠 때 조회
+    """
+    try:
+        _, db = _get_clients()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"서버 초기화 오류: {str(e)}")
+    try:
+        posts, next_cursor = db.get_community_feed(max(1, min(limit, 100)), cursor, manufacturer, max(0, min(comments, 20)))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"items": posts, "next_cursor": next_cursor}
+
+
+@app.get("/community/similar")
+def community_similar(q: str, threshold: float = 0.75, count: int = 5):
+    """[V272] 작성 중인 질문과 비슷한 기존 질문(posts) / 해결 지식(knowledge)"""
+    if len(q.strip()) < 5:
+        return {"posts": [], "knowledge": []}
+    try:
+        _, db = _get_clients()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"서버 초기화 오류: {str(e)}")
+    return db.find_similar_questions(q.strip(), threshold, max(1, min(count, 20)))
+
+
+@app.get("/community/posts/{post_id}/comments")
+def community_comments(post_id: int):
+    """[V270] 글 하나의 전체 댓글 (작성순)"""
+    try:
+        _, db = _get_clients()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"서버 초기화 오류: {str(e)}")
+    return {"items": db.get_comments_for_posts([post_id]).get(post_id, [])}
+
+
+@app.get("/inventory/forecast")
+def inventory_forecast_api(lead_time_days: int = None, alerts_only: bool = False):
+    """[V268] 품목별 일평균 소모량 · 남은 일수 · 재주문점 (alerts_only: 품절/재주문 필요만)"""
+    try:
+        _, db = _get_clients()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"서버 초기화 오류: {str(e)}")
+    from inventory_analytics import inventory_forecast, STATUS_OUT, STATUS_REORDER
+    try:
+        df = inventory_forecast(db, lead_time_days)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if alerts_only and not df.empty:
+        df = df[df["status"].isin([STATUS_OUT, STATUS_REORDER])]
+    # NaN(사용 이력 없음) 은 JSON 에서 null
+    items = df.astype(object).where(df.notna(), None).to_dict("records")
+    return {"count": len(items), "items": items}
+
+
 @app.post("/chat/inventory")
 async def chat_inventory(request: ChatRequest):
     """소모품 재고 검색"""
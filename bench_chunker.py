@@ -0,0 +1,87 @@
+"""
+bench_chunker.py — 청크 분할 처리량 벤치마크 (V259)
+semantic_split_v143(전체 문서 문자열 기반) 과 iter_semantic_chunks(페이지 스트리밍) 를
+합성 매뉴얼 코퍼스(기본 1,000페이지)에서 비교합니다. LLM/DB 호출은 없습니다.
+
+사용법:
+    python bench_chunker.py --pages 1000 --repeat 3
+    python bench_chunker.py --pdf manual.pdf      # 실제 PDF 페이지로 측정
+"""
+import time
+import random
+import argparse
+import statistics
+
+from logic_ai import semantic_split_v143, iter_semantic_chunks, estimate_tokens
+
+_KO_SENTENCES = [
+    "측정기 전원을 끄고 시료 라인의 밸브를 잠근다.",
+    "펌프 튜브는 3개월마다 교체하는 것을 권장합니다.",
+    "교정 용액의 농도가 1.5 mg/L 이하이면 재교정이 필요하다.",
+    "알람이 발생하면 먼저 유량계 표시값을 확인하세요.",
+    "필터가 막히면 측정값이 낮게 표시됨.",
+]
+_EN_SENTENCES = [
+    "Turn off the analyzer before opening the front cover.",
+    "Replace the reagent bottle when the level indicator is red.",
+    "The sensor drift must stay below 2% per week.",
+]
+_LIST_LINES = ["1) 전원 차단", "2) 커버 분리", "- 시약 잔량 확인", "• O-ring 점검"]
+_TABLE_LINES = ["항목    주기    비고", "펌프 튜브    3개월    소모품", "TOC    1년    교정"]
+
+
+def synthetic_pages(n_pages, seed=7):
+    """문단(줄바꿈으로 끊긴 문장), 공백 없는 한글 종결, 목록, 표가 섞인 페이지"""
+    rng = random.Random(seed)
+    pages = []
+    for _ in range(n_pages):
+        lines = []
+        for _ in range(rng.randint(4, 8)):
+            para = "".join(rng.choice(_KO_SENTENCES + _EN_SENTENCES) for _ in range(rng.randint(3, 8)))
+            # PDF 추출처럼 문단 중간에서 줄바꿈
+            cut = rng.randint(10, max(11, len(para) - 10))
+            lines += [para[:cut], para[cut:], ""]
+            if rng.random() < 0.4: lines += rng.sample(_LIST_LINES, 3) + [""]
+            if rng.random() < 0.2: lines += _TABLE_LINES + [""]
+        pages.append("\n".join(lines))
+    return pages
+
+
+def pdf_pages(path):
+    from pdf_extract import extract_pdf_pages
+    return extract_pdf_pages(path)
+
+
+def bench(name, fn, repeat):
+    times, chunks = [], []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        chunks = fn()
+        times.append(time.perf_counter() - t0)
+    return name, statistics.median(times), chunks
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="청크 분할 처리량 벤치마크")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--pdf", default=None, help="합성 코퍼스 대신 사용할 PDF")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    pages = pdf_pages(args.pdf) if args.pdf else synthetic_pages(args.pages)
+    total_chars = sum(len(p) for p in pages)
+    print(f"코퍼스: {len(pages)}페이지, {total_chars:,}자\n")
+
+    runs = [
+        bench("semantic_split_v143", lambda: semantic_split_v143("\n".join(p for p in pages if p)), args.repeat),
+        bench("iter_semantic_chunks", lambda: [c["text"] for c in iter_semantic_chunks(pages)], args.repeat),
+    ]
+    print(f"{'chunker':>22} | {'p50 sec':>8} | {'pages/s':>8} | {'MB/s':>6} | {'chunks':>6} | {'avg tok':>7} | {'max tok':>7}")
+    for name, sec, chunks in runs:
+        tokens = [estimate_tokens(c) for c in chunks] or [0]
+        print(f"{name:>22} | {sec:>8.3f} | {len(pages) / sec:>8.0f} | {total_chars / sec / 1e6:>6.1f} | "
+              f"{len(chunks):>6} | {statistics.mean(tokens):>7.0f} | {max(tokens):>7}")
+
+
+if __name__ == "__main__":
+    main()
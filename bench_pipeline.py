@@ -0,0 +1,129 @@
+"""
+bench_pipeline.py — 검색 파이프라인 모드 비교 벤치마크 (V251)
+classic(3회 호출) 대비 intent_rerank / rerank_summary 모드의
+종단 지연시간, 첫 토큰 시간, LLM 호출/토큰 사용량, 순위 일치도를 측정합니다.
+
+사용법:
+    GEMINI_API_KEY=... SUPABASE_URL=... SUPABASE_KEY=... \
+    python bench_pipeline.py queries.txt --modes classic,intent_rerank,rerank_summary --repeat 2
+
+queries.txt 는 한 줄에 질문 하나입니다. 결과 표는 stdout, 원본 측정값은 --json 경로에 저장됩니다.
+"""
+import sys
+import json
+import time
+import argparse
+import statistics
+
+# api_server 가 Streamlit 스텁과 클라이언트 초기화를 담당 (캐시 없이 실제 호출 측정)
+from api_server import _get_clients
+from llm_scheduler import get_scheduler
+from logic_ai import PIPELINE_MODES, stream_answer
+from utils_search import perform_unified_search
+
+
+def _scheduler_totals():
+    classes = get_scheduler().metrics()["classes"].values()
+    return sum(c["granted"] for c in classes), sum(c["llm_tokens"] for c in classes)
+
+
+def run_once(ai_model, db, query, mode, threshold):
+    calls0, tokens0 = _scheduler_totals()
+    t0 = time.perf_counter()
+    results, _, _ = perform_unified_search(ai_model, db, query, threshold, mode=mode)
+    t_search = time.perf_counter() - t0
+
+    ttft, answer = None, ""
+    for chunk in stream_answer(ai_model, query, results, mode=mode):
+        if ttft is None: ttft = time.perf_counter() - t0
+        answer += chunk
+    total = time.perf_counter() - t0
+    calls1, tokens1 = _scheduler_totals()
+
+    return {
+        "query": query,
+        "mode": mode,
+        "search_sec": round(t_search, 3),
+        "ttft_sec": round(ttft or total, 3),
+        "total_sec": round(total, 3),
+        # 임베딩 호출 1회 포함
+        "llm_calls": calls1 - calls0,
+        "tokens": tokens1 - tokens0,
+        "ranking": [f"{d.get('source_table')}_{d.get('id')}" for d in results[:5]],
+        "answer_chars": len(answer),
+    }
+
+
+def kendall_tau(a, b):
+    """두 순위 목록의 공통 항목에 대한 Kendall tau (-1 ~ 1)"""
+    common = [x for x in a if x in b]
+    if len(common) < 2: return None
+    pos_b = {x: i for i, x in enumerate(b)}
+    concordant = discordant = 0
+    for i in range(len(common)):
+        for j in range(i + 1, len(common)):
+            if pos_b[common[i]] < pos_b[common[j]]: concordant += 1
+            else: discordant += 1
+    return (concordant - discordant) / (concordant + discordant)
+
+
+def summarize(rows, baseline="classic"):
+    base_rank = {r["query"]: r["ranking"] for r in rows if r["mode"] == baseline}
+    report = {}
+    for mode in dict.fromkeys(r["mode"] for r in rows):
+        m_rows = [r for r in rows if r["mode"] == mode]
+        overlaps, taus = [], []
+        for r in m_rows:
+            ref = base_rank.get(r["query"])
+            if ref is None: continue
+            overlaps.append(len(set(ref) & set(r["ranking"])) / max(len(ref), 1))
+            tau = kendall_tau(ref, r["ranking"])
+            if tau is not None: taus.append(tau)
+        report[mode] = {
+            "runs": len(m_rows),
+            "p50_total_sec": round(statistics.median(r["total_sec"] for r in m_rows), 3),
+            "p50_ttft_sec": round(statistics.median(r["ttft_sec"] for r in m_rows), 3),
+            "avg_llm_calls": round(statistics.mean(r["llm_calls"] for r in m_rows), 2),
+            "avg_tokens": round(statistics.mean(r["tokens"] for r in m_rows), 1),
+            "top5_overlap": round(statistics.mean(overlaps), 3) if overlaps else None,
+            "kendall_tau": round(statistics.mean(taus), 3) if taus else None,
+        }
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="검색 파이프라인 모드 벤치마크")
+    parser.add_argument("queries", help="질문 목록 파일 (한 줄에 하나)")
+    parser.add_argument("--modes", default=",".join(PIPELINE_MODES))
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--json", default=None, help="원본 측정값 저장 경로")
+    args = parser.parse_args(argv)
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip() in PIPELINE_MODES]
+    with open(args.queries, encoding="utf-8") as f:
+        queries = [q.strip() for q in f if q.strip()]
+
+    ai_model, db = _get_clients()
+    rows = []
+    for _ in range(args.repeat):
+        for q in queries:
+            # 질문마다 모든 모드를 번갈아 실행 (시간대별 API 지연 편차를 모드 간에 고르게 분산)
+            for mode in modes:
+                row = run_once(ai_model, db, q, mode, args.threshold)
+                rows.append(row)
+                print(f"[{mode:>15}] {row['total_sec']:6.2f}s  calls={row['llm_calls']}  {q[:40]}", file=sys.stderr)
+
+    report = summarize(rows)
+    print(f"{'mode':>15} | {'p50 total':>9} | {'p50 ttft':>8} | {'calls':>5} | {'tokens':>8} | {'top5':>5} | {'tau':>5}")
+    for mode, r in report.items():
+        print(f"{mode:>15} | {r['p50_total_sec']:>9} | {r['p50_ttft_sec']:>8} | {r['avg_llm_calls']:>5} | "
+              f"{r['avg_tokens']:>8} | {str(r['top5_overlap']):>5} | {str(r['kendall_tau']):>5}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"rows": rows, "summary": report}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
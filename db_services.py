@@ -1,8 +1,80 @@
+import os
+import re
+import time
+import unicodedata
 from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from inventory_index import InventoryIndex, STOP_WORDS
+from inventory_import import build_import_plan, REPORT_COLUMNS, STATUS_NEW, STATUS_UPDATE, STATUS_FAIL
+
+BULK_WRITE_BATCH = int(os.environ.get("BULK_WRITE_BATCH", 500))
+
+_ENTITY_KEY_STRIP_RE = re.compile(r'[\s\-_·.,:;/\\()\[\]{}"\'`]+')
+
+
+def normalize_entity_key(name):
+    """[V264] 그래프 노드 비교 키: 전각/반각·대소문자·공백·구두점 차이를 무시 ("TOC-Analyzer" == "toc analyzer")"""
+    text = unicodedata.normalize("NFKC", str(name or "")).lower()
+    return _ENTITY_KEY_STRIP_RE.sub("", text)
+
+
+class BulkWriter:
+    """
+    [V260] 행을 모아 batch_size 개씩 한 번에 insert 하는 버퍼
+    - add() 는 버퍼가 차면 자동 flush, 마지막에 flush() (with 문 종료 시 자동)
+    - flush 결과 행(id 포함)은 넣은 순서대로 inserted 에 쌓이므로 호출측에서 순서로 연결 가능
+    - 실패는 호출측으로 예외를 올림 (체크포인트 작업이 실패를 기록하도록)
+    - keep_rows=False 면 삽입 행을 보관하지 않고 건수(count)만 셈 (긴 스트리밍 저장용)
+    """
+    def __init__(self, supabase_client, table, batch_size=None, on_flush=None, keep_rows=True):
+        self.supabase = supabase_client
+        self.table = table
+        self.batch_size = max(1, batch_size or BULK_WRITE_BATCH)
+        self.on_flush = on_flush
+        self.keep_rows = keep_rows
+        self.buffer = []
+        self.inserted = []
+        self.count = 0
+        self.requests = 0
+
+    def add(self, row):
+        self.buffer.append(row)
+        if len(self.buffer) >= self.batch_size: self.flush()
+
+    def extend(self, rows):
+        for row in rows: self.add(row)
+
+    def flush(self):
+        if not self.buffer: return []
+        batch, self.buffer = self.buffer, []
+        res = self.supabase.table(self.table).insert(batch).execute()
+        self.requests += 1
+        rows = res.data or []
+        self.count += len(rows)
+        if self.keep_rows: self.inserted.extend(rows)
+        if self.on_flush: self.on_flush(rows)
+        return rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None: self.flush()
+        return False
+
 
 class DBManager:
+    CONFIG_TTL_SEC = 30
+    INVENTORY_VERSION_TTL_SEC = 5   # 검색 인덱스용 버전 확인 주기 (입력마다 Supabase 왕복 방지)
+    INVENTORY_INDEX_TTL_SEC = 300
+
     def __init__(self, supabase_client):
         self.supabase = supabase_client
+        self._config_cache = {}
+        self._alias_cache = None
+        self._inventory_index = None
+        self._facets_cache = None
 
     # =========================================================
     # [Helper] Data Normalization
@@ -24,6 +96,58 @@ class DBManager:
             return "미지정"
         return str(text).strip()
 
+    def bulk_writer(self, table, batch_size=None, on_flush=None, keep_rows=True):
+        return BulkWriter(self.supabase, table, batch_size, on_flush, keep_rows)
+
+    def bulk_insert(self, table, rows, batch_size=None):
+        """rows 를 batch_size 개씩 insert 하고 삽입된 행(id 포함)을 순서대로 반환"""
+        with self.bulk_writer(table, batch_size) as writer:
+            writer.extend(rows)
+        return writer.inserted
+
+    # =========================================================
+    # [V262] ⚙️ 앱 설정 (app_config) - 여러 서버 프로세스가 같은 값을 보도록 DB 에 보관
+    # =========================================================
+    def get_config(self, key, default=None, max_age=None):
+        cached = self._config_cache.get(key)
+        if cached and time.monotonic() - cached[0] < (self.CONFIG_TTL_SEC if max_age is None else max_age):
+            return cached[1]
+        try:
+            res = self.supabase.table("app_config").select("value").eq("key", key).execute()
+            value = res.data[0]["value"] if res.data else default
+        except Exception:
+            # 테이블이 없거나 일시 오류면 마지막 값 (없으면 기본값)
+            value = cached[1] if cached else default
+        self._config_cache[key] = (time.monotonic(), value)
+        return value
+
+    def set_config(self, key, value):
+        return self.set_configs({key: value})
+
+    def set_configs(self, values):
+        """여러 키를 upsert 한 문장으로 저장 (전부 반영되거나 전부 실패)"""
+        try:
+            now = datetime.now(timezone.utc).isoformat()
+            self.supabase.table("app_config").upsert([
+                {"key": key, "value": value, "updated_at": now} for key, value in values.items()
+            ]).execute()
+            for key, value in values.items(): self._config_cache[key] = (time.monotonic(), value)
+            return True
+        except Exception as e:
+            print(f"Config Save Error: {e}")
+            return False
+
+    def get_active_embedding_profile(self):
+        """검색에 쓰는 임베딩 프로필 이름 (설정 한 줄이라 전환은 원자적, 프로세스별 최대 CONFIG_TTL_SEC 지연)"""
+        return self.get_config("embedding_profile", "v1")
+
+    def get_write_embedding_profiles(self):
+        """새 행을 쓸 때 벡터를 만들 프로필 (활성 + 마이그레이션 중인 섀도 프로필)"""
+        profiles = [self.get_active_embedding_profile()]
+        shadow = self.get_config("embedding_shadow_profile")
+        if shadow and shadow not in profiles: profiles.append(shadow)
+        return profiles
+
     def keep_alive(self):
         try: self.supabase.table("knowledge_base").select("id").limit(1).execute()
         except: pass
@@ -150,12 +274,50 @@ class DBManager:
         except: return []
 
     def get_community_posts(self):
-        try: return self.supabase.table("community_posts").select("*").order("created_at", desc=True).execute().data
+        try: return self.supabase.table("community_posts").select(self.FEED_POST_COLUMNS).order("created_at", desc=True).execute().data
         except: return []
 
+    def find_similar_questions(self, text, threshold=0.75, count=5):
+        """
+        [V272] 작성 중인 질문과 비슷한 기존 질문 / 해결 지식 (검색과 같은 활성 임베딩 프로필 + match_* RPC)
+        반환: {"posts": [...], "knowledge": [...]} (similarity 내림차순)
+        """
+        from logic_ai import get_embedding, embedding_profile
+        prof = embedding_profile(self.get_active_embedding_profile())
+        vec = get_embedding(text, prof["name"])
+        if not vec: return {"posts": [], "knowledge": []}
+        params = {"query_embedding": vec, "match_threshold": threshold, "match_count": count}
+        out = {}
+        for key, rpc in (("posts", "match_community_posts"), ("knowledge", "match_knowledge")):
+            try: out[key] = self.supabase.rpc(f"{rpc}{prof['rpc_suffix']}", params).execute().data or []
+            except Exception as e:
+                print(f"Similar Question Search Error ({rpc}): {e}")
+                out[key] = []
+        return out
+
+    def _post_vectors(self, title, content, clear_failed=False):
+        """
+        [V272] 질문 제목 + 내용 벡터 (쓰기 프로필별 컬럼) - 유사 질문 검색이 나중에 LLM 을 다시 부르지 않도록 저장 시 함께 기록
+        임베딩 실패 시 해당 프로필은 빠짐 → 글은 그대로 저장되고 재임베딩 작업이 나중에 채움
+        clear_failed: 수정 시 실패한 프로필의 벡터/모델 태그를 None 으로 (옛 글 벡터가 현재 모델 태그로 남아 재임베딩에서 빠지는 것 방지)
+        """
+        from logic_ai import get_embedding, embedding_profile
+        vectors = {}
+        for name in self.get_write_embedding_profiles():
+            prof = embedding_profile(name)
+            vec = get_embedding(f"{title}\n{content}", prof["name"])
+            if vec:
+                vectors[prof["column"]] = vec
+                vectors[prof["model_column"]] = prof["version"]
+            elif clear_failed:
+                vectors[prof["column"]] = None
+                vectors[prof["model_column"]] = None
+        return vectors
+
     def add_community_post(self, author, title, content, mfr, model, item):
         try:
             payload = {"author": author, "title": title, "content": content, "manufacturer": self._clean_text(mfr), "model_name": self._clean_text(model), "measurement_item": self._normalize_tags(item)}
+            payload.update(self._post_vectors(title, content))
             res = self.supabase.table("community_posts").insert(payload).execute()
             return True if res.data else False
         except: return False
@@ -163,6 +325,7 @@ class DBManager:
     def update_community_post(self, post_id, title, content, mfr, model, item):
         try:
             payload = {"title": title, "content": content, "manufacturer": self._clean_text(mfr), "model_name": self._clean_text(model), "measurement_item": self._normalize_tags(item)}
+            payload.update(self._post_vectors(title, content, clear_failed=True))
             res = self.supabase.table("community_posts").update(payload).eq("id", post_id).execute()
             return True if res.data else False
         except: return False
@@ -177,34 +340,217 @@ class DBManager:
         try: return self.supabase.table("community_comments").select("*").eq("post_id", post_id).order("created_at").execute().data
         except: return []
 
-    def add_comment(self, post_id, author, content):
+    # [V270] 피드: 보이는 페이지만, 댓글 수는 임베드 집계로 같은 요청에서
+    FEED_POST_COLUMNS = "id, author, title, content, manufacturer, model_name, measurement_item, created_at"
+    FEED_COMMENT_COLUMNS = "id, post_id, author, content, created_at"
+
+    def get_community_feed(self, limit=20, before_id=None, manufacturer=None, comments_per_post=0):
+        """
+        게시글 한 페이지 (최신순 id 키셋) → (posts, 다음 커서)
+        - 각 글에 comment_count, comments_per_post > 0 이면 앞쪽 댓글 comments 도 같은 요청에 임베드
+        """
+        select = f"{self.FEED_POST_COLUMNS}, community_comments(count)"
+        if comments_per_post:
+            select += f", comments:community_comments({self.FEED_COMMENT_COLUMNS})"
+        query = self.supabase.table("community_posts").select(select).order("id", desc=True).limit(limit + 1)
+        if comments_per_post:
+            query = query.order("created_at", foreign_table="comments").limit(comments_per_post, foreign_table="comments")
+        if manufacturer: query = query.eq("manufacturer", manufacturer)
+        if before_id is not None: query = query.lt("id", before_id)
+        rows = query.execute().data or []
+        for row in rows:
+            counts = row.pop("community_comments", None) or [{}]
+            row["comment_count"] = counts[0].get("count", 0)
+        return rows[:limit], (rows[limit - 1]['id'] if len(rows) > limit else None)
+
+    def get_comments_for_posts(self, post_ids):
+        """여러 글의 댓글을 요청 1회로 → {post_id: [댓글]} (작성순)"""
+        grouped = {pid: [] for pid in post_ids}
+        if not post_ids: return grouped
+        try:
+            res = self.supabase.table("community_comments").select(self.FEED_COMMENT_COLUMNS) \
+                .in_("post_id", list(post_ids)).order("created_at").execute()
+            for c in res.data or []: grouped.setdefault(c['post_id'], []).append(c)
+        except Exception as e:
+            print(f"Comment Load Error: {e}")
+        return grouped
+
+    def add_comment(self, post_id, author, content, promote=False):
+        """promote=True: 지식 승격 대기열에 등록 ([V271] 트리거도 넣지만 트리거 설치 전에도 누락 없게)"""
         try:
             res = self.supabase.table("community_comments").insert({"post_id": post_id, "author": author, "content": content}).execute()
+            if res.data and promote: self.enqueue_knowledge_promotion(post_id, res.data[0]['id'])
             return True if res.data else False
         except: return False
 
+    # =========================================================
+    # [V271] 📮 답변 → 지식 승격 대기열 (knowledge_promotion 워커가 처리)
+    # =========================================================
+    PROMOTION_BACKOFF_SEC = 30
+    PROMOTION_BACKOFF_MAX_SEC = 3600
+    PROMOTION_MAX_ATTEMPTS = 6
+
+    def enqueue_knowledge_promotion(self, post_id, comment_id):
+        try:
+            self.supabase.table("knowledge_promotions").upsert(
+                {"idem_key": f"{post_id}:{comment_id}", "post_id": post_id, "comment_id": comment_id},
+                on_conflict="idem_key", ignore_duplicates=True).execute()
+            return True
+        except Exception as e:
+            print(f"Promotion Enqueue Error: {e}")
+            return False
+
+    def claim_knowledge_promotions(self, limit, lease_sec=300):
+        """처리할 대기열 행을 running 으로 가져옴 (RPC 는 skip locked 로 워커 간 중복 없음)"""
+        try:
+            return self.supabase.rpc("claim_knowledge_promotions", {"p_limit": limit, "p_lease_sec": lease_sec}).execute().data or []
+        except Exception as e:
+            print(f"claim_knowledge_promotions RPC 실패, 단순 조회로 대체: {e}")
+        now = datetime.now(timezone.utc)
+        rows = self.supabase.table("knowledge_promotions").select("*").eq("status", "pending") \
+            .lte("next_attempt_at", now.isoformat()).order("id").limit(limit).execute().data or []
+        if rows:
+            self.supabase.table("knowledge_promotions").update({
+                "status": "running", "lease_until": (now + timedelta(seconds=lease_sec)).isoformat(), "updated_at": now.isoformat()
+            }).in_("id", [r['id'] for r in rows]).execute()
+        return rows
+
+    def get_promotion_sources(self, rows):
+        """대기열 행의 원글/답변을 요청 2회로 → ({post_id: 글}, {comment_id: 답변})"""
+        post_ids = sorted({r['post_id'] for r in rows})
+        comment_ids = sorted({r['comment_id'] for r in rows})
+        if not rows: return {}, {}
+        posts = self.supabase.table("community_posts").select("id, title, manufacturer, model_name, measurement_item") \
+            .in_("id", post_ids).execute().data or []
+        comments = self.supabase.table("community_comments").select("id, author, content") \
+            .in_("id", comment_ids).execute().data or []
+        return {p['id']: p for p in posts}, {c['id']: c for c in comments}
+
+    def knowledge_payload(self, issue, solution, mfr, model, item, author="익명"):
+        """knowledge_base 행 (벡터 제외) - promote_to_knowledge 와 승격 워커 공용"""
+        return {
+            "domain": "기술지식", "issue": issue, "solution": solution,
+            "semantic_version": 1, "is_verified": True, 
+            "manufacturer": self._clean_text(mfr), "model_name": self._clean_text(model), "measurement_item": self._normalize_tags(item),
+            "registered_by": author 
+        }
+
+    def upsert_promoted_knowledge(self, rows):
+        """promotion_key 기준 upsert (재시도로 같은 답변이 두 번 들어가지 않음) → {promotion_key: knowledge id}"""
+        if not rows: return {}
+        res = self.supabase.table("knowledge_base").upsert(rows, on_conflict="promotion_key").execute()
+        self._facets_cache = None
+        return {r['promotion_key']: r['id'] for r in res.data or []}
+
+    def finish_knowledge_promotions(self, done):
+        """done: {대기열 id: knowledge id}"""
+        now = datetime.now(timezone.utc).isoformat()
+        for qid, kid in done.items():
+            self.supabase.table("knowledge_promotions").update({
+                "status": "done", "knowledge_id": kid, "last_error": None, "lease_until": None, "updated_at": now
+            }).eq("id", qid).execute()
+
+    def fail_knowledge_promotion(self, row, error, permanent=False):
+        """재시도 대기 (지수 백오프), 최대 시도 초과 또는 permanent 이면 failed"""
+        attempts = (row.get('attempts') or 0) + 1
+        now = datetime.now(timezone.utc)
+        delay = min(self.PROMOTION_BACKOFF_SEC * 2 ** (attempts - 1), self.PROMOTION_BACKOFF_MAX_SEC)
+        gave_up = permanent or attempts >= self.PROMOTION_MAX_ATTEMPTS
+        self.supabase.table("knowledge_promotions").update({
+            "status": "failed" if gave_up else "pending", "attempts": attempts, "last_error": str(error)[:500],
+            "next_attempt_at": (now + timedelta(seconds=delay)).isoformat(), "lease_until": None, "updated_at": now.isoformat()
+        }).eq("id", row['id']).execute()
+
+    def get_promotion_status(self, recent=20):
+        """상태별 건수 + 대기/실패 최근 행"""
+        counts = {}
+        for status in ("pending", "running", "done", "failed"):
+            try:
+                res = self.supabase.table("knowledge_promotions").select("id", count="exact").eq("status", status).limit(1).execute()
+                counts[status] = res.count or 0
+            except Exception:
+                counts[status] = None
+        try:
+            rows = self.supabase.table("knowledge_promotions").select("*").in_("status", ["pending", "running", "failed"]) \
+                .order("id", desc=True).limit(recent).execute().data or []
+        except Exception:
+            rows = []
+        return {"counts": counts, "items": rows}
+
+    def retry_knowledge_promotions(self, ids=None):
+        """failed 행을 즉시 재시도 대상으로 (ids 없으면 전체)"""
+        query = self.supabase.table("knowledge_promotions").update({
+            "status": "pending", "attempts": 0, "next_attempt_at": datetime.now(timezone.utc).isoformat()
+        }).eq("status", "failed")
+        if ids: query = query.in_("id", list(ids))
+        return len(query.execute().data or [])
+
+    # =========================================================
+    # [V273] 🧭 지식 탐색 facet (sql/knowledge_facets.sql 트리거가 유지)
+    # =========================================================
+    FACETS_TTL_SEC = 60
+    KNOWLEDGE_ISSUE_FIELDS = ("id", "issue", "solution", "manufacturer", "model_name", "measurement_item",
+                              "registered_by", "is_verified", "created_at")
+
+    def get_knowledge_facets(self, max_age=None):
+        """[(manufacturer, measurement_item, doc_count)] - 빈 값은 '' (facet 표가 없으면 knowledge_base 스캔으로 대체)"""
+        cached = self._facets_cache
+        if cached and time.monotonic() - cached[0] < (self.FACETS_TTL_SEC if max_age is None else max_age):
+            return cached[1]
+        try:
+            rows = self.supabase.table("knowledge_facets").select("manufacturer, measurement_item, doc_count").execute().data or []
+            facets = [(r['manufacturer'] or '', r['measurement_item'] or '', r['doc_count']) for r in rows]
+        except Exception as e:
+            print(f"knowledge_facets 조회 실패, 전체 스캔으로 대체: {e}")
+            rows = self.supabase.table("knowledge_base").select("manufacturer, measurement_item").execute().data or []
+            counts = Counter((r.get('manufacturer') or '', r.get('measurement_item') or '') for r in rows)
+            facets = [(m, i, n) for (m, i), n in counts.items()]
+        self._facets_cache = (time.monotonic(), facets)
+        return facets
+
+    def facet_counts(self, dimension, manufacturer=None, item=None):
+        """dimension("manufacturer"/"measurement_item") 별 건수 [{"name", "count"}] (다른 축으로 좁히기 가능, 이름순)"""
+        counts = Counter()
+        for mfr, itm, n in self.get_knowledge_facets():
+            if manufacturer and mfr != manufacturer: continue
+            if item and itm != item: continue
+            name = mfr if dimension == "manufacturer" else itm
+            if name: counts[name] += n
+        return [{"name": k, "count": counts[k]} for k in sorted(counts)]
+
+    def list_knowledge_issues(self, fields=None, manufacturer=None, item=None, after_id=None, limit=50):
+        """이슈 한 페이지 (id 오름차순 키셋) → (행, 다음 커서)"""
+        cols = self._project(fields or ["id", "issue", "manufacturer", "model_name", "measurement_item"], self.KNOWLEDGE_ISSUE_FIELDS)
+        query = self.supabase.table("knowledge_base").select(", ".join(cols)).order("id").limit(limit + 1)
+        if manufacturer: query = query.eq("manufacturer", manufacturer)
+        if item: query = query.eq("measurement_item", item)
+        if after_id is not None: query = query.gt("id", after_id)
+        rows = query.execute().data or []
+        return rows[:limit], (rows[limit - 1]['id'] if len(rows) > limit else None)
+
     # [CRITICAL FIX] Added embedding validation to prevent DB crashes
     def promote_to_knowledge(self, issue, solution, mfr, model, item, author="익명"):
         try:
-            from logic_ai import get_embedding
+            from logic_ai import get_embedding, embedding_profile
             
             # Combine text for better embedding context
             full_text = f"{issue}\n{solution}"
-            vec = get_embedding(full_text)
-            
-            # [SAFETY CHECK] If embedding fails (empty list), stop here.
-            # This prevents the 'vector must have at least 1 dimension' error.
-            if not vec or len(vec) == 0:
-                return False, "AI embedding failed. (Please check API status or try again later)"
+            # [V262] 활성 프로필 + 마이그레이션 중인 섀도 프로필 컬럼을 함께 채움
+            vectors = {}
+            for name in self.get_write_embedding_profiles():
+                prof = embedding_profile(name)
+                vec = get_embedding(full_text, prof["name"])
+                
+                # [SAFETY CHECK] If embedding fails (empty list), stop here.
+                # This prevents the 'vector must have at least 1 dimension' error.
+                if not vec or len(vec) == 0:
+                    return False, "AI embedding failed. (Please check API status or try again later)"
+                vectors[prof["column"]] = vec
+                vectors[prof["model_column"]] = prof["version"]
 
-            payload = {
-                "domain": "기술지식", "issue": issue, "solution": solution, 
-                "embedding": vec, 
-                "semantic_version": 1, "is_verified": True, 
-                "manufacturer": self._clean_text(mfr), "model_name": self._clean_text(model), "measurement_item": self._normalize_tags(item),
-                "registered_by": author 
-            }
+            payload = {**self.knowledge_payload(issue, solution, mfr, model, item, author), **vectors}
             res = self.supabase.table("knowledge_base").insert(payload).execute()
+            self._facets_cache = None
             return (True, "성공") if res.data else (False, "실패")
         except Exception as e: return (False, str(e))
 
@@ -228,20 +574,213 @@ class DBManager:
         try: self.supabase.table(table_name).update({"embedding": vec}).eq("id", row_id).execute(); return True
         except: return False
 
+    # =========================================================
+    # [V261] 🔢 재임베딩 (키셋 페이지 + 일괄 갱신)
+    # =========================================================
+    REEMBED_COLUMNS = {"manual_base": "id, content", "knowledge_base": "id, issue, solution", "community_posts": "id, title, content"}
+
+    # [V262] column / model_column 으로 섀도 컬럼(embedding_v2 등)도 같은 방식으로 채움
+    def _reembed_filter(self, query, version, column="embedding", model_column="embedding_model"):
+        return query.or_(f"{column}.is.null,{model_column}.is.null,{model_column}.neq.{version}")
+
+    def count_reembed_targets(self, table_name, version, column="embedding", model_column="embedding_model"):
+        try:
+            query = self.supabase.table(table_name).select("id", count="exact")
+            res = self._reembed_filter(query, version, column, model_column).limit(1).execute()
+            return res.count or 0
+        except Exception as e:
+            print(f"Reembed Count Error: {e}")
+            return 0
+
+    def get_reembed_targets(self, table_name, version, after_id=0, limit=200, column="embedding", model_column="embedding_model"):
+        """임베딩이 없거나 다른 모델 버전인 행을 id 순으로 after_id 다음부터 limit 개"""
+        query = self.supabase.table(table_name).select(self.REEMBED_COLUMNS[table_name]).gt("id", after_id)
+        return self._reembed_filter(query, version, column, model_column).order("id").limit(limit).execute().data or []
+
+    def bulk_update_embeddings(self, table_name, rows, version, column="embedding", model_column="embedding_model"):
+        """rows: [{"id", "embedding"}] - RPC 1회로 갱신, RPC 가 없으면 행별 update 로 대체"""
+        if not rows: return 0
+        try:
+            res = self.supabase.rpc("bulk_update_embeddings", {
+                "p_table": table_name, "p_rows": rows, "p_model": version, "p_column": column
+            }).execute()
+            return res.data if isinstance(res.data, int) else len(rows)
+        except Exception as e:
+            print(f"bulk_update_embeddings RPC 사용 불가, 행별 갱신: {e}")
+        updated = 0
+        for r in rows:
+            try:
+                self.supabase.table(table_name).update({column: r["embedding"], model_column: version}).eq("id", r["id"]).execute()
+                updated += 1
+            except Exception as e: print(f"Vector Update Error ({table_name} #{r['id']}): {e}")
+        return updated
+
+    def embedding_coverage(self, table_name, column="embedding"):
+        """(column 이 채워진 행 수, 전체 행 수)"""
+        try:
+            total = self.supabase.table(table_name).select("id", count="exact").limit(1).execute().count or 0
+            filled = self.supabase.table(table_name).select("id", count="exact").not_.is_(column, "null").limit(1).execute().count or 0
+            return filled, total
+        except Exception as e:
+            print(f"Embedding Coverage Error: {e}")
+            return 0, 0
+
     def delete_record(self, table_name, row_id):
         try:
             res = self.supabase.table(table_name).delete().eq("id", row_id).execute()
             return (True, "성공") if res.data else (False, "실패")
         except Exception as e: return (False, str(e))
 
+    # =========================================================
+    # [V254] 📥 매뉴얼 학습 작업(Ingest Job) 체크포인트
+    # =========================================================
+    def create_ingest_job(self, file_name, mode, use_ocr=False, kind="manual", owner=None):
+        try:
+            payload = {
+                "kind": kind, "file_name": file_name, "mode": mode, "use_ocr": use_ocr,
+                "status": "running", "stage": "extract", "progress": 0, "state": {},   # 만든 쪽이 바로 실행 (선점 상태로 생성)
+                "owner": owner
+            }
+            res = self.supabase.table("ingest_jobs").insert(payload).execute()
+            return res.data[0] if res.data else None
+        except Exception as e:
+            print(f"Ingest Job Create Error: {e}")
+            return None
+
+    def get_ingest_job(self, job_id):
+        try:
+            res = self.supabase.table("ingest_jobs").select("*").eq("id", job_id).execute()
+            return res.data[0] if res.data else None
+        except: return None
+
+    def update_ingest_job(self, job_id, owner=None, **fields):
+        """
+        작업 행 갱신 (fields 가 없으면 updated_at 만 → 하트비트)
+        owner 를 주면 소유 토큰이 같을 때만 반영하고, 다른 곳이 선점해 맞는 행이 없으면 False
+        (일시 오류는 출력만 하고 None → 호출부는 False 만 소유권 상실로 봄)
+        """
+        try:
+            fields["updated_at"] = datetime.now(timezone.utc).isoformat()
+            query = self.supabase.table("ingest_jobs").update(fields).eq("id", job_id)
+            if owner is None:
+                query.execute()
+                return True
+            return bool(query.eq("owner", owner).execute().data)
+        except Exception as e:
+            print(f"Ingest Job Update Error: {e}")
+            return None
+
+    def claim_ingest_job(self, job_id, owner, stale_sec=300):
+        """
+        재개 전 작업 선점: 완료되지 않았고, 실행 중이 아니거나 stale_sec 동안 갱신이 없는 작업만 running + 새 소유 토큰으로 바꿈.
+        조건부 update 한 문장이라 동시에 재개해도 한 곳만 행을 돌려받음 (선점 실패 시 None)
+        """
+        try:
+            now = datetime.now(timezone.utc)
+            stale = (now - timedelta(seconds=stale_sec)).isoformat()
+            res = self.supabase.table("ingest_jobs").update({"status": "running", "message": None, "owner": owner, "updated_at": now.isoformat()})\
+                .eq("id", job_id).neq("status", "done").or_(f"status.neq.running,updated_at.lt.{stale}").execute()
+            return res.data[0] if res.data else None
+        except Exception as e:
+            print(f"Ingest Job Claim Error: {e}")
+            return None
+
+    def save_ingest_job_chunks(self, job_id, data):
+        """분할 단계 결과(청크·범위·해시·문서 앞부분) 1회 저장 - 실패하면 예외 (커서만으로는 재개 불가)"""
+        self.supabase.table("ingest_job_chunks").upsert({"job_id": job_id, "data": data}).execute()
+
+    def get_ingest_job_chunks(self, job_id):
+        try:
+            res = self.supabase.table("ingest_job_chunks").select("data").eq("job_id", job_id).execute()
+            return res.data[0]["data"] if res.data else {}
+        except: return {}
+
+    def list_ingest_jobs(self, kind="manual", limit=20):
+        try:
+            return self.supabase.table("ingest_jobs").select("id, kind, file_name, mode, status, stage, progress, message, created_at, updated_at")\
+                .eq("kind", kind).order("created_at", desc=True).limit(limit).execute().data
+        except: return []
+
+    # =========================================================
+    # [V258] 🔁 매뉴얼 청크 중복 제거 (content_hash)
+    # =========================================================
+    def get_manual_chunks_for_file(self, file_name, domain, page_size=1000):
+        """같은 파일의 기존 청크 (id, content, content_hash) 전체 - 해시가 없는 예전 행은 content 로 계산"""
+        rows, last_id = [], 0
+        try:
+            while True:
+                res = self.supabase.table("manual_base").select("id, content, content_hash")\
+                    .eq("file_name", file_name).eq("domain", domain).gt("id", last_id)\
+                    .order("id").limit(page_size).execute()
+                batch = res.data or []
+                rows.extend(batch)
+                if len(batch) < page_size: return rows
+                last_id = batch[-1]["id"]
+        except Exception as e:
+            print(f"Manual Chunk Fetch Error: {e}")
+            return rows
+
+    def retire_manual_chunks(self, doc_ids, batch_size=200):
+        """교체/삭제된 청크와 그 청크에서 나온 지식 그래프 관계를 함께 제거"""
+        removed = 0
+        for i in range(0, len(doc_ids), batch_size):
+            ids = doc_ids[i:i + batch_size]
+            try:
+                self.supabase.table("knowledge_graph").delete().in_("doc_id", ids).eq("source_type", "manual").execute()
+                self.supabase.table("graph_build_ledger").delete().eq("table_name", "manual_base").in_("doc_id", ids).execute()
+                res = self.supabase.table("manual_base").delete().in_("id", ids).execute()
+                removed += len(res.data or [])
+            except Exception as e: print(f"Manual Chunk Retire Error: {e}")
+        return removed
+
     # =========================================================
     # [V233] 📦 소모품 재고관리 (Inventory)
     # =========================================================
-    def get_inventory_items(self):
+    def _select_all(self, table, columns, page_size=1000):
+        """id 키셋으로 표 전체 읽기 (PostgREST 기본 최대 1000행 제한 회피)"""
+        rows, last_id = [], None
+        while True:
+            query = self.supabase.table(table).select(columns).order("id").limit(page_size)
+            if last_id is not None: query = query.gt("id", last_id)
+            batch = query.execute().data or []
+            rows.extend(batch)
+            if len(batch) < page_size: return rows
+            last_id = batch[-1]["id"]
+
+    def get_inventory_items(self, page_size=1000):
+        """품목 전체 (분류·품명 순) - 1000행 응답 제한을 넘어도 모두 읽도록 페이지 단위로"""
         try:
-            return self.supabase.table("inventory_items").select("*").order("category").order("item_name").execute().data
+            rows, start = [], 0
+            while True:
+                batch = self.supabase.table("inventory_items").select("*").order("category").order("item_name").order("id") \
+                    .range(start, start + page_size - 1).execute().data or []
+                rows.extend(batch)
+                if len(batch) < page_size: return rows
+                start += page_size
         except: return []
 
+    def get_inventory_index(self, max_age=None):
+        """
+        [V265] 재고 검색 인덱스 캐시
+        [V269] inventory_version 이 그대로일 때만 재사용 → 다른 프로세스/API/RPC/SQL 직접 수정도 바로 반영
+        (버전 설정 전이면 TTL 캐시 + 이 인스턴스의 재고 쓰기 시 무효화)
+        """
+        max_age = self.INVENTORY_INDEX_TTL_SEC if max_age is None else max_age
+        # 품목 조회 전에 읽어야 그 사이 변경이 다음 호출에서 재빌드됨 (짧은 TTL: 다른 곳의 변경은 최대 몇 초 뒤 반영)
+        version = self.get_inventory_version(max_age=self.INVENTORY_VERSION_TTL_SEC)
+        cached = self._inventory_index
+        if cached:
+            built_at, built_version, index = cached
+            if version is not None and built_version == version: return index
+            if version is None and time.monotonic() - built_at < max_age: return index
+        index = InventoryIndex(self.get_inventory_items())
+        self._inventory_index = (time.monotonic(), version, index)
+        return index
+
+    def _invalidate_inventory_index(self):
+        self._inventory_index = None
+        self._config_cache.pop("inventory_version", None)
+
     def check_item_exists(self, name, model):
         try:
             res = self.supabase.table("inventory_items").select("*").eq("item_name", name).eq("model_name", model).execute()
@@ -250,45 +789,57 @@ class DBManager:
             return None
         except: return None
 
+    def apply_stock_movements(self, movements):
+        """
+        [V267] 입고/출고/설정 여러 건을 서버 RPC 한 번으로 원자 적용 (sql/stock_movements.sql)
+        - movements: [{"item_id", "change_type": 입고/출고/설정, "quantity", "worker_name", "reason",
+                       "expected_qty"(선택), "allow_negative"(선택)}]
+        - 재고 부족·동시 수정 등 조건에 하나라도 걸리면 전체 미반영
+        반환: (True, [{"index", "item_id", "before", "after", "log_id"}]) / (False, {"index", "item_id", "error", ...})
+        """
+        if not movements: return True, []
+        try:
+            out = self.supabase.rpc("apply_stock_movements", {"p_movements": movements}).execute().data or {}
+        except Exception as e:
+            return False, {"error": str(e)}
+        if not out.get("ok"): return False, out.get("error") or {"error": "알 수 없는 오류"}
+        self._invalidate_inventory_index()
+        return True, out.get("results", [])
+
+    @staticmethod
+    def stock_movement_error(err):
+        """apply_stock_movements 실패 내용을 화면용 문장으로"""
+        msg = err.get("error", "처리 실패")
+        if err.get("current_qty") is not None: msg += f" (현재 {err['current_qty']}개)"
+        return msg
+
     def update_inventory_general(self, item_id, updates, worker):
         try:
-            current = self.supabase.table("inventory_items").select("*").eq("id", item_id).execute()
-            if not current.data: return False, "항목을 찾을 수 없음"
-            
-            old_data = current.data[0]
-            old_qty = old_data.get('current_qty', 0)
+            updates = dict(updates)
+            new_qty = updates.pop('current_qty', None)
+            if updates:
+                self.supabase.table("inventory_items").update(updates).eq("id", item_id).execute()
+                self._invalidate_inventory_index()
             
-            self.supabase.table("inventory_items").update(updates).eq("id", item_id).execute()
-            
-            if 'current_qty' in updates:
-                new_qty = updates['current_qty']
-                if old_qty != new_qty:
-                    diff = new_qty - old_qty
-                    log_type = "입고" if diff > 0 else "출고"
-                    reason = f"대시보드 직접 수정 ({old_qty} → {new_qty})"
-                    self.log_inventory_change(item_id, log_type, abs(diff), worker, reason)
+            if new_qty is not None:
+                # [V267] 수량은 읽기-수정-쓰기 대신 RPC 로 설정 (이력 포함, 원자 처리)
+                ok, res = self.apply_stock_movements([{
+                    "item_id": item_id, "change_type": "설정", "quantity": int(new_qty),
+                    "worker_name": worker, "reason": "대시보드 직접 수정"
+                }])
+                if not ok: return False, self.stock_movement_error(res)
             
             return True, "수정 성공"
         except Exception as e:
             return False, str(e)
 
     def update_inventory_qty(self, item_id, new_qty, worker):
-        try:
-            current = self.supabase.table("inventory_items").select("current_qty").eq("id", item_id).execute()
-            old_qty = current.data[0]['current_qty'] if current.data else 0
-            
-            if old_qty == new_qty: return True, "변경 없음"
-
-            self.supabase.table("inventory_items").update({"current_qty": new_qty}).eq("id", item_id).execute()
-            
-            diff = new_qty - old_qty
-            log_type = "입고" if diff > 0 else "출고"
-            reason = f"엑셀 갱신 ({old_qty} → {new_qty})"
-            
-            self.log_inventory_change(item_id, log_type, abs(diff), worker, reason)
-            return True, "갱신 성공"
-        except Exception as e:
-            return False, str(e)
+        ok, res = self.apply_stock_movements([{
+            "item_id": item_id, "change_type": "설정", "quantity": int(new_qty),
+            "worker_name": worker, "reason": "엑셀 갱신"
+        }])
+        if not ok: return False, self.stock_movement_error(res)
+        return True, "변경 없음" if res[0]['before'] == res[0]['after'] else "갱신 성공"
 
     def add_inventory_item(self, cat, name, model, loc, mfr, measure_val, desc, initial_qty, worker):
         try:
@@ -307,11 +858,15 @@ class DBManager:
                 "current_qty": 0 
             }
             res = self.supabase.table("inventory_items").insert(payload).execute()
+            self._invalidate_inventory_index()
             
             if res.data:
                 new_item_id = res.data[0]['id']
                 if initial_qty > 0:
-                    self.log_inventory_change(new_item_id, "입고", initial_qty, worker, "신규 품목 등록 (초기 재고)")
+                    self.apply_stock_movements([{
+                        "item_id": new_item_id, "change_type": "입고", "quantity": int(initial_qty),
+                        "worker_name": worker, "reason": "신규 품목 등록 (초기 재고)"
+                    }])
                 return True, "성공"
             return False, "데이터베이스가 응답하지 않습니다."
         except Exception as e: 
@@ -327,14 +882,97 @@ class DBManager:
                 "reason": reason
             }
             res = self.supabase.table("inventory_logs").insert(payload).execute()
+            self._invalidate_inventory_index()  # 로그 트리거가 current_qty 를 바꿈
             return True if res.data else False
         except Exception as e:
             print(f"Inventory Log Error: {e}")
             return False
 
+    def bulk_import_inventory(self, df, worker, batch_size=None, on_progress=None):
+        """
+        [V266] 엑셀/CSV 일괄 등록/갱신 (행별 왕복 대신 배치)
+        - 기존 품목 1회 조회 → build_import_plan 으로 신규/갱신/변경 없음 판정
+        - 신규 품목 insert 와 수량 반영(apply_stock_movements) 을 batch_size 개씩
+        - 의미는 행별 처리와 동일: 신규는 수량 0 으로 등록 후 초기 재고 '입고',
+          갱신은 수량을 덮어쓰고 차이만큼 '입고'/'출고' 이력 ([V267] 원자 RPC 가 이력까지 기록)
+        - 실패한 행만 '실패' 로 표시하고 나머지는 계속
+        반환: 행별 결과 DataFrame (REPORT_COLUMNS)
+        """
+        batch_size = max(1, batch_size or BULK_WRITE_BATCH)
+        existing = self._select_all("inventory_items", "id, item_name, model_name, current_qty")
+        plan = build_import_plan(df, existing)
+
+        new_rows = plan[plan["status"] == STATUS_NEW]
+        upd_rows = plan[plan["status"] == STATUS_UPDATE]
+        movements = []   # (plan index, 수량 이동)
+        for r in upd_rows.itertuples():
+            movements.append((r.Index, {"item_id": int(r.item_id), "change_type": "설정", "quantity": int(r.qty),
+                                        "worker_name": worker, "reason": "엑셀 갱신"}))
+
+        # 요청 수 추정 (초기 재고 0 인 신규 품목은 수량 이동이 없으므로 실제는 이 이하)
+        total = -(-len(new_rows) // batch_size) + -(-(len(upd_rows) + len(new_rows)) // batch_size)
+        progress = {"done": 0}
+
+        def _step():
+            progress["done"] += 1
+            if on_progress and total: on_progress(progress["done"], total)
+
+        def _fail(index, err):
+            plan.loc[index, ["status", "message"]] = [STATUS_FAIL, str(err)[:200]]
+
+        # 1) 신규 품목
+        for start in range(0, len(new_rows), batch_size):
+            chunk = new_rows.iloc[start:start + batch_size]
+            payload = [{
+                "category": r.category,
+                "item_name": r.item_name,
+                "model_name": r.model_name,
+                "location": r.location,
+                "manufacturer": self._clean_text(r.manufacturer),
+                "measurement_item": self._normalize_tags(r.measurement_item),
+                "description": self._clean_text(r.description),
+                "current_qty": 0
+            } for r in chunk.itertuples()]
+            try:
+                inserted = self.supabase.table("inventory_items").insert(payload).execute().data or []
+                for r, row in zip(chunk.itertuples(), inserted):
+                    plan.at[r.Index, "item_id"] = row['id']
+                    if r.qty > 0:
+                        movements.append((r.Index, {"item_id": row['id'], "change_type": "입고", "quantity": int(r.qty),
+                                                    "worker_name": worker, "reason": "신규 품목 등록 (초기 재고)"}))
+                if len(inserted) < len(chunk): _fail(chunk.index[len(inserted):], "데이터베이스가 응답하지 않습니다.")
+            except Exception as e:
+                _fail(chunk.index, e)
+            _step()
+
+        # 2) 수량 반영 (배치 단위 원자 처리, 조건에 걸린 행만 빼고 다시 시도)
+        for start in range(0, len(movements), batch_size):
+            chunk = movements[start:start + batch_size]
+            while chunk:
+                ok, res = self.apply_stock_movements([m for _, m in chunk])
+                if ok: break
+                bad = res.get("index")
+                if bad is None or not 0 <= bad < len(chunk):
+                    for index, m in chunk: self._import_move_failed(plan, index, m, res)
+                    break
+                self._import_move_failed(plan, chunk[bad][0], chunk[bad][1], res)
+                chunk = chunk[:bad] + chunk[bad + 1:]
+            _step()
+
+        if len(new_rows) or len(upd_rows): self._invalidate_inventory_index()
+        return plan[REPORT_COLUMNS]
+
+    def _import_move_failed(self, plan, index, movement, err):
+        msg = self.stock_movement_error(err)
+        if movement["change_type"] == "입고":   # 품목은 등록됨, 초기 재고만 실패
+            plan.at[index, "message"] = f"초기 재고 반영 실패: {msg}"
+        else:
+            plan.loc[index, ["status", "message"]] = [STATUS_FAIL, msg]
+
     def delete_inventory_item(self, item_id):
         try:
             self.supabase.table("inventory_items").delete().eq("id", item_id).execute()
+            self._invalidate_inventory_index()
             return True
         except: return False
     
@@ -346,36 +984,122 @@ class DBManager:
             return query.execute().data
         except: return []
 
+    # =========================================================
+    # [V269] 📄 목록 API (키셋 페이지 + 필드 선택 + ETag 버전)
+    # =========================================================
+    INVENTORY_ITEM_FIELDS = ("id", "category", "item_name", "model_name", "location", "manufacturer",
+                             "measurement_item", "description", "current_qty", "created_at")
+    INVENTORY_LOG_FIELDS = ("id", "item_id", "change_type", "quantity", "worker_name", "reason", "created_at", "item_name")
+
+    @staticmethod
+    def _project(fields, allowed):
+        """요청 필드 → select 목록 (id 는 커서용으로 항상 포함, 모르는 필드는 ValueError)"""
+        if not fields: return list(allowed)
+        unknown = [f for f in fields if f not in allowed]
+        if unknown: raise ValueError(f"알 수 없는 필드: {', '.join(unknown)}")
+        return ["id"] + [f for f in dict.fromkeys(fields) if f != "id"]
+
+    def get_inventory_version(self, max_age=0):
+        """sql/inventory_version.sql 트리거가 올리는 재고 데이터 버전 (설정 전이면 None → ETag 미사용, ETag 는 항상 최신값)"""
+        value = self.get_config("inventory_version", None, max_age=max_age)
+        return None if value is None else int(value)
+
+    def list_inventory_items(self, fields=None, category=None, location=None, max_qty=None, after_id=None, limit=100):
+        """품목 한 페이지 (id 오름차순) → (행, 다음 커서). max_qty: 현재 수량이 이 값 이하인 품목만 (재고 부족)"""
+        cols = self._project(fields, self.INVENTORY_ITEM_FIELDS)
+        query = self.supabase.table("inventory_items").select(", ".join(cols)).order("id").limit(limit + 1)
+        if category: query = query.eq("category", category)
+        if location: query = query.eq("location", location)
+        if max_qty is not None: query = query.lte("current_qty", max_qty)
+        if after_id is not None: query = query.gt("id", after_id)
+        rows = query.execute().data or []
+        return rows[:limit], (rows[limit - 1]['id'] if len(rows) > limit else None)
+
+    def list_inventory_logs(self, fields=None, item_id=None, change_type=None, since=None, before_id=None, limit=100):
+        """이력 한 페이지 (최신순, id 내림차순) → (행, 다음 커서). item_name 필드는 품목 조인"""
+        cols = self._project(fields, self.INVENTORY_LOG_FIELDS)
+        select = [c for c in cols if c != "item_name"]
+        if "item_name" in cols: select.append("inventory_items(item_name)")
+        query = self.supabase.table("inventory_logs").select(", ".join(select)).order("id", desc=True).limit(limit + 1)
+        if item_id is not None: query = query.eq("item_id", item_id)
+        if change_type: query = query.eq("change_type", change_type)
+        if since: query = query.gte("created_at", since)
+        if before_id is not None: query = query.lt("id", before_id)
+        rows = query.execute().data or []
+        if "item_name" in cols:
+            for row in rows: row["item_name"] = (row.pop("inventory_items", None) or {}).get("item_name")
+        return rows[:limit], (rows[limit - 1]['id'] if len(rows) > limit else None)
+
+    # =========================================================
+    # [V268] 📈 소모 집계 (inventory_analytics)
+    # =========================================================
+    def get_unaggregated_inventory_logs(self, limit=1000):
+        """아직 사용량 집계에 넣지 않은 이력 (id 순) - 커밋 순서/created_at 과 무관하게 빠짐없이 잡힘"""
+        return self.supabase.table("inventory_logs").select("id, item_id, change_type, quantity, created_at") \
+            .eq("aggregated", False).order("id").limit(limit).execute().data or []
+
+    def get_inventory_usage(self, since_day, page_size=1000):
+        """since_day(YYYY-MM-DD) 이후 일별 집계 전체"""
+        rows, start = [], 0
+        while True:
+            batch = self.supabase.table("inventory_usage_daily").select("item_id, day, qty_in, qty_out, moves") \
+                .gte("day", since_day).order("item_id").order("day").range(start, start + page_size - 1).execute().data or []
+            rows.extend(batch)
+            if len(batch) < page_size: return rows
+            start += page_size
+
+    def merge_inventory_usage(self, logs, rows):
+        """
+        로그를 집계 완료로 표시하면서 일별 증분을 더함 (RPC 한 트랜잭션, 증분은 서버가 표시한 로그로 계산)
+        RPC 가 없으면 rows(aggregate_logs 결과)를 읽어서 더한 뒤 upsert 하고 표시 (동시 실행은 보호되지 않음)
+        반환: 이번에 반영한 로그 수 (다른 프로세스가 먼저 반영한 로그는 제외)
+        """
+        ids = [l['id'] for l in logs]
+        try:
+            res = self.supabase.rpc("merge_inventory_usage_logs", {"p_ids": ids}).execute()
+            return int(res.data or 0)
+        except Exception as e:
+            print(f"merge_inventory_usage_logs RPC 실패, 개별 upsert 로 대체: {e}")
+        item_ids = sorted({r['item_id'] for r in rows})
+        current = {}
+        for start in range(0, len(item_ids), 200):
+            for r in self.supabase.table("inventory_usage_daily").select("*") \
+                    .in_("item_id", item_ids[start:start + 200]).in_("day", sorted({r['day'] for r in rows})).execute().data or []:
+                current[(r['item_id'], r['day'])] = r
+        merged = []
+        for r in rows:
+            old = current.get((r['item_id'], r['day']), {})
+            merged.append({**r, **{k: r[k] + old.get(k, 0) for k in ("qty_in", "qty_out", "moves")}})
+        live = set()
+        for start in range(0, len(item_ids), 200):
+            live.update(r['id'] for r in self.supabase.table("inventory_items").select("id")
+                        .in_("id", item_ids[start:start + 200]).execute().data or [])
+        merged = [r for r in merged if r['item_id'] in live]
+        for start in range(0, len(merged), BULK_WRITE_BATCH):
+            self.supabase.table("inventory_usage_daily").upsert(merged[start:start + BULK_WRITE_BATCH]).execute()
+        for start in range(0, len(ids), 200):
+            self.supabase.table("inventory_logs").update({"aggregated": True}).in_("id", ids[start:start + 200]).execute()
+        return len(ids)
+
     # =========================================================
     # [V234 Final] 🤖 챗봇용 재고 검색 함수
+    # [V265] DB ilike 스캔 대신 인메모리 인덱스 (오타 허용 + 관련도 순)
     # =========================================================
     def search_inventory_for_chat(self, query_text):
         try:
-            stop_words = ['재고', '수량', '몇개', '몇', '개', '있어', '있나요', '알려줘', '확인', '조회', '어디', '있니', '현황', '보여줘', '소모품']
-            keywords = [k for k in query_text.split() if k not in stop_words and len(k) >= 2]
+            keywords = [k for k in query_text.split() if k not in STOP_WORDS and len(k) >= 2]
 
             if not keywords: return None
 
-            query = self.supabase.table("inventory_items").select("*")
-            or_filters = []
-            for kw in keywords:
-                or_filters.append(f"category.ilike.%{kw}%")
-                or_filters.append(f"item_name.ilike.%{kw}%")
-                or_filters.append(f"model_name.ilike.%{kw}%")
-                or_filters.append(f"description.ilike.%{kw}%")
-                or_filters.append(f"manufacturer.ilike.%{kw}%")
-                or_filters.append(f"measurement_item.ilike.%{kw}%")
-            
-            if not or_filters: return None
-            
-            final_filter = ",".join(or_filters)
-            res = query.or_(final_filter).execute()
+            ranked = self.get_inventory_index().search(query_text, limit=None)
             
-            if not res.data: 
+            if not ranked: 
                 return f"🔍 **'{', '.join(keywords)}'**에 대한 재고 정보가 없습니다.\n(혹시 오타가 있는지 확인해주세요. 예: valve vs vavle)"
             
-            results = res.data
+            results = [item for item, _, _ in ranked]
             msg = f"📦 **재고 검색 결과 ({len(results)}건):**\n"
+            if not any(exact for _, _, exact in ranked):
+                msg += "(정확히 일치하는 품목이 없어 비슷한 이름으로 찾았습니다)\n"
             
             for item in results[:10]: 
                 cat = item.get('category', '-')
@@ -401,7 +1125,16 @@ class DBManager:
     # =========================================================
     # [V236] 🕸️ 지식 그래프(Knowledge Graph) 저장 및 조회
     # =========================================================
-    def save_knowledge_triples(self, doc_id, triples):
+    def _triple_rows(self, doc_id, triples, source_type="manual"):
+        return [{
+            "source": self.canonical_entity(t['source']),
+            "relation": t.get('relation', 'related_to'),
+            "target": self.canonical_entity(t['target']),
+            "doc_id": doc_id,
+            "source_type": source_type,
+        } for t in triples or [] if t.get('source') and t.get('target')]
+
+    def save_knowledge_triples(self, doc_id, triples, source_type="manual"):
         """
         AI가 추출한 트리플(관계 데이터)을 DB에 저장합니다.
         """
@@ -409,15 +1142,7 @@ class DBManager:
         
         try:
             # 대량 삽입 (Bulk Insert) 준비
-            data_to_insert = []
-            for t in triples:
-                if t.get('source') and t.get('target'):
-                    data_to_insert.append({
-                        "source": self._clean_text(t['source']),
-                        "relation": t.get('relation', 'related_to'),
-                        "target": self._clean_text(t['target']),
-                        "doc_id": doc_id
-                    })
+            data_to_insert = self._triple_rows(doc_id, triples, source_type)
             
             if data_to_insert:
                 self.supabase.table("knowledge_graph").insert(data_to_insert).execute()
@@ -427,6 +1152,112 @@ class DBManager:
             print(f"Graph Save Error: {e}")
             return False
 
+    def save_knowledge_triples_bulk(self, triples_by_id, source_type="manual", batch_size=None):
+        """
+        [V260] 여러 문서의 트리플을 묶어서 저장 (문서별 insert 대신 batch_size 행당 1회). 저장된 트리플 수 반환
+        triples_by_id: dict 또는 (doc_id, triples) 이터러블 - iter_triples_batch 를 그대로 넘기면
+        추출되는 대로 batch_size 행마다 flush 되어 중간에 실패해도 앞서 저장한 묶음은 남고 메모리도 늘지 않음
+        """
+        pairs = triples_by_id.items() if isinstance(triples_by_id, dict) else triples_by_id
+        with self.bulk_writer("knowledge_graph", batch_size, keep_rows=False) as writer:
+            for doc_id, triples in pairs:
+                writer.extend(self._triple_rows(doc_id, triples, source_type))
+        return writer.count
+
+    # [V264] 노드 정규화 (graph_entity_aliases: 정규화 키 → 대표 이름)
+    def get_entity_aliases(self, max_age=None):
+        cached = self._alias_cache
+        if cached and time.monotonic() - cached[0] < (self.CONFIG_TTL_SEC if max_age is None else max_age):
+            return cached[1]
+        aliases, last_key = {}, ""
+        try:
+            while True:
+                rows = self.supabase.table("graph_entity_aliases").select("alias_key, canonical")\
+                    .gt("alias_key", last_key).order("alias_key").limit(1000).execute().data or []
+                aliases.update({r["alias_key"]: r["canonical"] for r in rows})
+                if len(rows) < 1000: break
+                last_key = rows[-1]["alias_key"]
+        except Exception as e:
+            print(f"Entity Alias Load Error: {e}")
+            if cached: return cached[1]
+        self._alias_cache = (time.monotonic(), aliases)
+        return aliases
+
+    def canonical_entity(self, name):
+        """별칭 표에 있으면 대표 이름, 없으면 정리된 원문"""
+        cleaned = self._clean_text(name)
+        return self.get_entity_aliases().get(normalize_entity_key(cleaned), cleaned)
+
+    def upsert_entity_aliases(self, mapping):
+        """mapping: {별칭(원문 또는 키): 대표 이름}"""
+        rows = {}
+        for alias, canonical in mapping.items():
+            canonical = self._clean_text(canonical)
+            rows[normalize_entity_key(alias)] = canonical
+            rows[normalize_entity_key(canonical)] = canonical
+        if not rows: return 0
+        try:
+            payload = [{"alias_key": k, "canonical": v} for k, v in rows.items() if k]
+            for i in range(0, len(payload), BULK_WRITE_BATCH):
+                self.supabase.table("graph_entity_aliases").upsert(payload[i:i + BULK_WRITE_BATCH]).execute()
+            self._alias_cache = None
+            return len(payload)
+        except Exception as e:
+            print(f"Entity Alias Save Error: {e}")
+            return 0
+
+    def apply_graph_compaction(self, updates, delete_ids, batch_size=500):
+        """
+        updates: [{"id", "source", "target", "weight"}], delete_ids: 병합되어 사라질 관계 id
+        apply_graph_compaction RPC 로 한 트랜잭션 처리, 없으면 행별 update + 묶음 delete
+        """
+        try:
+            res = self.supabase.rpc("apply_graph_compaction", {"p_updates": updates, "p_delete_ids": delete_ids}).execute()
+            return res.data if isinstance(res.data, int) else len(updates) + len(delete_ids)
+        except Exception as e:
+            print(f"apply_graph_compaction RPC 사용 불가, 순차 처리: {e}")
+        for u in updates:
+            self.supabase.table("knowledge_graph").update({k: u[k] for k in ("source", "target", "weight")}).eq("id", u["id"]).execute()
+        for i in range(0, len(delete_ids), batch_size):
+            self.supabase.table("knowledge_graph").delete().in_("id", delete_ids[i:i + batch_size]).execute()
+        return len(updates) + len(delete_ids)
+
+    # [V263] 그래프 빌드 원장 (문서별 content_hash + 추출기 버전)
+    def get_graph_ledger(self, table_name, doc_ids, batch_size=500):
+        """{doc_id: (content_hash, extractor_version)}"""
+        ledger = {}
+        for i in range(0, len(doc_ids), batch_size):
+            try:
+                res = self.supabase.table("graph_build_ledger").select("doc_id, content_hash, extractor_version")\
+                    .eq("table_name", table_name).in_("doc_id", doc_ids[i:i + batch_size]).execute()
+                for r in res.data or []: ledger[r["doc_id"]] = (r["content_hash"], r["extractor_version"])
+            except Exception as e: print(f"Graph Ledger Fetch Error: {e}")
+        return ledger
+
+    def replace_doc_triples(self, table_name, source_type, triples_by_id, hashes, extractor_version):
+        """
+        문서들의 기존 트리플을 지우고 새 트리플 + 원장을 기록합니다. 저장된 트리플 수 반환
+        replace_doc_triples RPC 는 한 트랜잭션으로 처리, RPC 가 없으면 삭제 → 묶음 저장 → 원장 upsert 순서로 대체
+        (대체 경로는 원장을 마지막에 쓰므로 중간에 실패해도 다음 실행에서 다시 처리됨)
+        """
+        if not triples_by_id: return 0
+        doc_ids = list(triples_by_id)
+        rows = [r for doc_id, triples in triples_by_id.items() for r in self._triple_rows(doc_id, triples, source_type)]
+        ledger = [{"table_name": table_name, "doc_id": doc_id, "content_hash": hashes[doc_id],
+                   "extractor_version": extractor_version, "triple_count": len(triples_by_id[doc_id] or [])}
+                  for doc_id in doc_ids]
+        try:
+            res = self.supabase.rpc("replace_doc_triples", {
+                "p_source_type": source_type, "p_doc_ids": doc_ids, "p_triples": rows, "p_ledger": ledger
+            }).execute()
+            return res.data if isinstance(res.data, int) else len(rows)
+        except Exception as e:
+            print(f"replace_doc_triples RPC 사용 불가, 순차 처리: {e}")
+        self.supabase.table("knowledge_graph").delete().in_("doc_id", doc_ids).eq("source_type", source_type).execute()
+        saved = len(self.bulk_insert("knowledge_graph", rows)) if rows else 0
+        self.supabase.table("graph_build_ledger").upsert(ledger, on_conflict="table_name,doc_id").execute()
+        return saved
+
     def search_graph_relations(self, keyword):
         """
         특정 키워드와 연결된 지식 그래프(인과관계)를 검색합니다.
@@ -488,6 +1319,9 @@ class DBManager:
             if target_scope in ["target", "all"]:
                 res = self.supabase.table("knowledge_graph").update({"target": self._clean_text(new_name)}).eq("target", old_name).execute()
                 if res.data: count += len(res.data)
+
+            # 3. [V264] 이후 추출되는 같은 이름도 새 이름으로 저장되도록 별칭 등록
+            if target_scope == "all": self.upsert_entity_aliases({old_name: new_name})
                 
             return True, count
         except Exception as e:
@@ -0,0 +1,161 @@
+"""
+embedding_migration.py — 임베딩 프로필 무중단 교체 (V262)
+검색은 app_config.embedding_profile 이 가리키는 프로필(컬럼 + match_* RPC) 하나만 읽습니다.
+새 모델/차원은 섀도 컬럼에 미리 채우고, 같은 질의로 두 프로필을 동시에 조회(dual-read)해
+결과 겹침과 지연을 비교한 뒤, 설정 한 줄을 바꿔 전환합니다. (이전 프로필은 섀도로 남겨 즉시 롤백 가능)
+
+사용법:
+    python embedding_migration.py status
+    python embedding_migration.py shadow v2                 # 새 행에 v2 도 기록 시작
+    python reembed_pipeline.py --profile v2                  # 기존 행 v2 채우기
+    python embedding_migration.py validate queries.txt --candidate v2
+    python embedding_migration.py switch v2 [--force]
+"""
+import sys
+import json
+import time
+import argparse
+import statistics
+from datetime import datetime, timezone
+
+from logic_ai import get_embedding, embedding_profile, EMBEDDING_PROFILES
+
+TABLES = {"manual_base": "match_manual", "knowledge_base": "match_knowledge"}
+MIN_COVERAGE = 0.99
+
+
+def profile_status(db):
+    """프로필별 컬럼 채움 비율 + 현재 활성/섀도 설정"""
+    profiles = {}
+    for name in EMBEDDING_PROFILES:
+        prof = embedding_profile(name)
+        coverage = {}
+        for table in TABLES:
+            filled, total = db.embedding_coverage(table, prof["column"])
+            coverage[table] = {"filled": filled, "total": total, "ratio": round(filled / total, 4) if total else 1.0}
+        profiles[name] = {"version": prof["version"], "column": prof["column"], "coverage": coverage}
+    return {
+        "active": db.get_active_embedding_profile(),
+        "shadow": db.get_config("embedding_shadow_profile"),
+        "profiles": profiles,
+        "last_validation": db.get_config("embedding_validation"),
+    }
+
+
+def _search(db, prof, query, k, threshold):
+    """한 프로필로 질의 임베딩 + 두 테이블 벡터 검색 → (상위 k 키 목록, 임베딩 초, 검색 초)"""
+    t0 = time.perf_counter()
+    vec = get_embedding(query, prof["name"])
+    t_embed = time.perf_counter() - t0
+    hits = []
+    for table, rpc in TABLES.items():
+        rows = db.supabase.rpc(f"{rpc}{prof['rpc_suffix']}", {
+            "query_embedding": vec, "match_threshold": threshold, "match_count": k
+        }).execute().data or []
+        hits += [(r.get("similarity", 0), f"{table}_{r['id']}") for r in rows]
+    t_search = time.perf_counter() - t0 - t_embed
+    return [key for _, key in sorted(hits, reverse=True)[:k]], t_embed, t_search
+
+
+def _p(values, q):
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * q))], 3) if values else None
+
+
+def validate(db, queries, candidate, k=10, threshold=0.3, save=True):
+    """
+    같은 질의를 활성/후보 프로필로 각각 검색(dual-read)하여
+    - overlap@k: 활성 상위 k 중 후보 상위 k 에도 있는 비율
+    - 프로필별 임베딩/검색 지연 p50·p95
+    를 비교합니다. 결과는 app_config.embedding_validation 에 남깁니다.
+    """
+    active = embedding_profile(db.get_active_embedding_profile())
+    cand = embedding_profile(candidate)
+    overlaps, timings = [], {active["name"]: [], cand["name"]: []}
+    for q in queries:
+        ref, a_embed, a_search = _search(db, active, q, k, threshold)
+        got, c_embed, c_search = _search(db, cand, q, k, threshold)
+        if ref: overlaps.append(len(set(ref) & set(got)) / len(ref))
+        timings[active["name"]].append((a_embed, a_search))
+        timings[cand["name"]].append((c_embed, c_search))
+
+    report = {
+        "active": active["name"], "candidate": cand["name"], "queries": len(queries), "k": k,
+        "overlap_at_k": round(statistics.mean(overlaps), 3) if overlaps else None,
+        "latency": {name: {
+            "embed_p50": _p([e for e, _ in ts], 0.5), "embed_p95": _p([e for e, _ in ts], 0.95),
+            "search_p50": _p([s for _, s in ts], 0.5), "search_p95": _p([s for _, s in ts], 0.95),
+        } for name, ts in timings.items()},
+        "validated_at": datetime.now(timezone.utc).isoformat(),
+    }
+    if save: db.set_config("embedding_validation", report)
+    return report
+
+
+def set_shadow(db, profile):
+    """새 행에 함께 기록할 섀도 프로필 (None 이면 해제)"""
+    if profile and profile not in EMBEDDING_PROFILES:
+        return False, f"알 수 없는 프로필: {profile}"
+    if not db.set_config("embedding_shadow_profile", profile):
+        return False, "설정 저장 실패"
+    return True, f"섀도 프로필: {profile or '없음'}"
+
+
+def switch_profile(db, target, force=False, min_coverage=MIN_COVERAGE):
+    """
+    검색 프로필 전환. 대상 컬럼이 min_coverage 이상 채워져 있어야 하며(force 로 무시),
+    이전 프로필은 섀도로 남겨 새 행에도 계속 기록 → 문제 시 switch 로 즉시 롤백.
+    """
+    if target not in EMBEDDING_PROFILES:
+        return False, f"알 수 없는 프로필: {target}"
+    current = db.get_active_embedding_profile()
+    if target == current:
+        return False, f"이미 {target} 프로필로 검색 중입니다."
+
+    prof = embedding_profile(target)
+    if not force:
+        for table in TABLES:
+            filled, total = db.embedding_coverage(table, prof["column"])
+            if total and filled / total < min_coverage:
+                return False, f"{table}.{prof['column']} 채움 {filled}/{total} (기준 {min_coverage:.0%}) - 재임베딩을 먼저 완료하세요."
+
+    # 검색 프로필과 섀도(이전 프로필 계속 기록)를 한 번에 바꿔야 롤백이 안전함
+    if not db.set_configs({"embedding_profile": target, "embedding_shadow_profile": current}):
+        return False, "설정 저장 실패 (프로필 변경 없음)"
+    return True, f"검색 프로필 {current} → {target} 전환 (이전 프로필은 섀도로 유지)"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="임베딩 프로필 마이그레이션")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("status")
+    p_shadow = sub.add_parser("shadow"); p_shadow.add_argument("profile", nargs="?", default=None)
+    p_val = sub.add_parser("validate")
+    p_val.add_argument("queries", help="질문 목록 파일 (한 줄에 하나)")
+    p_val.add_argument("--candidate", default="v2")
+    p_val.add_argument("--k", type=int, default=10)
+    p_val.add_argument("--threshold", type=float, default=0.3)
+    p_switch = sub.add_parser("switch"); p_switch.add_argument("profile")
+    p_switch.add_argument("--force", action="store_true")
+    args = parser.parse_args(argv)
+
+    # api_server 가 Streamlit 스텁과 환경변수 기반 클라이언트 초기화를 담당
+    from api_server import _get_clients
+    _, db = _get_clients()
+
+    if args.cmd == "status":
+        print(json.dumps(profile_status(db), ensure_ascii=False, indent=2))
+    elif args.cmd == "shadow":
+        print(set_shadow(db, args.profile)[1])
+    elif args.cmd == "validate":
+        with open(args.queries, encoding="utf-8") as f:
+            queries = [q.strip() for q in f if q.strip()]
+        print(json.dumps(validate(db, queries, args.candidate, args.k, args.threshold), ensure_ascii=False, indent=2))
+    elif args.cmd == "switch":
+        ok, msg = switch_profile(db, args.profile, args.force)
+        print(("✅ " if ok else "❌ ") + msg)
+        if not ok: sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
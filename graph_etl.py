@@ -0,0 +1,172 @@
+"""
+graph_etl.py — 증분 지식 그래프 구축 (V263)
+manual_base / knowledge_base 를 id 키셋으로 필요한 컬럼만 읽고, graph_build_ledger 와
+content_hash · 추출기 버전(GRAPH_EXTRACTOR_VERSION)을 비교해 새로 들어왔거나 바뀐 문서만 트리플을 추출합니다.
+바뀐 문서의 옛 트리플은 replace_doc_triples 로 새 트리플과 함께 교체됩니다.
+
+[V264] compact_graph: 표기만 다른 노드를 하나의 대표 이름으로 합치고(별칭 표 등록),
+같은 문서에서 나온 중복 관계는 한 행으로 접어 weight(중복 수)로 남깁니다.
+
+사용처:
+- CLI      : python graph_etl.py --table knowledge_base   (야간 배치)
+             python graph_etl.py --compact
+- Streamlit: ui_admin 지식 재건축 탭 "그래프 변환 시작", 그래프 교정 탭 "노드 병합 / 중복 정리"
+"""
+import sys
+import argparse
+from collections import Counter, defaultdict
+
+from logic_ai import extract_triples_batch, content_hash, GRAPH_EXTRACTOR_VERSION
+from llm_scheduler import llm_priority, PRIORITY_BACKFILL
+from db_services import normalize_entity_key
+
+SOURCES = {
+    # 테이블: (읽을 컬럼, knowledge_graph.source_type)
+    "manual_base": ("id, content", "manual"),
+    "knowledge_base": ("id, issue, solution", "knowledge"),
+}
+PAGE_SIZE = 500
+EXTRACT_WINDOW = 60   # 한 번에 추출/교체하는 문서 수
+
+
+def doc_text(table_name, row):
+    if table_name == "knowledge_base":
+        return f"증상/이슈: {row.get('issue', '')}\n해결책/노하우: {row.get('solution', '')}"
+    return row.get("content", "")
+
+
+class GraphETL:
+    def __init__(self, ai_model, db, extractor_version=GRAPH_EXTRACTOR_VERSION):
+        self.ai_model = ai_model
+        self.db = db
+        self.extractor_version = extractor_version
+
+    def iter_pending(self, table_name):
+        """(id, text, hash) 묶음을 페이지 단위로 - 원장과 같은 해시/버전인 문서는 제외"""
+        columns, _ = SOURCES[table_name]
+        last_id = 0
+        while True:
+            rows = self.db.supabase.table(table_name).select(columns).gt("id", last_id)\
+                .order("id").limit(PAGE_SIZE).execute().data or []
+            if not rows: return
+            last_id = rows[-1]["id"]
+            docs = [(r["id"], doc_text(table_name, r)) for r in rows]
+            ledger = self.db.get_graph_ledger(table_name, [doc_id for doc_id, _ in docs])
+            pending = []
+            for doc_id, text in docs:
+                if not text or not text.strip(): continue
+                h = content_hash(text)
+                if ledger.get(doc_id) != (h, self.extractor_version):
+                    pending.append((doc_id, text, h))
+            yield len(rows), pending
+            if len(rows) < PAGE_SIZE: return
+
+    def run(self, table_name, on_progress=None):
+        """
+        on_progress(message) 는 페이지/묶음마다 호출
+        반환: {"scanned", "processed", "triples"}
+        """
+        _, source_type = SOURCES[table_name]
+        stats = {"scanned": 0, "processed": 0, "triples": 0}
+        with llm_priority(PRIORITY_BACKFILL):
+            for scanned, pending in self.iter_pending(table_name):
+                stats["scanned"] += scanned
+                for i in range(0, len(pending), EXTRACT_WINDOW):
+                    window = pending[i:i + EXTRACT_WINDOW]
+                    triples_by_id = extract_triples_batch(self.ai_model, [(doc_id, text) for doc_id, text, _ in window],
+                                                          priority=PRIORITY_BACKFILL)
+                    # 추출 결과가 빈 문서도 원장에 남겨 같은 내용을 다시 보내지 않음
+                    for doc_id, _, _ in window: triples_by_id.setdefault(doc_id, [])
+                    hashes = {doc_id: h for doc_id, _, h in window}
+                    stats["triples"] += self.db.replace_doc_triples(table_name, source_type, triples_by_id,
+                                                                    hashes, self.extractor_version)
+                    stats["processed"] += len(window)
+                    if on_progress:
+                        on_progress(f"{stats['scanned']}건 확인 · {stats['processed']}건 처리 · 트리플 {stats['triples']}개")
+                if on_progress and not pending:
+                    on_progress(f"{stats['scanned']}건 확인 · 변경 없음")
+        return stats
+
+
+def _load_graph(db, on_progress=None):
+    rows, last_id = [], 0
+    while True:
+        page = db.supabase.table("knowledge_graph").select("id, source, relation, target, doc_id, source_type, weight")\
+            .gt("id", last_id).order("id").limit(PAGE_SIZE * 2).execute().data or []
+        rows += page
+        if on_progress: on_progress(f"관계 {len(rows)}개 읽음")
+        if len(page) < PAGE_SIZE * 2: return rows
+        last_id = page[-1]["id"]
+
+
+def compact_graph(db, on_progress=None):
+    """
+    1) 노드 이름을 정규화 키로 묶어 대표 이름 결정 (별칭 표 우선, 없으면 가장 많이 쓰인 표기)
+    2) 대표 이름으로 바꾼 뒤 (source, relation, target, doc_id, source_type) 가 같은 관계는 한 행으로 합치고 weight 합산
+    3) 자동으로 합친 표기는 별칭 표에 등록 → 이후 저장되는 트리플도 같은 이름으로 기록
+    반환: {"relations", "nodes_before", "nodes_after", "renamed", "merged_edges"}
+    """
+    rows = _load_graph(db, on_progress)
+    aliases = db.get_entity_aliases(max_age=0)
+
+    surface = defaultdict(Counter)
+    for r in rows:
+        for name in (r["source"], r["target"]):
+            if name: surface[normalize_entity_key(name)][name] += r.get("weight") or 1
+    canonical = {}
+    for key, forms in surface.items():
+        # 동률이면 짧은 표기 (괄호 설명 등이 붙지 않은 쪽)
+        canonical[key] = aliases.get(key) or min(forms, key=lambda f: (-forms[f], len(f), f))
+
+    def _canon(name):
+        return canonical.get(normalize_entity_key(name), name) if name else name
+
+    groups = defaultdict(list)
+    for r in rows:
+        groups[(_canon(r["source"]), r["relation"], _canon(r["target"]), r.get("doc_id"), r.get("source_type"))].append(r)
+
+    updates, delete_ids = [], []
+    for (src, _, tgt, _, _), members in groups.items():
+        keep = min(members, key=lambda r: r["id"])
+        weight = sum(r.get("weight") or 1 for r in members)
+        if (keep["source"], keep["target"], keep.get("weight") or 1) != (src, tgt, weight):
+            updates.append({"id": keep["id"], "source": src, "target": tgt, "weight": weight})
+        delete_ids += [r["id"] for r in members if r["id"] != keep["id"]]
+
+    if updates or delete_ids:
+        if on_progress: on_progress(f"관계 {len(updates)}개 갱신 · {len(delete_ids)}개 병합 적용 중")
+        db.apply_graph_compaction(updates, delete_ids)
+    merged_names = {form: canonical[key] for key, forms in surface.items() if len(forms) > 1 for form in forms}
+    if merged_names: db.upsert_entity_aliases(merged_names)
+
+    return {
+        "relations": len(rows),
+        "nodes_before": sum(len(forms) for forms in surface.values()),
+        "nodes_after": len(set(canonical.values())),
+        "renamed": len(updates),
+        "merged_edges": len(delete_ids),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="증분 지식 그래프 구축")
+    parser.add_argument("--table", choices=list(SOURCES), action="append", help="대상 테이블 (기본: 전체)")
+    parser.add_argument("--compact", action="store_true", help="추출 대신 노드 병합 / 중복 관계 정리")
+    args = parser.parse_args(argv)
+
+    # api_server 가 Streamlit 스텁과 환경변수 기반 클라이언트 초기화를 담당
+    from api_server import _get_clients
+    ai_model, db = _get_clients()
+    if args.compact:
+        stats = compact_graph(db, on_progress=lambda msg: print(f"[compact] {msg}", file=sys.stderr))
+        print(f"✅ 관계 {stats['relations']} · 노드 {stats['nodes_before']} → {stats['nodes_after']} · "
+              f"갱신 {stats['renamed']} · 병합 {stats['merged_edges']}")
+        return
+    etl = GraphETL(ai_model, db)
+    for table_name in args.table or list(SOURCES):
+        stats = etl.run(table_name, on_progress=lambda msg: print(f"[{table_name}] {msg}", file=sys.stderr))
+        print(f"✅ {table_name}: 확인 {stats['scanned']} · 처리 {stats['processed']} · 트리플 {stats['triples']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+"""
+ingest_pipeline.py — 매뉴얼 학습 엔진 (V254)
+Streamlit 스크립트와 분리된 재개 가능한 PDF 학습 파이프라인입니다.
+단계: extract → chunk → metadata → embed → insert → triples → retire → done
+각 단계/청크 묶음이 끝날 때마다 ingest_jobs.state 에 체크포인트를 남겨,
+중단된 작업은 마지막으로 끝난 청크 다음부터 이어서 진행합니다.
+
+[V258] 같은 파일명 재업로드 시 청크 content_hash 를 LLM 호출 전에 비교하여
+바뀌지 않은 청크는 기존 행을 그대로 쓰고, 새/변경 청크만 임베딩·저장하며,
+새 버전에서 사라진 청크는 마지막 retire 단계에서 정리합니다.
+
+사용처:
+- CLI      : python ingest_pipeline.py manual.pdf --mode vector [--ocr]
+             python ingest_pipeline.py --resume 12 [manual.pdf]
+- API      : POST /ingest, GET /jobs/{id}, POST /jobs/{id}/resume (api_server.py)
+- Streamlit: ui_admin.show_manual_upload_ui (작업 생성 + 진행률 조회만 담당)
+"""
+import os
+import sys
+import uuid
+import argparse
+import threading
+from contextlib import contextmanager
+
+from logic_ai import (
+    clean_text_for_db, content_hash, iter_semantic_chunks, get_embeddings_batch, embedding_profile,
+    extract_document_metadata_ai, build_document_head, infer_chunk_metadata, extract_triples_batch,
+    GRAPH_EXTRACTOR_VERSION,
+)
+from llm_scheduler import llm_priority, PRIORITY_INGESTION
+from pdf_extract import extract_pdf_pages_detailed, OCR_AVAILABLE
+
+STAGES = ["extract", "chunk", "metadata", "embed", "insert", "triples", "retire", "done"]
+WINDOW_SIZE = 50       # 체크포인트 단위 (청크 수)
+MIN_TEXT_CHARS = 100
+JOB_STALE_SEC = 300    # running 인데 이 시간 동안 체크포인트/하트비트가 없으면 멈춘 작업으로 보고 재개 허용
+JOB_HEARTBEAT_SEC = 60 # 실행 중 작업 행 updated_at 갱신 주기 (429 백오프 등으로 체크포인트 사이가 길어도 살아 있음을 표시)
+CHUNK_KEYS = ("chunks", "spans", "hashes", "head")   # 분할 단계에서 1회만 저장 (ingest_job_chunks)
+
+
+class IngestError(Exception):
+    pass
+
+
+class JobOwnershipLost(IngestError):
+    """다른 곳에서 작업을 다시 선점함 → 이 엔진은 즉시 중단"""
+
+
+def new_owner_token():
+    return uuid.uuid4().hex
+
+
+@contextmanager
+def job_heartbeat(db, job_id, owner, interval=JOB_HEARTBEAT_SEC):
+    """실행하는 동안 작업 행의 updated_at 을 주기적으로 갱신 (소유권을 잃으면 갱신 중단)"""
+    stop = threading.Event()
+
+    def _beat():
+        while not stop.wait(interval):
+            if db.update_ingest_job(job_id, owner=owner) is False: return
+
+    threading.Thread(target=_beat, daemon=True, name=f"heartbeat-{job_id}").start()
+    try:
+        yield
+    finally:
+        stop.set()
+
+
+class IngestionEngine:
+    def __init__(self, ai_model, db):
+        self.ai_model = ai_model
+        self.db = db
+        self._on_progress = None
+        self._owner = None
+        self._chunks_saved = False
+
+    # ---------------------------------------------------------
+    # 작업 생성 / 선점 / 실행
+    # ---------------------------------------------------------
+    def create_job(self, file_name, mode="vector", use_ocr=False):
+        if mode not in ("vector", "graph"):
+            raise IngestError(f"지원하지 않는 학습 모드: {mode}")
+        owner = new_owner_token()
+        job = self.db.create_ingest_job(file_name, mode, use_ocr, owner=owner)
+        if not job: raise IngestError("ingest_jobs 작업 생성 실패")
+        self._owner = owner
+        return job
+
+    def claim(self, job_id):
+        """재개 전 선점 (완료됐거나 다른 곳에서 실행 중이면 None)"""
+        owner = new_owner_token()
+        job = self.db.claim_ingest_job(job_id, owner, JOB_STALE_SEC)
+        if job: self._owner = owner
+        return job
+
+    def start_background(self, job_id, file_bytes=None, on_progress=None):
+        """별도 스레드에서 실행 (Streamlit 재실행/브라우저 종료와 무관하게 진행)"""
+        t = threading.Thread(target=self.run, args=(job_id, file_bytes, on_progress), daemon=True,
+                             name=f"ingest-{job_id}")
+        t.start()
+        return t
+
+    def run(self, job_id, file_bytes=None, on_progress=None):
+        job = self.db.get_ingest_job(job_id)
+        if not job: raise IngestError(f"작업 #{job_id} 없음")
+        if job["status"] == "done": return job
+
+        if not self._owner and not self.claim(job_id):
+            raise IngestError(f"작업 #{job_id} 는 다른 곳에서 실행 중입니다.")
+
+        self._on_progress = on_progress
+        chunk_data = self.db.get_ingest_job_chunks(job_id)
+        self._chunks_saved = bool(chunk_data)
+        state = {**chunk_data, **(job.get("state") or {})}
+        try:
+            with llm_priority(PRIORITY_INGESTION), job_heartbeat(self.db, job_id, self._owner):
+                stage = job.get("stage") or "extract"
+                if stage == "extract":
+                    state = self._stage_extract(job, state, file_bytes); stage = "chunk"
+                if stage == "chunk":
+                    state = self._stage_chunk(job, state)
+                    stage = "metadata" if job["mode"] == "vector" else "insert"
+                if stage == "metadata":
+                    state = self._stage_metadata(job, state); stage = "embed"
+                if stage in ("embed", "insert"):
+                    state = self._stage_embed_insert(job, state)
+                    stage = "triples" if job["mode"] == "graph" else "retire"
+                if stage == "triples":
+                    state = self._stage_triples(job, state); stage = "retire"
+                if stage == "retire":
+                    state = self._stage_retire(job, state)
+
+            total = len(state.get("chunks", []))
+            self._checkpoint(job, "done", state, 1.0,
+                             f"완료: {total}개 청크 (신규/변경 {len(state.get('todo', []))}, "
+                             f"재사용 {state.get('reused', 0)}, 제거 {state.get('retired', 0)})", status="done")
+        except Exception as e:
+            # 소유권을 잃었다면 새 소유자의 행이므로 조건부 갱신이 아무것도 바꾸지 않음
+            self.db.update_ingest_job(job_id, owner=self._owner, status="failed", message=str(e)[:500])
+            raise
+        return self.db.get_ingest_job(job_id)
+
+    # ---------------------------------------------------------
+    # 단계별 처리
+    # ---------------------------------------------------------
+    def _checkpoint(self, job, stage, state, progress, message, status="running"):
+        if not self._chunks_saved and "chunks" in state:
+            self.db.save_ingest_job_chunks(job["id"], {k: state[k] for k in CHUNK_KEYS if k in state})
+            self._chunks_saved = True
+        # 청크 본문은 빼고 진행 커서만 기록
+        cursors = {k: v for k, v in state.items() if k not in CHUNK_KEYS}
+        if "chunks" in state: cursors["total_chunks"] = len(state["chunks"])
+        if self.db.update_ingest_job(job["id"], owner=self._owner, stage=stage, state=cursors,
+                                     progress=round(progress, 4), message=message, status=status) is False:
+            raise JobOwnershipLost(f"작업 #{job['id']} 를 다른 곳에서 재개하여 이 실행을 중단합니다.")
+        if self._on_progress: self._on_progress(stage, progress, message)
+
+    def _stage_extract(self, job, state, file_bytes):
+        if file_bytes is None:
+            raise IngestError("텍스트 추출 단계부터 재개하려면 원본 PDF 가 필요합니다.")
+        reported = {"step": 0}
+
+        def _page_progress(done, total):
+            # 페이지 추출은 10% 단위로만 작업 행을 갱신 (페이지마다 DB 쓰기 방지)
+            step = int(done / total * 10)
+            if step > reported["step"] or done == total:
+                reported["step"] = step
+                self._checkpoint(job, "extract", state, done / total * 0.2, f"페이지 추출 {done}/{total}")
+
+        # [V257] 텍스트 레이어가 없거나 깨진 페이지만 자동 OCR (use_ocr 는 전체 강제 OCR)
+        page_texts, ocr_pages = extract_pdf_pages_detailed(file_bytes, job.get("use_ocr"), on_progress=_page_progress)
+        if len("".join(page_texts).strip()) < MIN_TEXT_CHARS:
+            hint = "강제 OCR 옵션을 확인하세요" if OCR_AVAILABLE else "OCR 라이브러리가 설치되지 않았습니다"
+            raise IngestError(f"텍스트 추출 실패 ({hint})")
+        state = {"pages": page_texts}
+        ocr_note = f" (OCR {len(ocr_pages)}페이지)" if ocr_pages else ""
+        self._checkpoint(job, "chunk", state, 0.2, f"{len(page_texts)}페이지 추출 완료{ocr_note}")
+        return state
+
+    def _domain(self, job):
+        return "기술지식" if job["mode"] == "vector" else "기술지식_GraphSource"
+
+    def _plan_dedupe(self, job, hashes):
+        """기존 행과 해시 비교 → (새로 처리할 청크 번호, 재사용 행 수, 정리할 행 id)"""
+        existing = self.db.get_manual_chunks_for_file(job["file_name"], self._domain(job))
+        by_hash = {}
+        for row in existing:
+            h = row.get("content_hash") or content_hash(row.get("content"))
+            by_hash.setdefault(h, []).append(row["id"])
+
+        keep, todo = set(), []
+        for idx, h in enumerate(hashes):
+            ids = by_hash.get(h)
+            if ids: keep.add(ids.pop(0))
+            else: todo.append(idx)
+        retire = [row["id"] for row in existing if row["id"] not in keep]
+        return todo, len(keep), retire
+
+    def _stage_chunk(self, job, state):
+        pages = state.get("pages") or []
+        # [V259] 페이지 단위 스트리밍 분할 (한/영 문장 경계, 토큰 기준 + 겹침, 페이지 범위 기록)
+        chunks, spans = [], []
+        for c in iter_semantic_chunks(pages):
+            chunks.append(c["text"])
+            spans.append([c["page_start"], c["page_end"]])
+        hashes = [content_hash(c) for c in chunks]
+        todo, reused, retire = self._plan_dedupe(job, hashes)
+        # 페이지 원문은 문서 태깅용 앞부분만 남기고 버려 체크포인트를 가볍게 유지
+        self._chunks_saved = False   # 새 분할 결과를 다음 체크포인트에서 1회 저장
+        state = {
+            "chunks": chunks, "spans": spans, "hashes": hashes, "head": build_document_head(pages),
+            "todo": todo, "reused": reused, "retire": retire, "next_chunk": 0, "doc_ids": [],
+        }
+        self._checkpoint(job, "metadata" if job["mode"] == "vector" else "insert", state, 0.25,
+                         f"{len(chunks)}개 청크 분할 완료 (신규/변경 {len(todo)}, 재사용 {reused}, 제거 예정 {len(retire)})")
+        return state
+
+    def _stage_metadata(self, job, state):
+        # 바뀐 청크가 없으면 문서 태깅 LLM 호출도 생략
+        state["doc_meta"] = extract_document_metadata_ai(self.ai_model, state.get("head", "")) if state.get("todo") else {}
+        self._checkpoint(job, "embed", state, 0.3, "문서 메타데이터 분석 완료")
+        return state
+
+    def _stage_embed_insert(self, job, state):
+        chunks, hashes = state["chunks"], state["hashes"]
+        spans = state.get("spans") or [[None, None]] * len(chunks)
+        todo = state["todo"]
+        start = state.get("next_chunk", 0)
+        is_vector = job["mode"] == "vector"
+        # [V262] 활성 프로필 + 마이그레이션 중인 섀도 프로필 컬럼을 함께 채움
+        profiles = [embedding_profile(n) for n in self.db.get_write_embedding_profiles()] if is_vector else []
+        # 직전 실행이 체크포인트 전에 끊겼다면 그 묶음에서 들어간 행을 먼저 정리
+        if start < len(todo):
+            self.db.supabase.table("manual_base").delete().eq("ingest_job_id", job["id"]).gte("chunk_index", todo[start]).execute()
+
+        for w_start in range(start, len(todo), WINDOW_SIZE):
+            idxs = todo[w_start:w_start + WINDOW_SIZE]
+            window = [chunks[i] for i in idxs]
+            base_progress = 0.3 + 0.4 * w_start / max(len(todo), 1)
+
+            vectors = {}
+            if is_vector:
+                self._checkpoint(job, "embed", state, base_progress, f"임베딩 {w_start + 1}~{w_start + len(window)}/{len(todo)}")
+                for prof in profiles:
+                    vectors[prof["name"]] = get_embeddings_batch(window, priority=PRIORITY_INGESTION, profile=prof["name"])
+
+            rows = []
+            for i, chunk in enumerate(window):
+                row = {
+                    "content": clean_text_for_db(chunk),
+                    "content_hash": hashes[idxs[i]],
+                    "file_name": job["file_name"],
+                    "domain": self._domain(job),
+                    "semantic_version": 2,
+                    "ingest_job_id": job["id"],
+                    "chunk_index": idxs[i],
+                    "page_start": spans[idxs[i]][0],
+                    "page_end": spans[idxs[i]][1],
+                }
+                if is_vector:
+                    meta = infer_chunk_metadata(chunk, state.get("doc_meta") or {})
+                    row.update({
+                        "manufacturer": self.db._clean_text(meta.get('manufacturer')),
+                        "model_name": self.db._clean_text(meta.get('model_name')),
+                        "measurement_item": self.db._normalize_tags(meta.get('measurement_item')),
+                    })
+                    for prof in profiles:
+                        vec = vectors[prof["name"]][i]
+                        row[prof["column"]] = vec or None
+                        row[prof["model_column"]] = prof["version"] if vec else None
+                rows.append(row)
+
+            inserted = sorted(self.db.bulk_insert("manual_base", rows), key=lambda r: r.get("chunk_index", 0))
+            state["doc_ids"] = state.get("doc_ids", [])[:w_start] + [r["id"] for r in inserted]
+            state["next_chunk"] = w_start + len(window)
+            self._checkpoint(job, "insert", state, 0.3 + 0.4 * state["next_chunk"] / len(todo),
+                             f"저장 {state['next_chunk']}/{len(todo)}")
+        return state
+
+    def _stage_triples(self, job, state):
+        chunks, hashes, todo, doc_ids = state["chunks"], state["hashes"], state["todo"], state.get("doc_ids", [])
+        start = state.get("next_triple", 0)
+        graph_count = state.get("graph_count", 0)
+        for w_start in range(start, len(doc_ids), WINDOW_SIZE):
+            ids = doc_ids[w_start:w_start + WINDOW_SIZE]
+            idxs = todo[w_start:w_start + len(ids)]
+            triples_by_id = extract_triples_batch(self.ai_model, [(doc_id, chunks[i]) for doc_id, i in zip(ids, idxs)],
+                                                  priority=PRIORITY_INGESTION)
+            for doc_id in ids: triples_by_id.setdefault(doc_id, [])
+            # [V263] 기존 트리플 교체 + 그래프 빌드 원장 기록 (재개 시 중복 방지, Graph ETL 재처리 방지)
+            graph_count += self.db.replace_doc_triples("manual_base", "manual", triples_by_id,
+                                                       {doc_id: hashes[i] for doc_id, i in zip(ids, idxs)},
+                                                       GRAPH_EXTRACTOR_VERSION)
+            state["next_triple"] = w_start + len(ids)
+            state["graph_count"] = graph_count
+            self._checkpoint(job, "triples", state, 0.7 + 0.3 * state["next_triple"] / max(len(doc_ids), 1),
+                             f"관계 추출 {state['next_triple']}/{len(doc_ids)} (트리플 {graph_count}개)")
+        return state
+
+    def _stage_retire(self, job, state):
+        # 새 버전이 모두 저장된 뒤에 옛 청크를 지워 검색 공백이 생기지 않게 함 (재실행해도 안전)
+        retire = state.get("retire") or []
+        if retire:
+            state["retired"] = state.get("retired", 0) + self.db.retire_manual_chunks(retire)
+            state["retire"] = []
+        self._checkpoint(job, "retire", state, 1.0, f"이전 청크 {state.get('retired', 0)}개 정리")
+        return state
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PDF 매뉴얼 학습 (재개 가능)")
+    parser.add_argument("pdf", nargs="?", help="PDF 파일 경로")
+    parser.add_argument("--mode", choices=["vector", "graph"], default="vector")
+    parser.add_argument("--ocr", action="store_true", help="전체 페이지 강제 OCR (기본: 텍스트 없는 페이지만 자동 OCR)")
+    parser.add_argument("--resume", type=int, default=None, help="재개할 작업 ID")
+    args = parser.parse_args(argv)
+
+    # api_server 가 Streamlit 스텁과 환경변수 기반 클라이언트 초기화를 담당
+    from api_server import _get_clients
+    ai_model, db = _get_clients()
+    engine = IngestionEngine(ai_model, db)
+
+    file_bytes = None
+    if args.pdf:
+        with open(args.pdf, "rb") as f: file_bytes = f.read()
+
+    if args.resume:
+        job_id = args.resume
+        if not engine.claim(job_id):
+            parser.error(f"작업 #{job_id} 는 완료되었거나 다른 곳에서 실행 중입니다.")
+    elif args.pdf:
+        job_id = engine.create_job(os.path.basename(args.pdf), args.mode, args.ocr)["id"]
+    else:
+        parser.error("PDF 경로 또는 --resume 작업 ID 가 필요합니다.")
+
+    print(f"📥 작업 #{job_id} 시작")
+    job = engine.run(job_id, file_bytes,
+                     on_progress=lambda stage, p, msg: print(f"[{stage:>8}] {p * 100:5.1f}% {msg}", file=sys.stderr))
+    print(f"✅ 작업 #{job_id}: {job.get('status')} - {job.get('message')}")
+
+
+if __name__ == "__main__":
+    main()
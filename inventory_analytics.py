@@ -0,0 +1,140 @@
+"""
+inventory_analytics.py — 소모품 소모 속도 · 재고 소진 예측 (V268)
+inventory_logs 를 품목 × 날짜 일별 집계(inventory_usage_daily)로 증분 누적하고,
+최근 사용량으로 일평균 소모량, 남은 일수, 재주문점을 계산합니다.
+- refresh_usage: 아직 집계하지 않은 로그(inventory_logs.aggregated = false)만 읽어 집계에 더함 (sql/inventory_usage.sql)
+- forecast: 품목 × 최근 WINDOW_DAYS 일 행렬을 만들어 NumPy 로 한 번에 계산
+- 재주문점 = 일평균 × 조달기간 + 안전재고(Z × 표준편차 × √조달기간)
+
+사용처:
+    ui_inventory (재고 현황판), api_server (GET /inventory/forecast)
+    python inventory_analytics.py [--lead-time 14] [--alerts]   # 크론 등에서 집계 갱신 + 요약
+"""
+import os
+import sys
+import argparse
+
+import numpy as np
+import pandas as pd
+
+WINDOW_DAYS = 28          # 평균/변동을 볼 기간
+RECENT_DAYS = 7           # 최근 추세 (사용량이 늘면 이쪽을 따름)
+SERVICE_Z = 1.65          # 안전재고 계수 (약 95% 서비스 수준)
+LEAD_TIME_DAYS = int(os.environ.get("INVENTORY_LEAD_TIME_DAYS", 14))
+LOG_PAGE_SIZE = 1000
+LOCAL_TZ = "Asia/Seoul"
+
+STATUS_OUT = "품절"
+STATUS_REORDER = "재주문 필요"
+STATUS_WATCH = "주의"
+STATUS_OK = "정상"
+STATUS_IDLE = "사용 없음"
+
+
+def aggregate_logs(logs):
+    """이력 행 → 품목 × 날짜 일별 증분 [{"item_id", "day", "qty_in", "qty_out", "moves"}]"""
+    df = pd.DataFrame(logs, columns=["id", "item_id", "change_type", "quantity", "created_at"]).dropna(subset=["item_id"])
+    if df.empty: return []
+    qty = pd.to_numeric(df["quantity"], errors="coerce").fillna(0).astype(int)
+    df = df.assign(
+        item_id=df["item_id"].astype(int),
+        day=pd.to_datetime(df["created_at"], utc=True, format="ISO8601").dt.tz_convert(LOCAL_TZ).dt.strftime("%Y-%m-%d"),
+        qty_in=qty.where(df["change_type"] == "입고", 0),
+        qty_out=qty.where(df["change_type"] == "출고", 0),
+        moves=1,
+    )
+    daily = df.groupby(["item_id", "day"], as_index=False)[["qty_in", "qty_out", "moves"]].sum()
+    return [{k: (v if k == "day" else int(v)) for k, v in row.items()} for row in daily.to_dict("records")]
+
+
+def refresh_usage(db, on_progress=None):
+    """
+    아직 집계하지 않은 로그를 페이지 단위로 읽어 일별 집계에 더합니다. 반영한 로그 수를 반환.
+    페이지마다 로그 표시 + 집계 증분이 한 트랜잭션이므로 중간에 끊겨도 중복/누락 없이 이어감
+    (id 워터마크와 달리 늦게 커밋된 로그도 다음 실행에서 잡힘)
+    """
+    processed = 0
+    while True:
+        logs = db.get_unaggregated_inventory_logs(LOG_PAGE_SIZE)
+        if not logs: return processed
+        processed += db.merge_inventory_usage(logs, aggregate_logs(logs))
+        if on_progress: on_progress(processed)
+        if len(logs) < LOG_PAGE_SIZE: return processed
+
+
+def forecast(items, usage, as_of=None, lead_time_days=None, window=WINDOW_DAYS):
+    """
+    품목별 소진 예측 DataFrame (남은 일수 오름차순)
+    - items: inventory_items 행, usage: inventory_usage_daily 행
+    - 일평균 = max(최근 RECENT_DAYS 평균, window 평균)  (사용량 증가에 보수적으로 대응)
+    """
+    lead = LEAD_TIME_DAYS if lead_time_days is None else lead_time_days
+    as_of = as_of or pd.Timestamp.now(tz=LOCAL_TZ).strftime("%Y-%m-%d")
+    cols = ["id", "category", "item_name", "model_name", "location", "current_qty"]
+    item_df = pd.DataFrame(items, columns=cols)
+    if item_df.empty: return item_df
+
+    days = pd.date_range(end=as_of, periods=window, freq="D").strftime("%Y-%m-%d")
+    use_df = pd.DataFrame(usage, columns=["item_id", "day", "qty_out"])
+    matrix = use_df.pivot_table(index="item_id", columns="day", values="qty_out", aggfunc="sum") \
+        .reindex(index=item_df["id"], columns=days, fill_value=0).fillna(0).to_numpy(dtype=float)
+
+    qty = pd.to_numeric(item_df["current_qty"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    avg = matrix.mean(axis=1)
+    recent = matrix[:, -RECENT_DAYS:].mean(axis=1)
+    rate = np.maximum(avg, recent)
+    std = matrix.std(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_left = np.where(rate > 0, np.maximum(qty, 0) / rate, np.inf)
+    safety = np.ceil(SERVICE_Z * std * np.sqrt(lead))
+    reorder_point = np.ceil(rate * lead) + safety
+
+    status = np.select(
+        [qty <= 0, rate <= 0, qty <= reorder_point, days_left <= lead * 2],
+        [STATUS_OUT, STATUS_IDLE, STATUS_REORDER, STATUS_WATCH],
+        default=STATUS_OK,
+    )
+    today = pd.Timestamp(as_of)
+    stockout = [(today + pd.Timedelta(days=int(d))).strftime("%Y-%m-%d") if np.isfinite(d) else None for d in days_left]
+
+    out = item_df.assign(
+        used_window=matrix.sum(axis=1).astype(int),
+        daily_rate=rate.round(2),
+        days_left=np.where(np.isfinite(days_left), days_left.round(1), np.nan),
+        stockout_date=stockout,
+        safety_stock=safety.astype(int),
+        reorder_point=reorder_point.astype(int),
+        reorder_qty=np.maximum(reorder_point + np.ceil(rate * lead) - qty, 0).astype(int),
+        status=status,
+    )
+    return out.sort_values(["days_left", "item_name"], na_position="last").reset_index(drop=True)
+
+
+def inventory_forecast(db, lead_time_days=None, refresh=True, items=None):
+    """집계 증분 반영 후 예측 (집계가 최신이면 로그 조회 1회로 끝남, items 를 주면 품목 재조회 생략)"""
+    if refresh:
+        try: refresh_usage(db)
+        except Exception as e: print(f"재고 사용량 집계 갱신 실패 (기존 집계로 예측): {e}")
+    since = (pd.Timestamp.now(tz=LOCAL_TZ) - pd.Timedelta(days=WINDOW_DAYS)).strftime("%Y-%m-%d")
+    if items is None: items = db.get_inventory_items()
+    return forecast(items, db.get_inventory_usage(since), lead_time_days=lead_time_days)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="소모품 사용량 집계 갱신 + 소진 예측")
+    parser.add_argument("--lead-time", type=int, default=None, help=f"조달 기간(일) (기본 {LEAD_TIME_DAYS})")
+    parser.add_argument("--alerts", action="store_true", help="품절/재주문 필요 품목만 출력")
+    args = parser.parse_args(argv)
+
+    # api_server 가 Streamlit 스텁과 환경변수 기반 클라이언트 초기화를 담당
+    from api_server import _get_clients
+    _, db = _get_clients()
+    n = refresh_usage(db, on_progress=lambda done: print(f"[usage] 로그 {done}건 반영", file=sys.stderr))
+    print(f"✅ 새 로그 {n}건 집계 반영", file=sys.stderr)
+    df = inventory_forecast(db, args.lead_time, refresh=False)
+    if args.alerts: df = df[df["status"].isin([STATUS_OUT, STATUS_REORDER])]
+    print(df[["item_name", "model_name", "current_qty", "daily_rate", "days_left", "reorder_point", "status"]].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
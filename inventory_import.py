@@ -0,0 +1,70 @@
+"""
+inventory_import.py — 엑셀/CSV 재고 일괄 등록 계획 (V266)
+행마다 존재 확인 → 갱신/등록 → 이력 기록을 왕복하던 방식 대신,
+기존 품목 목록(1회 조회)과 업로드 시트를 pandas 로 한 번에 대조해
+행별 처리 구분(신규/갱신/변경 없음/건너뜀/실패)을 계산합니다.
+- 실제 쓰기는 DBManager.bulk_import_inventory 가 배치로 수행
+- 중복 기준은 기존과 같이 품명 + 기기모델(model_name), 시트 안 중복은 마지막 행 적용
+"""
+import pandas as pd
+
+STATUS_NEW = "신규"
+STATUS_UPDATE = "갱신"
+STATUS_SAME = "변경 없음"
+STATUS_SKIP = "건너뜀"
+STATUS_FAIL = "실패"
+
+REPORT_COLUMNS = ["row", "item_name", "model_name", "qty", "status", "message"]
+
+
+def _text(df, col, default=""):
+    """NaN 은 default, 나머지는 문자열 + 앞뒤 공백 제거"""
+    if col not in df.columns: return pd.Series(default, index=df.index, dtype=object)
+    s = df[col]
+    return s.where(s.notna(), default).astype(str).str.strip()
+
+
+def build_import_plan(df, existing_items):
+    """
+    업로드 시트(df, 컬럼명은 DB 컬럼으로 변환된 상태)와 기존 품목으로 행별 계획을 만듭니다.
+    반환 DataFrame: row(엑셀 행 번호), 품목 컬럼들, qty, item_id, old_qty, status, message
+    """
+    df = df.reset_index(drop=True)
+    plan = pd.DataFrame({
+        "row": range(2, len(df) + 2),   # 엑셀 기준 (1행은 머리글)
+        "category": _text(df, "category", "기타 소모품"),
+        "item_name": _text(df, "item_name"),
+        "model_name": _text(df, "model_name"),
+        "location": _text(df, "location"),
+        "manufacturer": _text(df, "manufacturer"),
+        "measurement_item": _text(df, "measurement_item", "공통"),
+        "description": _text(df, "description"),
+    })
+    raw_qty = df["qty"] if "qty" in df.columns else pd.Series(0, index=df.index)
+    qty = pd.to_numeric(raw_qty, errors="coerce")
+    bad_qty = qty.isna() & raw_qty.notna()
+    plan["qty"] = qty.fillna(0).astype(int)
+    plan["status"] = ""
+    plan["message"] = ""
+
+    no_name = plan["item_name"].isin(["", "nan"])
+    plan.loc[no_name, ["status", "message"]] = [STATUS_SKIP, "품명 없음"]
+    plan.loc[bad_qty & ~no_name, ["status", "message"]] = [STATUS_FAIL, "수량이 숫자가 아님"]
+    pending = plan["status"] == ""
+    dup = plan[pending].duplicated(["item_name", "model_name"], keep="last").reindex(plan.index, fill_value=False)
+    plan.loc[dup, ["status", "message"]] = [STATUS_SKIP, "아래 행에 같은 품목이 있어 마지막 행 적용"]
+    pending &= ~dup
+
+    existing = pd.DataFrame(existing_items or [], columns=["id", "item_name", "model_name", "current_qty"])
+    existing["item_name"] = _text(existing, "item_name")    # 시트와 같은 정규화 (앞뒤 공백 있는 기존 이름도 일치)
+    existing["model_name"] = _text(existing, "model_name")
+    existing = existing.drop_duplicates(["item_name", "model_name"], keep="first") \
+        .rename(columns={"id": "item_id", "current_qty": "old_qty"})
+    plan = plan.merge(existing, on=["item_name", "model_name"], how="left")
+    plan["old_qty"] = pd.to_numeric(plan["old_qty"], errors="coerce").fillna(0).astype(int)
+
+    found = plan["item_id"].notna()
+    plan.loc[pending & ~found, "status"] = STATUS_NEW
+    plan.loc[pending & found & (plan["qty"] != plan["old_qty"]), "status"] = STATUS_UPDATE
+    plan.loc[pending & found & (plan["qty"] == plan["old_qty"]), "status"] = STATUS_SAME
+    return plan
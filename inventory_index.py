@@ -0,0 +1,163 @@
+"""
+inventory_index.py — 재고 품목 인메모리 검색 인덱스 (V265)
+품명/모델명/설명/분류/제조사/측정항목을 한글 자모 단위로 풀어 2-gram 역색인을 만들고,
+후보 품목만 제한 편집거리(부분 문자열 정렬)로 채점합니다.
+- "vavle" → "valve", "밸부" → "밸브" 같은 오타도 찾음 (한글은 자모 1개 차이 = 편집 1회)
+- DB 왕복 없이 메모리에서 바로 순위를 계산 (DBManager 가 캐시하고 재고 쓰기 시 무효화)
+"""
+import re
+import unicodedata
+from collections import defaultdict
+
+_CHO = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+_JUNG = "ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ"
+_JONG = " ㄱㄲㄳㄴㄵㄶㄷㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅄㅅㅆㅇㅈㅊㅋㅌㅍㅎ"
+_STRIP_RE = re.compile(r'[\s\-_·.,:;/\\()\[\]{}"\'`+*#]+')
+
+# 필드별 가중치 (품명/모델명 일치가 설명 일치보다 우선)
+FIELDS = {
+    "item_name": 3.0,
+    "model_name": 3.0,
+    "category": 1.5,
+    "manufacturer": 1.5,
+    "measurement_item": 1.0,
+    "description": 1.0,
+}
+STOP_WORDS = {'재고', '수량', '몇개', '몇', '개', '있어', '있나요', '알려줘', '확인', '조회', '어디', '있니', '현황', '보여줘', '소모품'}
+
+
+def decompose_hangul(text):
+    """완성형 한글 음절을 초/중/종성 자모로 풀어 씁니다. (그 외 문자는 그대로)"""
+    out = []
+    for ch in text:
+        code = ord(ch) - 0xAC00
+        if 0 <= code < 11172:
+            out.append(_CHO[code // 588])
+            out.append(_JUNG[(code % 588) // 28])
+            if code % 28: out.append(_JONG[code % 28])
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+def normalize(text):
+    """비교용 문자열: NFKC · 소문자 · 공백/구두점 제거 · 한글 자모 분해"""
+    text = unicodedata.normalize("NFKC", str(text or "")).lower()
+    return decompose_hangul(_STRIP_RE.sub("", text))
+
+
+def _bigrams(s):
+    return {s[i:i + 2] for i in range(len(s) - 1)}
+
+
+def fuzzy_find(pattern, text, max_dist):
+    """
+    text 의 어떤 부분 문자열과 pattern 의 최소 편집거리 (max_dist 초과면 None)
+    text 쪽 앞뒤는 무료로 건너뛰는 반-전역 정렬, 인접 글자 뒤바뀜도 1회로 계산
+    → "vavle" 는 "ballvalve" 안에서 거리 1
+    """
+    if pattern in text: return 0
+    prev2, prev = None, [0] * (len(text) + 1)
+    for i, pc in enumerate(pattern, start=1):
+        cur = [i] + [0] * len(text)
+        for j, tc in enumerate(text, start=1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (pc != tc))
+            if prev2 is not None and j > 1 and pc == text[j - 2] and pattern[i - 2] == tc:
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > max_dist: return None
+        prev2, prev = prev, cur
+    best = min(prev)
+    return best if best <= max_dist else None
+
+
+def max_edits(pattern):
+    """패턴 길이(자모 기준)에 비례한 허용 편집 수"""
+    n = len(pattern)
+    return 0 if n < 3 else 1 if n <= 5 else 2 if n <= 10 else 3
+
+
+class InventoryIndex:
+    MAX_FUZZY_TOKENS = 200   # 오타 비교(편집거리)를 계산할 최대 단어 수 (2-gram 공유 수 상위)
+
+    def __init__(self, items):
+        self.items = list(items)
+        self.fields = []                       # 품목별 {필드: 정규화 문자열}
+        self.item_grams = defaultdict(set)     # 2-gram → 품목 번호 (정확 일치 후보)
+        self.vocab = defaultdict(list)         # 단어 → [(품목 번호, 필드)] (오타 비교는 고유 단어 단위)
+        self.token_grams = defaultdict(set)    # 2-gram → 단어
+        for idx, item in enumerate(self.items):
+            normed = {}
+            for field in FIELDS:
+                raw = item.get(field)
+                if not raw: continue
+                normed[field] = normalize(raw)
+                for g in _bigrams(normed[field]): self.item_grams[g].add(idx)
+                for word in str(raw).split():
+                    token = normalize(word)
+                    if not token: continue
+                    if token not in self.vocab:
+                        for g in _bigrams(token): self.token_grams[g].add(token)
+                    self.vocab[token].append((idx, field))
+            self.fields.append(normed)
+
+    def __len__(self):
+        return len(self.items)
+
+    def _exact(self, pattern):
+        """pattern 이 필드 안에 그대로 들어 있는 품목 {번호: 점수} (공백 무시 → "펌프튜브" == "펌프 튜브")"""
+        grams = _bigrams(pattern)
+        if grams:
+            sets = sorted((self.item_grams.get(g, set()) for g in grams), key=len)
+            candidates = set.intersection(*sets) if sets[0] else set()
+        else:
+            candidates = range(len(self.items))
+        hits = {}
+        for idx in candidates:
+            scores = [FIELDS[f] for f, v in self.fields[idx].items() if pattern in v]
+            if scores: hits[idx] = max(scores)
+        return hits
+
+    def _fuzzy(self, pattern, budget):
+        """오타 허용 일치 {번호: 점수} - 2-gram 을 많이 공유하는 단어만 편집거리 계산"""
+        counts = defaultdict(int)
+        for g in _bigrams(pattern):
+            for token in self.token_grams.get(g, ()): counts[token] += 1
+        # 편집(뒤바뀜 포함) 1회는 2-gram 을 최대 3개 깨뜨리므로 그만큼 여유를 둠
+        need = max(1, len(pattern) - 1 - 3 * budget)
+        tokens = sorted((t for t, c in counts.items() if c >= need and len(t) >= len(pattern) - budget),
+                        key=lambda t: -counts[t])[:self.MAX_FUZZY_TOKENS]
+        hits = {}
+        for token in tokens:
+            dist = fuzzy_find(pattern, token, budget)
+            if dist is None: continue
+            for idx, field in self.vocab[token]:
+                score = FIELDS[field] * (1 - dist / (len(pattern) + 1))
+                if score > hits.get(idx, 0): hits[idx] = score
+        return hits
+
+    def _match_keyword(self, keyword):
+        """{품목 번호: (점수, 정확 일치 여부)}"""
+        pattern = normalize(keyword)
+        if not pattern: return {}
+        hits = {idx: (score, True) for idx, score in self._exact(pattern).items()}
+        budget = max_edits(pattern)
+        if budget:
+            for idx, score in self._fuzzy(pattern, budget).items():
+                if idx not in hits: hits[idx] = (score, False)
+        return hits
+
+    def search(self, query, limit=10):
+        """
+        질의를 키워드로 나눠 품목 순위를 반환: [(품목, 점수, 모든 키워드가 정확 일치인지)]
+        더 많은 키워드에 맞은 품목 → 점수 순
+        """
+        keywords = [k for k in str(query or "").split() if k not in STOP_WORDS and len(k) >= 2]
+        if not keywords: return []
+        totals = defaultdict(lambda: [0, 0.0, True])   # 품목 → [맞은 키워드 수, 점수, 정확 일치]
+        for kw in keywords:
+            for idx, (score, exact) in self._match_keyword(kw).items():
+                t = totals[idx]
+                t[0] += 1; t[1] += score; t[2] = t[2] and exact
+        ranked = sorted(totals.items(), key=lambda kv: (-kv[1][0], -kv[1][1], kv[0]))
+        if limit: ranked = ranked[:limit]
+        return [(self.items[idx], round(score, 3), exact) for idx, (_, score, exact) in ranked]
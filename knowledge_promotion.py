@@ -0,0 +1,151 @@
+"""
+knowledge_promotion.py — 커뮤니티 답변 → 지식 DB 승격 워커 (V271)
+답변 등록은 community_comments insert 한 번으로 끝나고(트리거가 knowledge_promotions 에 대기열 행 추가),
+이 워커가 대기열을 묶음으로 가져와 임베딩을 배치 요청한 뒤 knowledge_base 에 upsert 합니다.
+- 멱등: 대기열 idem_key / knowledge_base.promotion_key = "post_id:comment_id"
+- 실패: 지수 백오프로 재시도, PROMOTION_MAX_ATTEMPTS 회 넘으면 failed (관리자 화면/API 에서 재시도)
+- 워커가 죽어도 running 행은 임대(lease) 만료 후 다시 가져감
+
+사용처:
+    ui_community (답변 등록 직후 kick), ui_admin (대기열 현황), api_server (/knowledge/promotions)
+    python knowledge_promotion.py [--loop 30] [--retry-failed]
+"""
+import sys
+import time
+import argparse
+import threading
+
+from logic_ai import get_embeddings_batch, embedding_profile
+from llm_scheduler import PRIORITY_INGESTION
+
+BATCH_SIZE = 32
+LEASE_SEC = 300
+
+_kick_lock = threading.Lock()
+_kick_thread = None
+
+
+def promotion_key(row):
+    return f"{row['post_id']}:{row['comment_id']}"
+
+
+class PromotionWorker:
+    def __init__(self, db):
+        self.db = db
+
+    def run_once(self, limit=BATCH_SIZE):
+        """대기열 한 묶음 처리 → {"claimed", "done", "failed"}"""
+        rows = self.db.claim_knowledge_promotions(limit, LEASE_SEC)
+        stats = {"claimed": len(rows), "done": 0, "failed": 0}
+        if not rows: return stats
+
+        try:
+            posts, comments = self.db.get_promotion_sources(rows)
+        except Exception as e:
+            for row in rows: self.db.fail_knowledge_promotion(row, e)
+            stats["failed"] = len(rows)
+            return stats
+
+        ready = []
+        for row in rows:
+            post, comment = posts.get(row['post_id']), comments.get(row['comment_id'])
+            if not post or not comment:
+                self.db.fail_knowledge_promotion(row, "원글 또는 답변이 삭제됨", permanent=True)
+                stats["failed"] += 1
+                continue
+            ready.append((row, post, comment))
+        if not ready: return stats
+
+        # 활성 + 섀도 프로필별로 묶음 임베딩 (글 제목 + 답변, promote_to_knowledge 와 같은 텍스트)
+        texts = [f"{post['title']}\n{comment['content']}" for _, post, comment in ready]
+        vectors = [{} for _ in ready]
+        try:
+            for name in self.db.get_write_embedding_profiles():
+                prof = embedding_profile(name)
+                for i, vec in enumerate(get_embeddings_batch(texts, priority=PRIORITY_INGESTION, profile=prof["name"])):
+                    if vec and vectors[i] is not None:
+                        vectors[i][prof["column"]] = vec
+                        vectors[i][prof["model_column"]] = prof["version"]
+                    else:
+                        vectors[i] = None
+        except Exception as e:
+            # 쿼터/인증 등 묶음 전체 오류 → 전부 백오프 후 재시도
+            for row, _, _ in ready: self.db.fail_knowledge_promotion(row, e)
+            stats["failed"] += len(ready)
+            return stats
+
+        payloads, pending = [], []
+        for (row, post, comment), vec in zip(ready, vectors):
+            if vec is None:
+                self.db.fail_knowledge_promotion(row, "AI 임베딩 실패")
+                stats["failed"] += 1
+                continue
+            payloads.append({
+                **self.db.knowledge_payload(post['title'], comment['content'], post.get('manufacturer', '미지정'),
+                                            post.get('model_name', '미지정'), post.get('measurement_item', '공통'),
+                                            comment.get('author') or "익명"),
+                **vec, "promotion_key": promotion_key(row)
+            })
+            pending.append(row)
+
+        try:
+            ids = self.db.upsert_promoted_knowledge(payloads)
+        except Exception as e:
+            for row in pending: self.db.fail_knowledge_promotion(row, e)
+            stats["failed"] += len(pending)
+            return stats
+
+        done = {row['id']: ids.get(promotion_key(row)) for row in pending}
+        self.db.finish_knowledge_promotions(done)
+        stats["done"] += len(done)
+        return stats
+
+    def drain(self, max_batches=None, on_progress=None):
+        """가져올 행이 없을 때까지 반복 (max_batches 로 상한)"""
+        total = {"claimed": 0, "done": 0, "failed": 0}
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            stats = self.run_once()
+            if not stats["claimed"]: break
+            for k in total: total[k] += stats[k]
+            batches += 1
+            if on_progress: on_progress(total)
+        return total
+
+
+def kick(db):
+    """백그라운드 스레드로 대기열을 비움 (프로세스당 1개, 이미 돌고 있으면 그대로)"""
+    global _kick_thread
+    with _kick_lock:
+        if _kick_thread and _kick_thread.is_alive(): return _kick_thread
+
+        def _run():
+            try: PromotionWorker(db).drain()
+            except Exception as e: print(f"지식 승격 워커 오류: {e}")
+
+        _kick_thread = threading.Thread(target=_run, daemon=True, name="knowledge-promotion")
+        _kick_thread.start()
+        return _kick_thread
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="커뮤니티 답변 → 지식 DB 승격 대기열 처리")
+    parser.add_argument("--loop", type=int, default=0, help="N초 간격으로 계속 실행 (0: 한 번 비우고 종료)")
+    parser.add_argument("--retry-failed", action="store_true", help="failed 행을 먼저 재시도 대상으로 되돌림")
+    args = parser.parse_args(argv)
+
+    # api_server 가 Streamlit 스텁과 환경변수 기반 클라이언트 초기화를 담당
+    from api_server import _get_clients
+    _, db = _get_clients()
+    if args.retry_failed:
+        print(f"🔁 실패 {db.retry_knowledge_promotions()}건 재시도 대상으로 변경", file=sys.stderr)
+    worker = PromotionWorker(db)
+    while True:
+        stats = worker.drain(on_progress=lambda t: print(f"[promote] 완료 {t['done']} · 실패 {t['failed']}", file=sys.stderr))
+        print(f"✅ 가져옴 {stats['claimed']} · 완료 {stats['done']} · 실패 {stats['failed']}")
+        if not args.loop: break
+        time.sleep(args.loop)
+
+
+if __name__ == "__main__":
+    main()
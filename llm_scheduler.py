@@ -0,0 +1,238 @@
+"""
+llm_scheduler.py — Gemini 호출 공용 스케줄러 (V249)
+챗봇(/chat), Streamlit 검색, 관리자 일괄 작업(매뉴얼 학습, 그래프 변환, 벡터 재임베딩)이
+같은 Gemini 쿼터를 나눠 쓰도록 클래스별 토큰 버킷과 우선순위를 적용합니다.
+
+- 우선순위: interactive(현장 질의) > ingestion(매뉴얼 학습) > backfill(재건축/재임베딩)
+- 하위 클래스는 상위 클래스 대기열이 비어 있을 때만, 그리고 전역 버킷에
+  interactive 예약분을 남겨두는 선에서만 토큰을 가져갑니다. (남는 용량만 흡수)
+- 429(ResourceExhausted) 발생 시 전역 일시정지 + 지수 백오프 후 재시도합니다.
+
+※ 프로세스 단위 스케줄러입니다. (Streamlit / API 서버는 각자 인스턴스를 가짐)
+"""
+import os
+import time
+import random
+import threading
+import contextlib
+import contextvars
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_INGESTION = "ingestion"
+PRIORITY_BACKFILL = "backfill"
+
+PRIORITY_ORDER = [PRIORITY_INTERACTIVE, PRIORITY_INGESTION, PRIORITY_BACKFILL]
+
+_current_priority = contextvars.ContextVar("llm_priority", default=PRIORITY_INTERACTIVE)
+
+
+def _env_float(name, default):
+    try: return float(os.environ.get(name, default))
+    except (TypeError, ValueError): return float(default)
+
+
+@contextlib.contextmanager
+def llm_priority(priority):
+    """
+    with 블록 안의 LLM 호출을 지정한 우선순위 클래스로 실행합니다.
+    (ThreadPoolExecutor 작업자 스레드에는 전파되지 않으므로 call(priority=...)로 명시하세요)
+    """
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority():
+    return _current_priority.get()
+
+
+def is_rate_limit_error(e):
+    """Gemini 429 / 쿼터 초과 에러 판별"""
+    if type(e).__name__ in ("ResourceExhausted", "TooManyRequests"):
+        return True
+    msg = str(e).lower()
+    return "429" in msg or "resource exhausted" in msg or "quota" in msg
+
+
+class TokenBucket:
+    """분당 요청 수(rpm) 기준 토큰 버킷"""
+    def __init__(self, rate_per_min, burst=None):
+        self.rate = max(rate_per_min, 0.001) / 60.0
+        self.capacity = float(burst if burst is not None else max(rate_per_min / 6.0, 1.0))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def available(self, now):
+        self._refill(now)
+        return self.tokens
+
+    def take(self, cost):
+        self.tokens -= cost
+
+    def wait_time(self, cost, now, reserve=0.0):
+        """reserve만큼 남기고 cost를 가져가려면 몇 초 기다려야 하는지"""
+        self._refill(now)
+        need = cost + reserve - self.tokens
+        return 0.0 if need <= 0 else need / self.rate
+
+
+class LLMScheduler:
+    def __init__(self, global_rpm=None, class_rpm=None, interactive_reserve=None,
+                 max_retries=4, base_backoff=2.0, max_backoff=60.0):
+        global_rpm = global_rpm or _env_float("LLM_GLOBAL_RPM", 300)
+        class_rpm = class_rpm or {
+            PRIORITY_INTERACTIVE: _env_float("LLM_INTERACTIVE_RPM", global_rpm),
+            PRIORITY_INGESTION: _env_float("LLM_INGESTION_RPM", global_rpm * 0.6),
+            PRIORITY_BACKFILL: _env_float("LLM_BACKFILL_RPM", global_rpm * 0.4),
+        }
+        if interactive_reserve is None:
+            interactive_reserve = _env_float("LLM_INTERACTIVE_RESERVE", 0.2)
+
+        self.global_bucket = TokenBucket(global_rpm)
+        self.buckets = {p: TokenBucket(class_rpm.get(p, global_rpm)) for p in PRIORITY_ORDER}
+        # 하위 클래스가 전역 버킷에 남겨둬야 하는 토큰 수 (interactive 전용 예약분)
+        self.reserve_tokens = self.global_bucket.capacity * interactive_reserve
+
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._cond = threading.Condition()
+        self._paused_until = 0.0
+        self._backoff = 0.0
+        self._waiting = {p: 0 for p in PRIORITY_ORDER}
+        self._stats = {p: {"granted": 0, "rate_limited": 0, "errors": 0, "wait_sec": 0.0, "tokens": 0}
+                       for p in PRIORITY_ORDER}
+
+    # ---------------------------------------------------------
+    # 토큰 획득
+    # ---------------------------------------------------------
+    def _has_higher_waiters(self, priority):
+        for p in PRIORITY_ORDER:
+            if p == priority: return False
+            if self._waiting[p] > 0: return True
+        return False
+
+    def acquire(self, priority=None, cost=1, timeout=None):
+        priority = priority if priority in self.buckets else current_priority()
+        if priority not in self.buckets: priority = PRIORITY_INTERACTIVE
+        reserve = 0.0 if priority == PRIORITY_INTERACTIVE else self.reserve_tokens
+        started = time.monotonic()
+        deadline = started + timeout if timeout else None
+
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                while True:
+                    now = time.monotonic()
+                    if deadline and now >= deadline:
+                        raise TimeoutError(f"LLM 스케줄러 대기 시간 초과 ({priority})")
+
+                    if self._paused_until > now:
+                        wait = self._paused_until - now
+                    elif self._has_higher_waiters(priority):
+                        wait = 0.05
+                    else:
+                        wait = max(self.buckets[priority].wait_time(cost, now),
+                                   self.global_bucket.wait_time(cost, now, reserve))
+                        if wait <= 0:
+                            self.buckets[priority].take(cost)
+                            self.global_bucket.take(cost)
+                            break
+                    if deadline: wait = min(wait, max(deadline - now, 0.0))
+                    self._cond.wait(min(wait, 0.5))
+            finally:
+                self._waiting[priority] -= 1
+                self._cond.notify_all()
+
+            stat = self._stats[priority]
+            stat["granted"] += 1
+            stat["wait_sec"] += time.monotonic() - started
+        return priority
+
+    # ---------------------------------------------------------
+    # 429 백오프
+    # ---------------------------------------------------------
+    def report_rate_limited(self, priority):
+        with self._cond:
+            self._backoff = min(self.max_backoff, self._backoff * 2 if self._backoff else self.base_backoff)
+            delay = self._backoff * (0.8 + random.random() * 0.4)
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self._stats[priority]["rate_limited"] += 1
+            self._cond.notify_all()
+
+    def _report_success(self):
+        if self._backoff:
+            with self._cond: self._backoff = 0.0
+
+    def record_usage(self, result, priority=None):
+        """응답의 usage_metadata 토큰 수를 집계 (스트리밍은 소비가 끝난 뒤 호출)"""
+        priority = priority or current_priority()
+        usage = getattr(result, "usage_metadata", None)
+        total = getattr(usage, "total_token_count", None) if usage is not None else None
+        if total and priority in self._stats:
+            with self._cond: self._stats[priority]["tokens"] += int(total)
+
+    def call(self, fn, *args, priority=None, cost=1, **kwargs):
+        """
+        스케줄러를 거쳐 LLM/임베딩 함수를 호출합니다.
+        429는 백오프 후 재시도하고, 그 외 예외는 그대로 올려보냅니다.
+        """
+        priority = priority or current_priority()
+        for attempt in range(self.max_retries + 1):
+            priority = self.acquire(priority, cost)
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                if is_rate_limit_error(e) and attempt < self.max_retries:
+                    self.report_rate_limited(priority)
+                    continue
+                with self._cond: self._stats[priority]["errors"] += 1
+                raise
+            self._report_success()
+            if not kwargs.get("stream"): self.record_usage(result, priority)
+            return result
+
+    # ---------------------------------------------------------
+    # 모니터링
+    # ---------------------------------------------------------
+    def metrics(self):
+        with self._cond:
+            now = time.monotonic()
+            return {
+                "paused_sec": round(max(self._paused_until - now, 0.0), 2),
+                "global_tokens": round(self.global_bucket.available(now), 2),
+                "classes": {
+                    p: {
+                        "queue_depth": self._waiting[p],
+                        "tokens": round(self.buckets[p].available(now), 2),
+                        "granted": s["granted"],
+                        "rate_limited": s["rate_limited"],
+                        "errors": s["errors"],
+                        "avg_wait_ms": round(s["wait_sec"] / s["granted"] * 1000, 1) if s["granted"] else 0.0,
+                        "llm_tokens": s["tokens"],
+                    }
+                    for p, s in self._stats.items()
+                },
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler():
+    """프로세스 전역 스케줄러 (최초 호출 시 환경변수로 생성)"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = LLMScheduler()
+    return _scheduler
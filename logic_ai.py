@@ -1,8 +1,13 @@
+import os
 import re
 import json
+import hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import streamlit as st
 import google.generativeai as genai
 from prompts import PROMPTS
+from llm_scheduler import get_scheduler, current_priority, llm_priority
 
 REL_MAP = {
     "causes":          "원인이다 (A가 B를 유발)",
@@ -15,22 +20,49 @@ REL_MAP = {
     "manufactured_by": "제품이다 (A는 B가 제조함)",
 }
 
+# [V261] 벡터를 만든 임베딩 모델/차원 (행의 embedding_model 과 다르면 재임베딩 대상)
+EMBEDDING_MODEL = "models/gemini-embedding-001"
+EMBEDDING_DIM = 768
+EMBEDDING_VERSION = f"{EMBEDDING_MODEL.split('/')[-1]}@{EMBEDDING_DIM}"
+
+# [V262] 임베딩 프로필: 모델/차원마다 별도 컬럼(섀도 컬럼)과 검색 RPC 를 둡니다.
+# 검색은 app_config.embedding_profile 이 가리키는 프로필 하나만 읽고,
+# 새 프로필은 섀도 컬럼에 백그라운드로 채운 뒤 검증 → 설정 한 줄로 전환합니다. (embedding_migration.py)
+EMBEDDING_PROFILES = {
+    "v1": {"model": EMBEDDING_MODEL, "dim": EMBEDDING_DIM,
+           "column": "embedding", "model_column": "embedding_model", "rpc_suffix": ""},
+    "v2": {"model": os.environ.get("EMBEDDING_V2_MODEL", EMBEDDING_MODEL),
+           "dim": int(os.environ.get("EMBEDDING_V2_DIM", 1536)),
+           "column": "embedding_v2", "model_column": "embedding_v2_model", "rpc_suffix": "_v2"},
+}
+DEFAULT_EMBEDDING_PROFILE = "v1"
+FEEDBACK_EMBEDDING_PROFILE = "v1"   # relevance_feedback.query_embedding 은 v1 벡터로 유지
+
+def embedding_profile(name=None):
+    """프로필 설정 + name/version (모르는 이름이면 기본 프로필)"""
+    name = name if name in EMBEDDING_PROFILES else DEFAULT_EMBEDDING_PROFILE
+    prof = EMBEDDING_PROFILES[name]
+    return dict(prof, name=name, version=f"{prof['model'].split('/')[-1]}@{prof['dim']}")
+
 @st.cache_data(show_spinner=False)
-def get_embedding(text):
+def get_embedding(text, profile=DEFAULT_EMBEDDING_PROFILE):
     """
     gemini-embedding-001 모델로 768차원 임베딩을 생성합니다.
     output_dimensionality=768로 모델이 직접 압축하므로 단순 자르기보다 품질이 좋습니다.
+    [V262] profile 로 다른 모델/차원(섀도 컬럼용) 벡터를 만들 수 있습니다.
     """
     cleaned_text = clean_text_for_db(text)
     if not cleaned_text: return []
+    prof = embedding_profile(profile)
 
     try:
         # 오직 구글 공식 최신 모델만 사용합니다.
-        result = genai.embed_content(
-            model="models/gemini-embedding-001",
+        result = get_scheduler().call(
+            genai.embed_content,
+            model=prof["model"],
             content=cleaned_text,
             task_type="retrieval_document",
-            output_dimensionality=768
+            output_dimensionality=prof["dim"]
         )
 
         return result['embedding']
@@ -40,6 +72,82 @@ def get_embedding(text):
         st.error(f"⚠️ API 키 권한이 없거나 모델 접근이 차단되었습니다. 새 API 키가 적용되었는지 확인해주세요.\n(상세 에러: {e})")
         return []
 
+# --------------------------------------------------------------------------------
+# [V250] 📦 배치 임베딩 (매뉴얼 학습 / 벡터 재임베딩용)
+# --------------------------------------------------------------------------------
+EMBED_BATCH_MAX_ITEMS = 100      # batchEmbedContents 1회 요청 최대 건수
+EMBED_BATCH_MAX_CHARS = 60000    # 1회 요청 텍스트 총량 상한 (대략적인 토큰 예산)
+
+def _plan_embedding_batches(items, max_items=EMBED_BATCH_MAX_ITEMS, max_chars=EMBED_BATCH_MAX_CHARS):
+    """(원본 인덱스, 텍스트) 목록을 건수/글자수 상한에 맞춰 자동으로 묶습니다."""
+    batches, current, current_chars = [], [], 0
+    for idx, text in items:
+        if current and (len(current) >= max_items or current_chars + len(text) > max_chars):
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append((idx, text))
+        current_chars += len(text)
+    if current: batches.append(current)
+    return batches
+
+def _is_item_error(e):
+    """특정 입력 때문에 난 오류인지 (잘못된 인자/내용) - 쿼터(429)·인증·네트워크 오류는 묶음 전체 문제"""
+    if type(e).__name__ in ("InvalidArgument", "BadRequest"):
+        return True
+    msg = str(e).lower()
+    return bool(re.search(r'\b400\b', msg)) or "invalid argument" in msg or "임베딩 개수 불일치" in msg
+
+def _embed_batch_isolated(batch, priority, prof=None):
+    """
+    한 묶음을 한 번의 요청으로 임베딩합니다.
+    항목 때문에 실패하면 절반씩 나눠 재시도하여 문제 있는 항목만 빈 벡터로 격리하고,
+    쿼터/인증/네트워크 오류는 나누지 않고 그대로 올려 요청이 불어나지 않게 합니다 (백오프는 스케줄러 몫).
+    """
+    prof = prof or embedding_profile()
+    try:
+        result = get_scheduler().call(
+            genai.embed_content,
+            model=prof["model"],
+            content=[text for _, text in batch],
+            task_type="retrieval_document",
+            output_dimensionality=prof["dim"],
+            priority=priority
+        )
+        vectors = result['embedding']
+        if len(vectors) != len(batch): raise ValueError("임베딩 개수 불일치")
+        return [(idx, vec) for (idx, _), vec in zip(batch, vectors)]
+    except Exception as e:
+        if not _is_item_error(e): raise
+        if len(batch) == 1:
+            print(f"❌ 임베딩 생성 실패 (#{batch[0][0]}): {e}")
+            return [(batch[0][0], [])]
+        mid = len(batch) // 2
+        return _embed_batch_isolated(batch[:mid], priority, prof) + _embed_batch_isolated(batch[mid:], priority, prof)
+
+def get_embeddings_batch(texts, max_workers=4, priority=None, on_progress=None, profile=DEFAULT_EMBEDDING_PROFILE):
+    """
+    여러 텍스트를 묶음 단위로 임베딩합니다. (입력 순서대로 결과 반환)
+    - 묶음 크기는 건수/글자수 기준으로 자동 결정
+    - 묶음끼리는 스케줄러 한도 안에서 병렬 요청
+    - 입력 문제로 실패한 항목만 [] 로 반환 (나머지 결과는 유지)
+    - 쿼터 소진(스케줄러 재시도 후)·인증·네트워크 오류는 예외로 올림 → 호출부 작업이 실패 후 재개/재시도
+    """
+    priority = priority or current_priority()
+    results = [[] for _ in texts]
+    items = [(i, clean_text_for_db(t)) for i, t in enumerate(texts)]
+    items = [(i, t) for i, t in items if t]
+    if not items: return results
+
+    batches = _plan_embedding_batches(items)
+    prof = embedding_profile(profile)
+    done = 0
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as executor:
+        for pairs in executor.map(lambda b: _embed_batch_isolated(b, priority, prof), batches):
+            for idx, vec in pairs: results[idx] = vec
+            done += len(pairs)
+            if on_progress: on_progress(done, len(items))
+    return results
+
 def semantic_split_v143(text, target_size=1200, min_size=600):
     flat_text = " ".join(text.split())
     sentences = re.split(r'(?<=[.!?])\s+', flat_text)
@@ -56,11 +164,143 @@ def semantic_split_v143(text, target_size=1200, min_size=600):
         else: chunks.append(current_chunk.strip())
     return chunks
 
+# =========================================================
+# [V259] 스트리밍 청크 분할 (페이지 단위 입력, 한/영 문장 경계, 토큰 기준 + 겹침)
+# =========================================================
+# "다.요." 처럼 한글 종결어미 뒤 마침표는 공백이 없어도 경계로 봄 (1.5, v2.0 같은 숫자/버전은 제외)
+# 문장부호에서 시작하는 패턴으로 두어 글자마다 lookbehind 를 돌지 않음 (그룹 1 = 경계 공백, 문장에서 제외)
+_SENTENCE_SPLIT_RE = re.compile(r'[.!?。](\s+|(?<=[가-힣][.!?])(?=[^\s\d.,)\]]))')
+_LIST_LINE_RE = re.compile(r'^\s*(?:[-•·*▶▷■□●○◆◇※]|\d{1,3}[.)]|[①-⑳]|[가-하][.)]|\(\d{1,3}\))\s*')
+
+
+def estimate_tokens(text):
+    """토크나이저 없이 쓰는 토큰 수 추정 (한글 음절 ≈ 0.6, 그 외 글자 4개 ≈ 1)"""
+    # 한글 음절(U+AC00~D7A3)은 UTF-8 에서 0xEA~0xED 로 시작 → 정규식 대신 바이트 개수로 셈
+    encoded = text.encode("utf-8")
+    hangul = encoded.count(0xEA) + encoded.count(0xEB) + encoded.count(0xEC) + encoded.count(0xED)
+    others = len(text) - hangul - text.count(" ")
+    return max(1, int(hangul * 0.6 + others / 4))
+
+
+def _join_lines(lines):
+    """문단 줄 합치기 - 한글과 한글 사이 줄바꿈은 단어가 잘린 것이므로 공백 없이 붙임"""
+    parts = [lines[0]]
+    for prev, line in zip(lines, lines[1:]):
+        if not ("가" <= prev[-1] <= "힣" and "가" <= line[0] <= "힣"): parts.append(" ")
+        parts.append(line)
+    return "".join(parts)
+
+
+def split_sentences(text):
+    """
+    페이지 텍스트를 문장 단위로 나눕니다. (제너레이터)
+    줄바꿈으로 이어진 문단은 합쳐서 문장 분리, 목록/표 행은 한 줄을 한 단위로 유지합니다.
+    """
+    paragraph = []
+
+    def _flush():
+        if not paragraph: return
+        joined, start = _join_lines(paragraph), 0
+        for m in _SENTENCE_SPLIT_RE.finditer(joined):
+            if m.start(1) > start: yield joined[start:m.start(1)]
+            start = m.end()
+        if start < len(joined): yield joined[start:]
+        paragraph.clear()
+
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            yield from _flush()
+        # 표 행: 탭, 칸 구분 공백(3칸 이상), | (strip 한 줄이라 정규식 없이 포함 여부만 봄)
+        elif _LIST_LINE_RE.match(line) or "   " in line or "\t" in line or "|" in line:
+            yield from _flush()
+            yield " ".join(line.split())
+        else:
+            paragraph.append(line)
+    yield from _flush()
+
+
+def _split_long_sentence(sentence, max_tokens):
+    """목표 크기보다 긴 문장(문장부호 없는 표/나열 등)은 단어 단위로 자름"""
+    piece, piece_tokens = [], 0
+    for word in sentence.split():
+        w_tokens = estimate_tokens(word)
+        if piece and piece_tokens + w_tokens > max_tokens:
+            yield " ".join(piece)
+            piece, piece_tokens = [], 0
+        piece.append(word)
+        piece_tokens += w_tokens
+    if piece: yield " ".join(piece)
+
+
+def iter_semantic_chunks(pages, target_tokens=500, overlap_tokens=50, min_tokens=200):
+    """
+    페이지 텍스트를 순서대로 받아 청크를 하나씩 내보냅니다. (전체 문서를 한 문자열로 만들지 않음)
+    - pages: 페이지 텍스트 iterable (1페이지부터)
+    - 각 청크: {"text", "page_start", "page_end", "tokens"}
+    - 다음 청크는 직전 청크 끝 문장들(overlap_tokens 이내)을 앞에 겹쳐서 시작
+    - 마지막 청크가 min_tokens 보다 작으면 직전 청크에 합침
+    문장은 한 번씩만 들어오고 나가므로 처리 시간은 문서 길이에 비례합니다.
+    """
+    window = deque()   # (문장, 토큰 수, 페이지)
+    window_tokens = 0
+    carried = 0        # window 앞쪽 중 직전 청크에서 겹쳐 온 문장 수
+    pending = None     # 마지막 청크 병합을 위해 한 개를 늦게 내보냄
+
+    def _make(items):
+        return {
+            "text": " ".join(t for t, _, _ in items),
+            "page_start": items[0][2], "page_end": items[-1][2],
+            "tokens": sum(n for _, n, _ in items),
+        }
+
+    for page_no, page_text in enumerate(pages, start=1):
+        if not page_text: continue
+        for sentence in split_sentences(page_text):
+            tokens = estimate_tokens(sentence)
+            parts = ((sentence, tokens),) if tokens <= target_tokens else \
+                [(p, estimate_tokens(p)) for p in _split_long_sentence(sentence, target_tokens)]
+            for part, part_tokens in parts:
+                if window and len(window) > carried and window_tokens + part_tokens > target_tokens:
+                    if pending: yield pending
+                    pending = _make(window)
+                    # 겹침: 끝에서부터 overlap_tokens 이내의 문장만 남김
+                    keep, keep_tokens = 0, 0
+                    for _, n, _ in reversed(window):
+                        if keep_tokens + n > overlap_tokens: break
+                        keep += 1; keep_tokens += n
+                    while len(window) > keep:
+                        window_tokens -= window.popleft()[1]
+                    carried = len(window)
+                window.append((part, part_tokens, page_no))
+                window_tokens += part_tokens
+
+    fresh = list(window)[carried:]
+    if fresh:
+        fresh_tokens = sum(n for _, n, _ in fresh)
+        if pending and fresh_tokens < min_tokens:
+            merged = {
+                "text": pending["text"] + " " + " ".join(t for t, _, _ in fresh),
+                "page_start": pending["page_start"], "page_end": fresh[-1][2],
+                "tokens": pending["tokens"] + fresh_tokens,
+            }
+            pending = merged
+        else:
+            if pending: yield pending
+            pending = _make(list(window))
+    if pending: yield pending
+
+
 def clean_text_for_db(text):
     if not text: return ""
     text = text.replace("\u0000", "")
     return "".join(ch for ch in text if ch.isprintable() or ch in ['\n', '\r', '\t']).strip()
 
+def content_hash(text):
+    """[V258] 청크 동일성 판별용 해시 (DB 저장 형태 기준, 공백 차이는 무시)"""
+    normalized = re.sub(r'\s+', ' ', clean_text_for_db(text)).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
 def extract_json(text):
     try:
         cleaned = re.sub(r'```json\s*|```', '', text).strip()
@@ -81,10 +321,80 @@ def extract_metadata_ai(ai_model, content):
     try:
         fast_model = get_fast_model() # 초고속 엔진 적용
         prompt = PROMPTS["extract_metadata"].format(content=content[:2000])
-        res = fast_model.generate_content(prompt)
+        res = get_scheduler().call(fast_model.generate_content, prompt)
         return extract_json(res.text)
     except: return None
 
+# --------------------------------------------------------------------------------
+# [V252] 문서 단위 태깅 (청크별 LLM 호출 대신 매뉴얼당 1회)
+# --------------------------------------------------------------------------------
+_TOC_MARKERS = ("목차", "차례", "contents", "table of contents", "index")
+# 예: TOC-L, TOC-4200, NPW-160, TNP-4200, ZS-200A
+# \b 는 한글도 단어 문자로 보므로 "TOC-4200의", "NPW-160을" 처럼 조사가 붙으면 놓침 → 영숫자 기준 경계만 사용
+_MODEL_TOKEN_RE = re.compile(r'(?<![A-Za-z0-9])(?:[A-Za-z]{2,}-?\d{2,}[A-Za-z0-9]*(?:-[A-Za-z0-9]+)*|[A-Z]{2,}-[A-Z]{1,3})(?![A-Za-z0-9])')
+
+def build_document_head(page_texts, head_pages=3, scan_pages=15, max_chars=6000):
+    """앞쪽 페이지와 목차 페이지를 모아 문서 단위 태깅용 텍스트를 만듭니다."""
+    picked = []
+    for idx, text in enumerate(page_texts[:scan_pages]):
+        if not text: continue
+        lowered = text[:300].lower()
+        if idx < head_pages or any(m in lowered for m in _TOC_MARKERS):
+            picked.append(text)
+    return "\n".join(picked)[:max_chars]
+
+def extract_document_metadata_ai(ai_model, head_text):
+    """
+    매뉴얼 앞부분/목차로 제조사·모델·측정항목을 한 번에 추출합니다.
+    본문에 등장하는 모델명 목록(models)도 함께 받아 청크별 보정에 사용합니다.
+    """
+    default_meta = {"manufacturer": "미지정", "model_name": "미지정", "measurement_item": "공통", "models": []}
+    try:
+        prompt = PROMPTS["extract_document_metadata"].format(content=head_text)
+        res = get_scheduler().call(get_fast_model().generate_content, prompt)
+        meta = extract_json(res.text)
+        if isinstance(meta, list): meta = meta[0] if meta else {}
+        if not isinstance(meta, dict): return default_meta
+        models = meta.get('models') if isinstance(meta.get('models'), list) else []
+        return {**default_meta, **meta, "models": [str(m).strip() for m in models if m]}
+    except: return default_meta
+
+def _model_key(text):
+    return str(text or "").lower().replace(" ", "").replace("-", "").replace("_", "")
+
+def infer_chunk_metadata(chunk, doc_meta):
+    """
+    문서 메타데이터를 상속하되, 청크가 다른 모델을 명확히 지칭할 때만 model_name 을 로컬 보정합니다.
+    (LLM 호출 없음) 판단 기준:
+    - 문서 모델 목록(models)에 있는 다른 모델이 등장하고 문서 대표 모델은 등장하지 않음
+    - 또는 목록에 없는 모델형 토큰이 2회 이상 반복되고 대표 모델은 등장하지 않음
+
+    >>> doc = {"model_name": "TOC-4200", "models": ["TOC-4200", "NPW-160"]}
+    >>> infer_chunk_metadata("TOC-4200의 시약 교체 후 NPW-160 과 값을 비교", doc)["model_name"]
+    'TOC-4200'
+    >>> infer_chunk_metadata("NPW-160의 펌프 튜브는 NPW-160에서만 사용", doc)["model_name"]
+    'NPW-160'
+    """
+    meta = {k: doc_meta.get(k) for k in ("manufacturer", "model_name", "measurement_item")}
+    doc_model = _model_key(doc_meta.get('model_name'))
+    tokens = _MODEL_TOKEN_RE.findall(chunk or "")
+    if not tokens: return meta
+
+    counts = {}
+    for tok in tokens:
+        key = _model_key(tok)
+        if key: counts.setdefault(key, [tok, 0])[1] += 1
+    if doc_model and doc_model in counts: return meta
+
+    known = {_model_key(m): m for m in doc_meta.get('models', [])}
+    candidates = [(c, raw, known.get(k)) for k, (raw, c) in counts.items()
+                  if k != doc_model and (k in known or c >= 2)]
+    if candidates:
+        candidates.sort(key=lambda x: (x[2] is not None, x[0]), reverse=True)
+        count, raw, known_name = candidates[0]
+        meta['model_name'] = known_name or raw
+    return meta
+
 @st.cache_data(ttl=3600, show_spinner=False)
 def analyze_search_intent(_ai_model, query):
     default_intent = {
@@ -96,7 +406,7 @@ def analyze_search_intent(_ai_model, query):
     try:
         fast_model = get_fast_model() # 초고속 엔진 적용 (의도 파악 속도 3배 향상)
         prompt = PROMPTS["search_intent"].format(query=query)
-        res = fast_model.generate_content(prompt)
+        res = get_scheduler().call(fast_model.generate_content, prompt)
         intent_res = extract_json(res.text)
         if intent_res and isinstance(intent_res, dict):
             return intent_res
@@ -127,7 +437,7 @@ def quick_rerank_ai(_ai_model, query, results, intent):
     
     try:
         fast_model = get_fast_model() # 초고속 엔진 적용 (문서 채점 속도 극대화)
-        res = fast_model.generate_content(prompt)
+        res = get_scheduler().call(fast_model.generate_content, prompt)
         scores = extract_json(res.text)
         score_map = {item['id']: item['score'] for item in scores}
         for r in results: r['rerank_score'] = score_map.get(r['id'], 0)
@@ -154,10 +464,11 @@ def generate_3line_summary_stream(ai_model, query, results):
     )
     
     # 여기는 최종 답변 구간이므로 똑똑한 메인 엔진(ai_model)을 그대로 유지합니다!
-    response = ai_model.generate_content(prompt, stream=True)
+    response = get_scheduler().call(ai_model.generate_content, prompt, stream=True)
     for chunk in response:
         if chunk.text:
             yield chunk.text
+    get_scheduler().record_usage(response)
 
 @st.cache_data(ttl=3600, show_spinner=False)
 def unified_rerank_and_summary_ai(_ai_model, query, results, intent):
@@ -172,19 +483,102 @@ def unified_rerank_and_summary_ai(_ai_model, query, results, intent):
     )
     
     try:
-        res = _ai_model.generate_content(prompt)
+        res = get_scheduler().call(_ai_model.generate_content, prompt)
         parsed = extract_json(res.text)
         score_map = {item['id']: item['score'] for item in parsed.get('scores', [])}
         for r in results: r['rerank_score'] = score_map.get(r['id'], 0)
         return sorted(results, key=lambda x: x['rerank_score'], reverse=True), parsed.get('summary', "요약 불가")
     except: return results, "오류 발생"
 
+# --------------------------------------------------------------------------------
+# [V251] 검색 파이프라인 모드 (LLM 왕복 횟수 선택)
+# - classic        : 의도 → (검색) → 채점 → 요약 (3회, 기존 방식)
+# - intent_rerank  : (검색) → 의도+채점 → 요약 (2회)
+# - rerank_summary : 의도 → (검색) → 채점+요약 스트리밍 (2회)
+# --------------------------------------------------------------------------------
+PIPELINE_MODES = ("classic", "intent_rerank", "rerank_summary")
+
+def get_pipeline_mode():
+    mode = os.environ.get("SEARCH_PIPELINE_MODE", "classic").strip().lower()
+    return mode if mode in PIPELINE_MODES else "classic"
+
+def _apply_rerank_scores(results, scores):
+    score_map = {item['id']: item['score'] for item in scores if isinstance(item, dict) and 'id' in item}
+    for r in results: r['rerank_score'] = score_map.get(r['id'], 0)
+    results.sort(key=lambda x: x['rerank_score'], reverse=True)
+    return results
+
+def analyze_intent_and_rerank_ai(ai_model, query, results):
+    """
+    검색 후보를 보고 의도 파악과 채점을 한 번의 호출로 처리합니다.
+    실패 시 (None, results) 를 반환하여 호출부가 기존 경로로 복구할 수 있게 합니다.
+    """
+    candidates = [{
+        "id": r.get('id'),
+        "mfr": r.get('manufacturer'),
+        "model": r.get('model_name'),
+        "item": r.get('measurement_item'),
+        "content": (r.get('content') or r.get('solution') or "")[:200]
+    } for r in results[:8]]
+    prompt = PROMPTS["intent_rerank"].format(query=query, candidates=json.dumps(candidates, ensure_ascii=False))
+    try:
+        res = get_scheduler().call(get_fast_model().generate_content, prompt)
+        parsed = extract_json(res.text)
+        if not isinstance(parsed, dict): return None, results
+        intent = parsed.get('intent') if isinstance(parsed.get('intent'), dict) else None
+        _apply_rerank_scores(results, parsed.get('scores') or [])
+        return intent, results
+    except: return None, results
+
+def rerank_and_summary_stream(ai_model, query, results):
+    """
+    채점과 3줄 요약을 하나의 스트리밍 호출로 처리합니다.
+    첫 줄(SCORES: [...])을 받는 즉시 results 를 제자리 정렬하고, 이후 답변만 흘려보냅니다.
+    """
+    if not results:
+        yield "검색 결과가 부족하여 요약을 생성할 수 없습니다."
+        return
+
+    candidates = [{
+        "id": r.get('id'),
+        "mfr": r.get('manufacturer'),
+        "model": r.get('model_name'),
+        "content": (r.get('content') or r.get('solution') or "")[:600]
+    } for r in results[:5]]
+    prompt = PROMPTS["rerank_summary_stream"].format(query=query, candidates=json.dumps(candidates, ensure_ascii=False))
+
+    response = get_scheduler().call(ai_model.generate_content, prompt, stream=True)
+    buffer, header_done = "", False
+    for chunk in response:
+        if not chunk.text: continue
+        if header_done:
+            yield chunk.text
+            continue
+        buffer += chunk.text
+        if "\n---" not in buffer: continue
+        header, _, rest = buffer.partition("\n---")
+        scores = extract_json(header.split("SCORES:", 1)[-1])
+        if isinstance(scores, list): _apply_rerank_scores(results, scores)
+        header_done = True
+        rest = rest.lstrip("-").lstrip("\n")
+        if rest: yield rest
+    if not header_done and buffer:
+        # 형식을 지키지 않은 응답은 그대로 답변으로 취급
+        yield buffer
+    get_scheduler().record_usage(response)
+
+def stream_answer(ai_model, query, results, mode=None):
+    """파이프라인 모드에 맞는 답변 스트림을 반환합니다."""
+    if (mode or get_pipeline_mode()) == "rerank_summary":
+        return rerank_and_summary_stream(ai_model, query, results)
+    return generate_3line_summary_stream(ai_model, query, results)
+
 def generate_relevant_summary(ai_model, query, data):
     prompt = PROMPTS["deep_report"].format(
         query=query, 
         data=data
     )
-    res = ai_model.generate_content(prompt)
+    res = get_scheduler().call(ai_model.generate_content, prompt)
     return res.text
 
 # --------------------------------------------------------------------------------
@@ -222,7 +616,7 @@ def extract_triples_from_text(ai_model, text):
     """
     
     try:
-        res = ai_model.generate_content(graph_prompt)
+        res = get_scheduler().call(ai_model.generate_content, graph_prompt)
         triples = extract_json(res.text)
         if triples and isinstance(triples, list):
             return triples
@@ -230,3 +624,70 @@ def extract_triples_from_text(ai_model, text):
     except Exception as e:
         print(f"Graph Extraction Error: {e}")
         return []
+
+# --------------------------------------------------------------------------------
+# [V253] Graph RAG 다중 청크 배치 추출
+# --------------------------------------------------------------------------------
+# [V263] 추출 프롬프트/모델을 바꾸면 올려서, graph_build_ledger 기준으로 전체 재추출되게 함
+GRAPH_EXTRACTOR_VERSION = "triples-batch-v1"
+
+def _extract_triples_packed(ai_model, batch, max_chars_per_chunk):
+    """
+    청크 여러 개를 한 프롬프트로 보내 {청크ID: 트리플 목록} 을 받습니다.
+    응답에서 빠졌거나 형식이 틀린 청크 ID 는 missing 으로 돌려줍니다.
+    """
+    packed = "\n\n".join(f"[[CHUNK id={cid}]]\n{text[:max_chars_per_chunk]}" for cid, text in batch)
+    try:
+        res = get_scheduler().call(ai_model.generate_content, PROMPTS["extract_triples_batch"].format(chunks=packed))
+        parsed = extract_json(res.text)
+    except Exception as e:
+        print(f"Graph Batch Extraction Error: {e}")
+        parsed = None
+
+    found, missing = {}, []
+    parsed = parsed if isinstance(parsed, dict) else {}
+    for cid, _ in batch:
+        triples = parsed.get(str(cid))
+        if isinstance(triples, list): found[cid] = [t for t in triples if isinstance(t, dict)]
+        else: missing.append(cid)
+    return found, missing
+
+def iter_triples_batch(ai_model, docs, chunks_per_prompt=6, max_chars_per_chunk=2500, max_workers=4, priority=None):
+    """
+    extract_triples_batch 의 스트리밍 버전: 프롬프트 묶음이 끝나는 대로 (chunk_id, [triple, ...]) 를 내보냄
+    (호출측이 받은 만큼 바로 저장하면 코퍼스 전체 결과를 메모리에 쌓지 않음)
+    """
+    priority = priority or current_priority()
+    docs = [(cid, text) for cid, text in docs if text and text.strip()]
+    if not docs: return
+
+    def _run(batch):
+        with llm_priority(priority):
+            found, missing = _extract_triples_packed(ai_model, batch, max_chars_per_chunk)
+            texts = dict(batch)
+            for cid in missing:
+                found[cid] = extract_triples_from_text(ai_model, texts[cid])
+            return found
+
+    batches = [docs[i:i + chunks_per_prompt] for i in range(0, len(docs), chunks_per_prompt)]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as executor:
+        futures = [executor.submit(_run, b) for b in batches]
+        for future in as_completed(futures):
+            yield from future.result().items()
+
+def extract_triples_batch(ai_model, docs, chunks_per_prompt=6, max_chars_per_chunk=2500,
+                          max_workers=4, priority=None, on_progress=None):
+    """
+    여러 청크의 트리플을 배치로 추출합니다.
+    - docs: [(chunk_id, text), ...]  →  반환: {chunk_id: [triple, ...]}
+    - 청크 chunks_per_prompt 개씩 한 프롬프트에 담아 요청 (배치 간 max_workers 병렬)
+    - 응답에서 누락된 청크만 extract_triples_from_text 로 개별 재시도
+    - on_progress(done, total) 는 호출한 스레드에서 실행됩니다. (Streamlit 진행바 갱신 가능)
+    """
+    total = sum(1 for _, text in docs if text and text.strip())
+    results = {}
+    for cid, triples in iter_triples_batch(ai_model, docs, chunks_per_prompt, max_chars_per_chunk, max_workers, priority):
+        results[cid] = triples
+        if on_progress: on_progress(len(results), total)
+    return results
+
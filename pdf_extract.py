@@ -0,0 +1,224 @@
+"""
+pdf_extract.py — PDF 페이지 병렬 추출 (V255)
+pdfplumber 텍스트 추출과 OCR(pytesseract)은 CPU 작업이므로
+페이지 구간을 ProcessPoolExecutor 로 나눠 처리하고, 결과는 페이지 순서대로 돌려줍니다.
+
+[V257] 페이지별 자동 OCR 보완
+- 기본은 pdfplumber 텍스트 추출, 텍스트가 없거나 깨진 페이지만 골라 OCR (병렬)
+- use_ocr=True 는 전체 페이지 강제 OCR
+
+[V256] OCR 래스터화 메모리 상한
+- PDF 는 임시 파일로 1회만 저장하고, 작업 프로세스는 경로만 받아 필요한 페이지만 엽니다.
+- OCR 은 first_page/last_page 로 raster_window 페이지씩만 이미지로 변환 → OCR → 즉시 해제
+- 동시에 처리 중인 구간 수도 제한하므로 최대 메모리는 전체 페이지 수와 무관합니다.
+  (대략 workers × raster_window × 페이지 1장 이미지 크기)
+"""
+import os
+import re
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import pdfplumber
+
+# OCR 라이브러리 (없으면 비활성화)
+try:
+    import pytesseract
+    from pdf2image import convert_from_path, pdfinfo_from_path
+    OCR_AVAILABLE = True
+except ImportError:
+    OCR_AVAILABLE = False
+
+OCR_LANG = "kor+eng"
+PAGES_PER_TASK = 8
+
+
+def _env_int(name, default):
+    try: return int(os.environ.get(name, default))
+    except (TypeError, ValueError): return default
+
+
+OCR_DPI = _env_int("OCR_DPI", 200)
+OCR_GRAYSCALE = os.environ.get("OCR_GRAYSCALE", "1") not in ("0", "false", "False")
+OCR_RASTER_WINDOW = max(1, _env_int("OCR_RASTER_WINDOW", 2))
+OCR_MIN_TEXT_CHARS = _env_int("OCR_MIN_TEXT_CHARS", 40)
+
+_MEANINGFUL_RE = re.compile(r'[가-힣A-Za-z0-9]')
+_CID_RE = re.compile(r'\(cid:\d+\)')
+
+
+def text_quality(text):
+    """텍스트 레이어 품질 점수 (의미 있는 문자 수, 의미 있는 문자 비율)"""
+    stripped = _CID_RE.sub("", text or "")
+    chars = [ch for ch in stripped if not ch.isspace()]
+    if not chars: return 0, 0.0
+    meaningful = len(_MEANINGFUL_RE.findall(stripped))
+    # (cid:xx) 는 글꼴 매핑이 깨진 흔적이므로 전체 길이에는 포함해 비율을 낮춥니다
+    total = len(chars) + len(_CID_RE.findall(text or "")) * 6
+    return meaningful, meaningful / total
+
+
+def needs_ocr(text, min_chars=None):
+    """텍스트가 없거나(스캔본) 깨진(글꼴 매핑 오류) 페이지인지"""
+    meaningful, ratio = text_quality(text)
+    return meaningful < (OCR_MIN_TEXT_CHARS if min_chars is None else min_chars) or ratio < 0.5
+
+
+def _page_runs(indices, max_len):
+    """정렬된 페이지 번호를 연속 구간 [start, end) 로 묶습니다. (구간 길이 ≤ max_len)"""
+    runs = []
+    for idx in sorted(indices):
+        if runs and runs[-1][1] == idx and runs[-1][1] - runs[-1][0] < max_len:
+            runs[-1][1] = idx + 1
+        else:
+            runs.append([idx, idx + 1])
+    return [tuple(r) for r in runs]
+
+
+def _text_range(pdf_path, start, end):
+    """[start, end) 페이지의 텍스트 (0-based)"""
+    with pdfplumber.open(pdf_path) as pdf:
+        results = []
+        for idx in range(start, end):
+            page = pdf.pages[idx]
+            results.append((idx, page.extract_text() or ""))
+            page.flush_cache()  # 페이지 객체 캐시 해제 (대용량 PDF 메모리 누적 방지)
+        return results
+
+
+def _ocr_range(pdf_path, start, end, dpi=OCR_DPI, grayscale=OCR_GRAYSCALE, window=OCR_RASTER_WINDOW):
+    """
+    [start, end) 페이지 OCR (0-based, pdf2image 는 1-based)
+    window 페이지씩만 래스터화하고 OCR 이 끝나면 바로 이미지를 버립니다.
+    """
+    results = []
+    for w_start in range(start, end, window):
+        w_end = min(w_start + window, end)
+        images = convert_from_path(pdf_path, dpi=dpi, grayscale=grayscale,
+                                   first_page=w_start + 1, last_page=w_end)
+        for i, img in enumerate(images):
+            results.append((w_start + i, pytesseract.image_to_string(img, lang=OCR_LANG)))
+            img.close()
+        del images
+    return results
+
+
+def count_pages(pdf_path, use_ocr=False):
+    if use_ocr and OCR_AVAILABLE:
+        return int(pdfinfo_from_path(pdf_path)["Pages"])
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def _mp_context():
+    """
+    Streamlit/uvicorn 은 여러 스레드가 도는 프로세스라 fork 대신 forkserver 를 사용합니다.
+    (forkserver 를 지원하지 않는 OS 는 기본 방식)
+    """
+    try: return multiprocessing.get_context("forkserver")
+    except ValueError: return multiprocessing.get_context()
+
+
+MAX_DEFAULT_WORKERS = 8   # 워커마다 pdfplumber/래스터 페이지를 들고 있으므로 큰 호스트에서도 상한
+
+
+def _available_cpus():
+    """컨테이너에 실제로 할당된 CPU 수 (os.cpu_count 는 호스트 전체 코어 수)"""
+    try: return len(os.sched_getaffinity(0))
+    except AttributeError: return os.cpu_count() or 1
+
+
+def default_workers():
+    return max(1, _env_int("PDF_EXTRACT_WORKERS", 0) or min(_available_cpus(), MAX_DEFAULT_WORKERS))
+
+
+def _run_ranges(worker_fn, pdf_path, ranges, max_workers, collect):
+    """구간 작업을 최대 max_workers × 2 개까지만 띄워두고 끝나는 대로 채웁니다."""
+    if max_workers <= 1:
+        for s, e in ranges: collect(worker_fn(pdf_path, s, e))
+        return
+
+    pending_ranges = list(ranges)
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=_mp_context()) as executor:
+        in_flight = set()
+        while pending_ranges or in_flight:
+            while pending_ranges and len(in_flight) < max_workers * 2:
+                s, e = pending_ranges.pop(0)
+                in_flight.add(executor.submit(worker_fn, pdf_path, s, e))
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished: collect(future.result())
+
+
+def extract_pdf_pages_detailed(source, use_ocr=False, on_progress=None, max_workers=None, pages_per_task=PAGES_PER_TASK):
+    """
+    PDF 에서 페이지별 텍스트를 추출하고 (page_texts, ocr_pages) 를 반환합니다. (페이지 순서 보장)
+    - source: PDF bytes 또는 파일 경로
+    - use_ocr=False: 텍스트 추출 후 needs_ocr() 페이지만 OCR, OCR 결과가 더 나을 때만 교체
+    - use_ocr=True : 전체 페이지 OCR
+    - on_progress(done, total) 는 호출한 스레드에서 실행 (OCR 대상이 정해지면 total 이 늘어남)
+    - 프로세스 풀을 쓸 수 없는 환경이면 같은 함수로 순차 처리
+    """
+    tmp_path = None
+    if isinstance(source, (bytes, bytearray)):
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            tmp.write(source)
+            tmp_path = tmp.name
+    pdf_path = tmp_path or source
+
+    try:
+        force_ocr = use_ocr and OCR_AVAILABLE
+        total_pages = count_pages(pdf_path, force_ocr)
+        if total_pages == 0: return [], []
+
+        workers = max_workers or default_workers()
+        page_texts = [""] * total_pages
+        progress = {"done": 0, "total": total_pages}
+
+        def _collect(pairs):
+            for idx, text in pairs: page_texts[idx] = text
+            progress["done"] += len(pairs)
+            if on_progress: on_progress(progress["done"], progress["total"])
+
+        def _run(worker_fn, ranges, collect):
+            done_before = progress["done"]
+            try:
+                _run_ranges(worker_fn, pdf_path, ranges, min(workers, len(ranges)), collect)
+            except (OSError, NotImplementedError, BrokenProcessPool) as err:
+                # 일부 컨테이너는 프로세스 생성/공유메모리를 막아둠, 워커가 OOM 등으로 죽으면 풀이 깨짐 → 순차 처리
+                print(f"PDF 병렬 추출 불가, 순차 처리로 전환: {err}")
+                progress["done"] = done_before
+                _run_ranges(worker_fn, pdf_path, ranges, 1, collect)
+
+        all_ranges = [(s, min(s + pages_per_task, total_pages)) for s in range(0, total_pages, pages_per_task)]
+        if force_ocr:
+            _run(_ocr_range, all_ranges, _collect)
+            return page_texts, list(range(total_pages))
+
+        _run(_text_range, all_ranges, _collect)
+        ocr_targets = [i for i, t in enumerate(page_texts) if needs_ocr(t)] if OCR_AVAILABLE else []
+        if not ocr_targets: return page_texts, []
+
+        progress["total"] += len(ocr_targets)
+        ocr_pages = []
+
+        def _collect_ocr(pairs):
+            better = []
+            for idx, text in pairs:
+                if text_quality(text)[0] > text_quality(page_texts[idx])[0]:
+                    better.append((idx, text))
+                    ocr_pages.append(idx)
+            for idx, text in better: page_texts[idx] = text
+            progress["done"] += len(pairs)
+            if on_progress: on_progress(progress["done"], progress["total"])
+
+        _run(_ocr_range, _page_runs(ocr_targets, pages_per_task), _collect_ocr)
+        return page_texts, sorted(ocr_pages)
+    finally:
+        if tmp_path and os.path.exists(tmp_path): os.remove(tmp_path)
+
+
+def extract_pdf_pages(source, use_ocr=False, on_progress=None, max_workers=None, pages_per_task=PAGES_PER_TASK):
+    """페이지별 텍스트 목록만 반환 (extract_pdf_pages_detailed 참고)"""
+    page_texts, _ = extract_pdf_pages_detailed(source, use_ocr, on_progress, max_workers, pages_per_task)
+    return page_texts
@@ -29,6 +29,28 @@ PROMPTS = {
         {{"manufacturer": "...", "model_name": "...", "measurement_item": "..."}}
     """,
 
+    # ----------------------------------------------------------------
+    # 1-1. [V252] 문서 단위 태깅 (앞부분 + 목차로 매뉴얼 전체 1회 분석)
+    # ----------------------------------------------------------------
+    "extract_document_metadata": """
+        [Role] You are a specialized Technical Data Engineer.
+        [Task] The text below is the FIRST PAGES and TABLE OF CONTENTS of one equipment manual.
+        Extract metadata that applies to the WHOLE document.
+        
+        [Document Head]
+        {content}
+        
+        [Rules]
+        1. **manufacturer**: The maker of the equipment. If unknown, use "공통".
+        2. **model_name**: The main model covered by this manual.
+        3. **measurement_item**: Comma-separated NOUNS. The FIRST item is the Main Category
+           (e.g., TOC, TN, TP, pH, 채수펌프). Keep acronyms as is. Include chapter-level key terms.
+        4. **models**: Every model name/number mentioned (including variants/options), as a list.
+        
+        [Output Format (JSON)]
+        {{"manufacturer": "...", "model_name": "...", "measurement_item": "...", "models": ["...", "..."]}}
+    """,
+
     # ----------------------------------------------------------------
     # 2. 검색 의도 파악 (Intent Analysis) - [수정됨: 경보 관련 자동 추론 추가]
     # ----------------------------------------------------------------
@@ -104,6 +126,105 @@ PROMPTS = {
         Start output immediately.
     """,
 
+    # ----------------------------------------------------------------
+    # 4-1. [V251] 채점 + 요약 통합 (JSON 1회 호출)
+    # ----------------------------------------------------------------
+    "unified_rerank": """
+        [Task] Score the candidates for the user query, then write the answer summary.
+        
+        [User Query] "{query}"
+        [Conditions] {safe_intent}
+        [Candidates] {candidates}
+        
+        [Scoring] Same strict criteria: 100 perfect, 80-90 high, 40-60 general, 0-20 irrelevant.
+        If User asks for Model A, but Document is Model B -> Score 0.
+        
+        [Summary] Professional Korean, 3 lines, based ONLY on the highest scored candidates.
+        
+        [Output Format (JSON Only)]
+        {{"scores": [{{"id": document_id, "score": integer_0_to_100}}, ...], "summary": "..."}}
+    """,
+
+    # ----------------------------------------------------------------
+    # 4-2. [V251] 의도 파악 + 채점 통합 (검색 후 1회 호출)
+    # ----------------------------------------------------------------
+    "intent_rerank": """
+        [Task] (1) Extract the search intent of the query. (2) Score each candidate's relevance.
+        
+        [Query] {query}
+        [Candidates] {candidates}
+        
+        [Intent Rules]
+        - target_mfr: Manufacturer name (or "미지정").
+        - target_model: Specific model name (or "미지정"). If no model is given AND the query is about
+          alarms/warnings/standards ("경보", "발령", "기준", "주의보"), set "수질자동측정망".
+        - target_item: Key component/item name (or "공통").
+        - target_action: User's goal (e.g., "Repair", "Usage", "Concept", "Error_Check").
+        
+        [Scoring - BE STRICT] 100 perfect, 80-90 high, 40-60 general, 0-20 irrelevant.
+        If the query names Model A but the document is Model B -> Score 0.
+        
+        [Output Format (JSON Only)]
+        {{"intent": {{"target_mfr": "...", "target_model": "...", "target_item": "...", "target_action": "..."}},
+          "scores": [{{"id": document_id, "score": integer_0_to_100}}, ...]}}
+    """,
+
+    # ----------------------------------------------------------------
+    # 4-3. [V251] 채점 + 3줄 요약 통합 (스트리밍 1회 호출)
+    # 첫 줄은 점수 JSON, 구분선(---) 이후는 summary_fact_lock 규칙의 답변
+    # ----------------------------------------------------------------
+    "rerank_summary_stream": """
+        [Role] You are a Chief Technical Engineer (수석 엔지니어).
+        [Question] {query}
+        [Candidates] {candidates}
+        
+        [Step 1 - Scoring] Score every candidate (100 perfect, 80-90 high, 40-60 general, 0-20 irrelevant,
+        Model mismatch -> 0). Output them on the FIRST LINE ONLY, exactly as:
+        SCORES: [{{"id": document_id, "score": integer_0_to_100}}, ...]
+        Then output a line containing only: ---
+        
+        [Step 2 - Answer] Using ONLY the highest scored candidates:
+        1. **NO Hallucination:** Use ONLY the candidate content.
+        2. **Clarification:** If the query is vague, ask for specifics.
+        3. **Indirect Suggestion:** If the exact answer is missing, START with: "현재는 해당 내용에 대한 지식은 없지만,"
+        4. **Tone:** Professional Korean (Formal, Concise).
+        
+        [Answer Format]
+        1. (핵심 결론) - (상세 설명)
+        2. (조치 방법) - (구체적 절차)
+        3. (참고/주의) - (출처 또는 경고)
+    """,
+
+    # ----------------------------------------------------------------
+    # 4-4. [V253] Graph RAG 다중 청크 관계 추출 (청크 ID별 결과)
+    # ----------------------------------------------------------------
+    "extract_triples_batch": """
+    You are an expert Data Engineer specializing in Knowledge Graphs.
+    Several technical text chunks are given, each starting with a line [[CHUNK id=...]].
+    For EACH chunk independently, extract relationships between entities found in that chunk only.
+    
+    Target Entities: Device, Part, Symptom, Cause, Solution, Action, Value, Location, Manufacturer.
+    Target Relations: 
+    - causes (원인이다)
+    - part_of (의 부품이다: Use for components inside a machine)
+    - located_in (에 위치한다)
+    - solved_by (로 해결된다)
+    - has_status (상태를 가진다)
+    - requires (을 필요로 한다)
+    - manufactured_by (이 제조했다: Use when Entity B is the Brand/Maker of Entity A)
+
+    IMPORTANT: 
+    - Entities MUST be single nouns or short phrases (under 5 words). 
+    - Do NOT include full sentences as entities.
+    - Include EVERY chunk id as a key, with [] if nothing is found.
+
+    Return ONLY a JSON object keyed by chunk id. No markdown, no explanations.
+    Format: {{"<chunk id>": [{{"source": "Entity A", "relation": "relation_type", "target": "Entity B"}}], ...}}
+
+    Chunks:
+    {chunks}
+    """,
+
     # ----------------------------------------------------------------
     # 5. 심층 리포트 (Deep Report) - [한글 유지]
     # 설명: 보고서 작성용
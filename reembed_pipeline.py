@@ -0,0 +1,144 @@
+"""
+reembed_pipeline.py — 벡터 재임베딩 작업 (V261)
+manual_base / knowledge_base / community_posts([V272]) 에서 임베딩이 없거나 embedding_model 이 현재 버전(EMBEDDING_VERSION)과
+다른 행만 id 키셋으로 페이지씩 읽어 배치 임베딩 → 일괄 갱신(bulk_update_embeddings RPC) 합니다.
+페이지마다 ingest_jobs(kind='reembed').state 에 테이블별 마지막 id 를 남겨 중단 지점부터 재개합니다.
+[V262] 작업의 mode 는 임베딩 프로필 이름이며, v2 등 섀도 프로필이면 섀도 컬럼(embedding_v2)을 채웁니다.
+
+사용처:
+- CLI      : python reembed_pipeline.py [--profile v2]   (새 작업)
+             python reembed_pipeline.py --resume 15
+- API      : POST /reembed, GET /jobs/{id}, POST /jobs/{id}/resume (api_server.py)
+- Streamlit: ui_admin 지식 재건축 탭
+"""
+import sys
+import argparse
+import threading
+
+from logic_ai import get_embeddings_batch, embedding_profile
+from llm_scheduler import llm_priority, PRIORITY_BACKFILL
+from ingest_pipeline import IngestError, JobOwnershipLost, JOB_STALE_SEC, new_owner_token, job_heartbeat
+
+TABLES = ["manual_base", "knowledge_base", "community_posts"]   # [V272] 커뮤니티 질문 (유사 질문 검색)
+PAGE_SIZE = 200
+
+
+def row_text(table_name, row):
+    # 새 행을 넣을 때와 같은 텍스트로 임베딩 (promote_to_knowledge / ingest_pipeline 참고)
+    if table_name == "knowledge_base":
+        return f"{row.get('issue') or ''}\n{row.get('solution') or ''}"
+    if table_name == "community_posts":
+        return f"{row.get('title') or ''}\n{row.get('content') or ''}"
+    return row.get("content") or ""
+
+
+class ReembedEngine:
+    def __init__(self, ai_model, db):
+        self.ai_model = ai_model
+        self.db = db
+        self._on_progress = None
+        self._owner = None
+
+    def create_job(self, profile=None):
+        owner = new_owner_token()
+        job = self.db.create_ingest_job(None, embedding_profile(profile)["name"], kind="reembed", owner=owner)
+        if not job: raise IngestError("ingest_jobs 작업 생성 실패")
+        self._owner = owner
+        return job
+
+    def claim(self, job_id):
+        """재개 전 선점 (완료됐거나 다른 곳에서 실행 중이면 None)"""
+        owner = new_owner_token()
+        job = self.db.claim_ingest_job(job_id, owner, JOB_STALE_SEC)
+        if job: self._owner = owner
+        return job
+
+    def start_background(self, job_id, file_bytes=None, on_progress=None):
+        """IngestionEngine 과 같은 시그니처 (file_bytes 는 쓰지 않음)"""
+        t = threading.Thread(target=self.run, args=(job_id, on_progress), daemon=True, name=f"ingest-{job_id}")
+        t.start()
+        return t
+
+    def run(self, job_id, on_progress=None):
+        job = self.db.get_ingest_job(job_id)
+        if not job: raise IngestError(f"작업 #{job_id} 없음")
+        if job["status"] == "done": return job
+
+        if not self._owner and not self.claim(job_id):
+            raise IngestError(f"작업 #{job_id} 는 다른 곳에서 실행 중입니다.")
+
+        self._on_progress = on_progress
+        prof = embedding_profile(job.get("mode"))
+        state = job.get("state") or {}
+        if not state.get("tables"):
+            # 시작 시점 대상 수 (진행률 표시용, 이후 새로 들어온 행은 같은 작업 안에서 함께 처리됨)
+            state = {"tables": {t: {"after_id": 0, "total": self.db.count_reembed_targets(t, prof["version"], prof["column"], prof["model_column"]),
+                                    "updated": 0, "failed": 0, "done": False} for t in TABLES}}
+        try:
+            with llm_priority(PRIORITY_BACKFILL), job_heartbeat(self.db, job_id, self._owner):
+                for table_name in TABLES:
+                    if table_name not in state["tables"]: continue   # 대상 추가 전에 만든 작업
+                    self._reembed_table(job, state, table_name, prof)
+            self._checkpoint(job, "done", state, 1.0, self._summary(state), status="done")
+        except Exception as e:
+            self.db.update_ingest_job(job_id, owner=self._owner, status="failed", message=str(e)[:500])
+            raise
+        return self.db.get_ingest_job(job_id)
+
+    def _checkpoint(self, job, stage, state, progress, message, status="running"):
+        if self.db.update_ingest_job(job["id"], owner=self._owner, stage=stage, state=state, progress=round(progress, 4),
+                                     message=message, status=status) is False:
+            raise JobOwnershipLost(f"작업 #{job['id']} 를 다른 곳에서 재개하여 이 실행을 중단합니다.")
+        if self._on_progress: self._on_progress(stage, progress, message)
+
+    def _progress(self, state):
+        tables = state["tables"].values()
+        total = sum(t["total"] for t in tables)
+        done = sum(t["updated"] + t["failed"] for t in tables)
+        return min(done / total, 0.99) if total else 0.99
+
+    def _summary(self, state):
+        return " · ".join(f"{name}: 갱신 {t['updated']} / 실패 {t['failed']}" for name, t in state["tables"].items())
+
+    def _reembed_table(self, job, state, table_name, prof):
+        t_state = state["tables"][table_name]
+        columns = (prof["column"], prof["model_column"])
+        while not t_state["done"]:
+            rows = self.db.get_reembed_targets(table_name, prof["version"], t_state["after_id"], PAGE_SIZE, *columns)
+            if not rows:
+                t_state["done"] = True
+                break
+
+            vectors = get_embeddings_batch([row_text(table_name, r) for r in rows], priority=PRIORITY_BACKFILL,
+                                           profile=prof["name"])
+            updates = [{"id": r["id"], "embedding": vec} for r, vec in zip(rows, vectors) if vec]
+            t_state["updated"] += self.db.bulk_update_embeddings(table_name, updates, prof["version"], *columns)
+            # 임베딩 실패 행은 건너뛰고 다음 작업에서 다시 대상이 됨
+            t_state["failed"] += len(rows) - len(updates)
+            t_state["after_id"] = rows[-1]["id"]
+            if len(rows) < PAGE_SIZE: t_state["done"] = True
+            self._checkpoint(job, table_name, state, self._progress(state), self._summary(state))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="벡터 재임베딩 (재개 가능)")
+    parser.add_argument("--resume", type=int, default=None, help="재개할 작업 ID")
+    parser.add_argument("--profile", default=None, help="채울 임베딩 프로필 (기본: 현재 검색 프로필)")
+    args = parser.parse_args(argv)
+
+    # api_server 가 Streamlit 스텁과 환경변수 기반 클라이언트 초기화를 담당
+    from api_server import _get_clients
+    ai_model, db = _get_clients()
+    engine = ReembedEngine(ai_model, db)
+    profile = args.profile or db.get_active_embedding_profile()
+    job_id = args.resume or engine.create_job(profile)["id"]
+    if args.resume and not engine.claim(job_id):
+        parser.error(f"작업 #{job_id} 는 완료되었거나 다른 곳에서 실행 중입니다.")
+
+    print(f"🔢 재임베딩 작업 #{job_id} 시작 ({embedding_profile(profile)['version']})")
+    job = engine.run(job_id, on_progress=lambda stage, p, msg: print(f"[{stage:>14}] {p * 100:5.1f}% {msg}", file=sys.stderr))
+    print(f"✅ 작업 #{job_id}: {job.get('status')} - {job.get('message')}")
+
+
+if __name__ == "__main__":
+    main()
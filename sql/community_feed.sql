@@ -0,0 +1,7 @@
+-- [V270] 커뮤니티 피드 페이지 조회용 인덱스
+-- Supabase SQL Editor 에서 1회 실행합니다.
+
+-- 피드: community_comments(count) 임베드 집계와 글별 댓글 조회가 post_id 로 바로 찾도록
+create index if not exists community_comments_post_created_idx on community_comments (post_id, created_at);
+-- 제조사 필터 + 최신순 키셋 (id desc)
+create index if not exists community_posts_mfr_id_idx on community_posts (manufacturer, id desc);
@@ -0,0 +1,72 @@
+-- [V272] 커뮤니티 질문 임베딩 + 유사 질문 검색 RPC
+-- Supabase SQL Editor 에서 1회 실행합니다. (sql/embedding_profiles.sql 이후)
+--
+-- 글 작성/수정 시 제목 + 내용 벡터를 함께 저장하고(db_services.add_community_post),
+-- 질문 작성 화면에서 비슷한 기존 질문/지식을 바로 찾습니다.
+-- 기존 글은 재임베딩 작업(reembed_pipeline.py)이 community_posts 도 대상으로 채웁니다.
+
+alter table community_posts add column if not exists embedding vector(768);
+alter table community_posts add column if not exists embedding_model text;
+alter table community_posts add column if not exists embedding_v2 vector(1536);
+alter table community_posts add column if not exists embedding_v2_model text;
+
+create index if not exists community_posts_embedding_idx on community_posts using hnsw (embedding vector_cosine_ops);
+create index if not exists community_posts_embedding_v2_idx on community_posts using hnsw (embedding_v2 vector_cosine_ops);
+
+-- match_knowledge_v2 와 같은 형태 (벡터 제외 행 + similarity + comment_count)
+create or replace function match_community_posts(query_embedding vector(768), match_threshold float, match_count int)
+returns setof jsonb
+language sql stable
+as $$
+    select (to_jsonb(p) - 'embedding' - 'embedding_v2')
+           || jsonb_build_object('similarity', 1 - (p.embedding <=> query_embedding),
+                                 'comment_count', (select count(*) from community_comments c where c.post_id = p.id))
+      from community_posts p
+     where p.embedding is not null
+       and 1 - (p.embedding <=> query_embedding) > match_threshold
+     order by p.embedding <=> query_embedding
+     limit match_count;
+$$;
+
+create or replace function match_community_posts_v2(query_embedding vector(1536), match_threshold float, match_count int)
+returns setof jsonb
+language sql stable
+as $$
+    select (to_jsonb(p) - 'embedding' - 'embedding_v2')
+           || jsonb_build_object('similarity', 1 - (p.embedding_v2 <=> query_embedding),
+                                 'comment_count', (select count(*) from community_comments c where c.post_id = p.id))
+      from community_posts p
+     where p.embedding_v2 is not null
+       and 1 - (p.embedding_v2 <=> query_embedding) > match_threshold
+     order by p.embedding_v2 <=> query_embedding
+     limit match_count;
+$$;
+
+-- 재임베딩 RPC 대상에 community_posts 추가
+create or replace function bulk_update_embeddings(p_table text, p_rows jsonb, p_model text, p_column text default 'embedding')
+returns integer
+language plpgsql
+as $$
+declare
+    updated integer;
+begin
+    if p_table not in ('manual_base', 'knowledge_base', 'community_posts') then
+        raise exception 'unsupported table: %', p_table;
+    end if;
+    if p_column not in ('embedding', 'embedding_v2') then
+        raise exception 'unsupported column: %', p_column;
+    end if;
+
+    execute format(
+        'update %I t
+            set %I = (r.value->>''embedding'')::vector,
+                %I = $2
+           from jsonb_array_elements($1) r
+          where t.id = (r.value->>''id'')::bigint',
+        p_table, p_column, case p_column when 'embedding' then 'embedding_model' else p_column || '_model' end)
+    using p_rows, p_model;
+
+    get diagnostics updated = row_count;
+    return updated;
+end;
+$$;
@@ -0,0 +1,80 @@
+-- [V262] 임베딩 프로필 섀도 컬럼 + 앱 설정 (무중단 임베딩 모델 교체)
+-- Supabase SQL Editor 에서 1회 실행합니다. (sql/reembed.sql 이후)
+--
+-- 절차: 1) embedding_shadow_profile = 'v2' 설정 → 새 행은 v1/v2 를 함께 기록
+--       2) 재임베딩 작업(--profile v2)으로 기존 행의 embedding_v2 채움
+--       3) embedding_migration.py validate 로 v1/v2 검색 결과 겹침·지연 비교
+--       4) embedding_migration.py switch v2 → embedding_profile 한 줄 갱신으로 전환
+-- v2 차원을 바꾸면 아래 vector(1536) 과 EMBEDDING_V2_DIM 환경변수를 함께 맞춥니다.
+
+create table if not exists app_config (
+    key         text primary key,
+    value       jsonb,
+    updated_at  timestamptz not null default now()
+);
+insert into app_config (key, value) values ('embedding_profile', '"v1"') on conflict (key) do nothing;
+
+alter table manual_base add column if not exists embedding_v2 vector(1536);
+alter table manual_base add column if not exists embedding_v2_model text;
+alter table knowledge_base add column if not exists embedding_v2 vector(1536);
+alter table knowledge_base add column if not exists embedding_v2_model text;
+
+create index if not exists manual_base_embedding_v2_idx on manual_base using hnsw (embedding_v2 vector_cosine_ops);
+create index if not exists knowledge_base_embedding_v2_idx on knowledge_base using hnsw (embedding_v2 vector_cosine_ops);
+
+-- match_manual / match_knowledge 와 같은 형태(행 컬럼 + similarity)로 반환, 벡터 컬럼은 제외
+create or replace function match_manual_v2(query_embedding vector(1536), match_threshold float, match_count int)
+returns setof jsonb
+language sql stable
+as $$
+    select (to_jsonb(m) - 'embedding' - 'embedding_v2')
+           || jsonb_build_object('similarity', 1 - (m.embedding_v2 <=> query_embedding))
+      from manual_base m
+     where m.embedding_v2 is not null
+       and 1 - (m.embedding_v2 <=> query_embedding) > match_threshold
+     order by m.embedding_v2 <=> query_embedding
+     limit match_count;
+$$;
+
+create or replace function match_knowledge_v2(query_embedding vector(1536), match_threshold float, match_count int)
+returns setof jsonb
+language sql stable
+as $$
+    select (to_jsonb(k) - 'embedding' - 'embedding_v2')
+           || jsonb_build_object('similarity', 1 - (k.embedding_v2 <=> query_embedding))
+      from knowledge_base k
+     where k.embedding_v2 is not null
+       and 1 - (k.embedding_v2 <=> query_embedding) > match_threshold
+     order by k.embedding_v2 <=> query_embedding
+     limit match_count;
+$$;
+
+-- bulk_update_embeddings 에 대상 컬럼 인자 추가 (embedding / embedding_v2)
+drop function if exists bulk_update_embeddings(text, jsonb, text);
+create or replace function bulk_update_embeddings(p_table text, p_rows jsonb, p_model text, p_column text default 'embedding')
+returns integer
+language plpgsql
+as $$
+declare
+    updated integer;
+begin
+    if p_table not in ('manual_base', 'knowledge_base') then
+        raise exception 'unsupported table: %', p_table;
+    end if;
+    if p_column not in ('embedding', 'embedding_v2') then
+        raise exception 'unsupported column: %', p_column;
+    end if;
+
+    execute format(
+        'update %I t
+            set %I = (r.value->>''embedding'')::vector,
+                %I = $2
+           from jsonb_array_elements($1) r
+          where t.id = (r.value->>''id'')::bigint',
+        p_table, p_column, case p_column when 'embedding' then 'embedding_model' else p_column || '_model' end)
+    using p_rows, p_model;
+
+    get diagnostics updated = row_count;
+    return updated;
+end;
+$$;
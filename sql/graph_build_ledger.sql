@@ -0,0 +1,44 @@
+-- [V263] 그래프 빌드 원장: 문서별로 어떤 내용(content_hash)을 어떤 추출기 버전으로 처리했는지 기록
+-- Supabase SQL Editor 에서 1회 실행합니다.
+
+create table if not exists graph_build_ledger (
+    table_name         text not null,        -- manual_base / knowledge_base
+    doc_id             bigint not null,
+    content_hash       text not null,
+    extractor_version  text not null,
+    triple_count       integer not null default 0,
+    built_at           timestamptz not null default now(),
+    primary key (table_name, doc_id)
+);
+
+create index if not exists knowledge_graph_doc_source_idx on knowledge_graph (doc_id, source_type);
+
+-- 바뀐 문서의 옛 트리플 삭제 + 새 트리플 삽입 + 원장 갱신을 한 트랜잭션으로 처리
+-- p_triples: [{"source","relation","target","doc_id","source_type"}], p_ledger: [{"table_name","doc_id","content_hash","extractor_version","triple_count"}]
+create or replace function replace_doc_triples(p_source_type text, p_doc_ids bigint[], p_triples jsonb, p_ledger jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+    inserted integer;
+begin
+    delete from knowledge_graph where doc_id = any(p_doc_ids) and source_type = p_source_type;
+
+    insert into knowledge_graph (source, relation, target, doc_id, source_type)
+    select t->>'source', t->>'relation', t->>'target', (t->>'doc_id')::bigint, t->>'source_type'
+      from jsonb_array_elements(p_triples) t;
+    get diagnostics inserted = row_count;
+
+    insert into graph_build_ledger (table_name, doc_id, content_hash, extractor_version, triple_count, built_at)
+    select l->>'table_name', (l->>'doc_id')::bigint, l->>'content_hash', l->>'extractor_version',
+           coalesce((l->>'triple_count')::int, 0), now()
+      from jsonb_array_elements(p_ledger) l
+    on conflict (table_name, doc_id) do update
+       set content_hash = excluded.content_hash,
+           extractor_version = excluded.extractor_version,
+           triple_count = excluded.triple_count,
+           built_at = excluded.built_at;
+
+    return inserted;
+end;
+$$;
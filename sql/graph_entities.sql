@@ -0,0 +1,37 @@
+-- [V264] 지식 그래프 노드 별칭 + 중복 관계 weight
+-- Supabase SQL Editor 에서 1회 실행합니다.
+
+-- alias_key: 소문자·NFKC·공백/구두점 제거한 키 (db_services.normalize_entity_key)
+create table if not exists graph_entity_aliases (
+    alias_key   text primary key,
+    canonical   text not null,
+    created_at  timestamptz not null default now()
+);
+
+-- 같은 문서에서 반복 추출된 동일 관계를 한 행으로 접은 횟수
+alter table knowledge_graph add column if not exists weight integer not null default 1;
+
+-- 노드 병합/중복 정리를 한 트랜잭션으로 적용
+-- p_updates: [{"id","source","target","weight"}], p_delete_ids: 병합되어 사라지는 관계 id
+create or replace function apply_graph_compaction(p_updates jsonb, p_delete_ids bigint[])
+returns integer
+language plpgsql
+as $$
+declare
+    changed integer;
+    removed integer;
+begin
+    update knowledge_graph g
+       set source = u->>'source',
+           target = u->>'target',
+           weight = (u->>'weight')::int
+      from jsonb_array_elements(p_updates) u
+     where g.id = (u->>'id')::bigint;
+    get diagnostics changed = row_count;
+
+    delete from knowledge_graph where id = any(p_delete_ids);
+    get diagnostics removed = row_count;
+
+    return changed + removed;
+end;
+$$;
@@ -0,0 +1,36 @@
+-- [V254] 매뉴얼 학습 작업 체크포인트 테이블
+-- Supabase SQL Editor 에서 1회 실행합니다.
+
+create table if not exists ingest_jobs (
+    id          bigserial primary key,
+    kind        text not null default 'manual',      -- manual / reembed / ...
+    file_name   text,
+    mode        text,                                 -- vector / graph
+    use_ocr     boolean not null default false,
+    status      text not null default 'pending',      -- pending / running / failed / done
+    stage       text not null default 'extract',      -- extract → chunk → metadata → embed → insert → triples → done
+    progress    real not null default 0,
+    message     text,
+    state       jsonb not null default '{}'::jsonb,   -- 단계별 체크포인트 (청크 목록, next_chunk 등)
+    created_at  timestamptz not null default now(),
+    updated_at  timestamptz not null default now()
+);
+
+create index if not exists ingest_jobs_kind_created_idx on ingest_jobs (kind, created_at desc);
+
+-- 청크 행을 작업과 연결하여 재개 시 반쯤 들어간 행을 정리합니다.
+alter table manual_base add column if not exists ingest_job_id bigint;
+alter table manual_base add column if not exists chunk_index integer;
+create index if not exists manual_base_ingest_job_idx on manual_base (ingest_job_id, chunk_index);
+
+-- 실행 소유 토큰: 선점(claim)할 때 새로 발급, 체크포인트/하트비트는 토큰이 같을 때만 반영
+-- (다른 곳에서 재개해 토큰이 바뀌면 이전 엔진은 다음 체크포인트에서 멈춤)
+alter table ingest_jobs add column if not exists owner text;
+
+-- 청크 목록(본문·페이지 범위·해시·문서 앞부분)은 분할 단계에서 1회만 저장하고,
+-- ingest_jobs.state 에는 진행 커서만 남겨 체크포인트마다 전체 청크를 다시 쓰지 않음
+create table if not exists ingest_job_chunks (
+    job_id      bigint primary key references ingest_jobs(id) on delete cascade,
+    data        jsonb not null,
+    created_at  timestamptz not null default now()
+);
@@ -0,0 +1,57 @@
+-- [V268] 소모품 일별 입/출고 집계 (소모 속도·재주문 예측용)
+-- Supabase SQL Editor 에서 1회 실행합니다.
+--
+-- inventory_logs 전체를 매번 다시 읽지 않고, 아직 집계에 넣지 않은 로그(aggregated = false)만
+-- inventory_analytics.refresh_usage 가 읽어 이 표에 더합니다.
+-- (id 워터마크 대신 행 단위 표시: created_at 이 id 순서를 따르지 않거나 늦게 커밋된 로그도 빠짐없이 반영)
+
+create table if not exists inventory_usage_daily (
+    item_id     bigint not null references inventory_items(id) on delete cascade,
+    day         date not null,                         -- Asia/Seoul 기준 날짜
+    qty_in      integer not null default 0,
+    qty_out     integer not null default 0,
+    moves       integer not null default 0,
+    primary key (item_id, day)
+);
+create index if not exists inventory_usage_daily_day_idx on inventory_usage_daily (day);
+
+alter table inventory_logs add column if not exists aggregated boolean not null default false;
+create index if not exists inventory_logs_unaggregated_idx on inventory_logs (id) where not aggregated;
+
+-- p_ids 중 아직 집계되지 않은 로그만 표시하고(행 잠금), 그 로그들로 일별 증분을 계산해 더함 → 한 트랜잭션
+-- 두 프로세스가 같은 로그를 넘겨도 먼저 표시한 쪽만 더함 (나중 쪽은 aggregated 가 이미 true 라 0건)
+-- 반환: 이번에 반영한 로그 수
+create or replace function merge_inventory_usage_logs(p_ids bigint[])
+returns integer
+language plpgsql
+as $$
+declare
+    n integer;
+begin
+    -- 표시 update 로 재고 데이터 버전(V269)이 오르지 않도록 (트랜잭션 한정)
+    perform set_config('inventory.usage_rpc', 'on', true);
+
+    with picked as (
+        update inventory_logs l
+           set aggregated = true
+         where l.id = any(p_ids)
+           and not l.aggregated
+        returning l.item_id, l.change_type, l.quantity, l.created_at
+    ), merged as (
+        insert into inventory_usage_daily (item_id, day, qty_in, qty_out, moves)
+        select p.item_id, (p.created_at at time zone 'Asia/Seoul')::date,
+               sum(case when p.change_type = '입고' then coalesce(p.quantity, 0) else 0 end)::integer,
+               sum(case when p.change_type = '출고' then coalesce(p.quantity, 0) else 0 end)::integer,
+               count(*)::integer
+          from picked p
+         where exists (select 1 from inventory_items i where i.id = p.item_id)   -- 삭제된 품목 로그 제외
+         group by 1, 2
+        on conflict (item_id, day) do update
+           set qty_in  = inventory_usage_daily.qty_in  + excluded.qty_in,
+               qty_out = inventory_usage_daily.qty_out + excluded.qty_out,
+               moves   = inventory_usage_daily.moves   + excluded.moves
+    )
+    select count(*) into n from picked;
+    return n;
+end;
+$$;
@@ -0,0 +1,39 @@
+-- [V269] 재고 데이터 버전 (목록 API 의 ETag / 조건부 GET)
+-- Supabase SQL Editor 에서 1회 실행합니다. (sql/embedding_profiles.sql 의 app_config 필요)
+--
+-- inventory_items / inventory_logs 를 바꾸는 모든 문장(앱, RPC, SQL Editor 직접 수정 포함)이
+-- app_config.inventory_version 을 1 올립니다. API 는 이 값만 읽어 If-None-Match 와 같으면 304 를 돌려줍니다.
+-- (문장 단위 트리거라 일괄 등록 1회 = 버전 +1, 같은 행을 갱신하므로 재고 쓰기끼리는 잠깐 직렬화됨)
+
+insert into app_config (key, value) values ('inventory_version', '0') on conflict (key) do nothing;
+
+create or replace function bump_inventory_version()
+returns trigger
+language plpgsql
+as $$
+begin
+    -- 사용량 집계 표시(inventory_logs.aggregated)만 바뀐 경우는 목록 데이터가 그대로이므로 제외 (sql/inventory_usage.sql)
+    if current_setting('inventory.usage_rpc', true) = 'on' then
+        return null;
+    end if;
+    update app_config
+       set value = to_jsonb(coalesce((value #>> '{}')::bigint, 0) + 1),
+           updated_at = now()
+     where key = 'inventory_version';
+    return null;
+end;
+$$;
+
+drop trigger if exists inventory_items_version_trg on inventory_items;
+create trigger inventory_items_version_trg
+after insert or update or delete or truncate on inventory_items
+for each statement execute function bump_inventory_version();
+
+drop trigger if exists inventory_logs_version_trg on inventory_logs;
+create trigger inventory_logs_version_trg
+after insert or update or delete or truncate on inventory_logs
+for each statement execute function bump_inventory_version();
+
+-- 키셋 페이지네이션용 (id 커서 + 필터)
+create index if not exists inventory_items_category_id_idx on inventory_items (category, id);
+create index if not exists inventory_logs_item_id_idx on inventory_logs (item_id, id desc);
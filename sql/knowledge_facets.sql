@@ -0,0 +1,67 @@
+-- [V273] 지식 DB 탐색용 facet 집계 (제조사 × 측정항목 건수)
+-- Supabase SQL Editor 에서 1회 실행합니다.
+--
+-- /explore/manufacturers, /explore/measurement-items 가 knowledge_base 전체를 읽어 중복 제거하던 것을
+-- (제조사, 측정항목) 쌍별 건수 표 하나로 대신합니다. 제조사별/항목별 건수는 쌍을 합산.
+-- knowledge_base 의 insert/delete/라벨 update 마다 트리거가 해당 쌍만 ±1 합니다.
+-- (빈 값은 '' 로 저장, 어긋났다고 의심되면 select rebuild_knowledge_facets(); 로 전체 재계산)
+
+create table if not exists knowledge_facets (
+    manufacturer      text not null default '',
+    measurement_item  text not null default '',
+    doc_count         integer not null default 0,
+    primary key (manufacturer, measurement_item)
+);
+
+create or replace function knowledge_facets_apply()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        update knowledge_facets
+           set doc_count = doc_count - 1
+         where manufacturer = coalesce(old.manufacturer, '')
+           and measurement_item = coalesce(old.measurement_item, '');
+        delete from knowledge_facets
+         where manufacturer = coalesce(old.manufacturer, '')
+           and measurement_item = coalesce(old.measurement_item, '')
+           and doc_count <= 0;
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        insert into knowledge_facets (manufacturer, measurement_item, doc_count)
+        values (coalesce(new.manufacturer, ''), coalesce(new.measurement_item, ''), 1)
+        on conflict (manufacturer, measurement_item)
+        do update set doc_count = knowledge_facets.doc_count + 1;
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists knowledge_base_facets_trg on knowledge_base;
+create trigger knowledge_base_facets_trg
+after insert or delete or update of manufacturer, measurement_item on knowledge_base
+for each row execute function knowledge_facets_apply();
+
+create or replace function rebuild_knowledge_facets()
+returns integer
+language plpgsql
+as $$
+declare
+    n integer;
+begin
+    lock table knowledge_facets in exclusive mode;
+    delete from knowledge_facets;
+    insert into knowledge_facets (manufacturer, measurement_item, doc_count)
+    select coalesce(manufacturer, ''), coalesce(measurement_item, ''), count(*)
+      from knowledge_base
+     group by 1, 2;
+    get diagnostics n = row_count;
+    return n;
+end;
+$$;
+
+select rebuild_knowledge_facets();
+
+-- /explore/issues 필터 + id 키셋
+create index if not exists knowledge_base_mfr_item_id_idx on knowledge_base (manufacturer, measurement_item, id);
@@ -0,0 +1,63 @@
+-- [V271] 커뮤니티 답변 → 지식 DB 승격 대기열 (write-behind)
+-- Supabase SQL Editor 에서 1회 실행합니다.
+--
+-- 답변 저장과 승격을 분리합니다. 답변이 저장되면 트리거가 대기열에 1행을 넣고(같은 트랜잭션),
+-- knowledge_promotion.py 워커가 임베딩을 묶음으로 만들어 knowledge_base 에 넣습니다.
+-- 멱등 키: "post_id:comment_id" (대기열, knowledge_base 양쪽 unique → 재시도/중복 실행에도 1건)
+
+create table if not exists knowledge_promotions (
+    id              bigserial primary key,
+    idem_key        text not null unique,                  -- post_id:comment_id
+    post_id         bigint not null,
+    comment_id      bigint not null,
+    status          text not null default 'pending',       -- pending / running / done / failed
+    attempts        integer not null default 0,
+    last_error      text,
+    knowledge_id    bigint,
+    next_attempt_at timestamptz not null default now(),
+    lease_until     timestamptz,
+    created_at      timestamptz not null default now(),
+    updated_at      timestamptz not null default now()
+);
+create index if not exists knowledge_promotions_due_idx on knowledge_promotions (status, next_attempt_at);
+
+alter table knowledge_base add column if not exists promotion_key text;
+create unique index if not exists knowledge_base_promotion_key_idx on knowledge_base (promotion_key);
+
+-- 답변 insert → 대기열 (앱/Flutter/SQL 어디서 넣어도 누락 없음)
+create or replace function enqueue_knowledge_promotion()
+returns trigger
+language plpgsql
+as $$
+begin
+    insert into knowledge_promotions (idem_key, post_id, comment_id)
+    values (new.post_id || ':' || new.id, new.post_id, new.id)
+    on conflict (idem_key) do nothing;
+    return new;
+end;
+$$;
+
+drop trigger if exists community_comments_promote_trg on community_comments;
+create trigger community_comments_promote_trg
+after insert on community_comments
+for each row execute function enqueue_knowledge_promotion();
+
+-- 처리할 행을 잠금 없이 나눠 가져가기 (여러 워커 동시 실행 안전)
+-- 대상: 시도 시각이 된 pending + 임대(lease)가 만료된 running (워커가 중간에 죽은 경우)
+create or replace function claim_knowledge_promotions(p_limit integer, p_lease_sec integer default 300)
+returns setof knowledge_promotions
+language sql
+as $$
+    update knowledge_promotions q
+       set status = 'running',
+           lease_until = now() + make_interval(secs => p_lease_sec),
+           updated_at = now()
+     where q.id in (
+           select id from knowledge_promotions
+            where (status = 'pending' and next_attempt_at <= now())
+               or (status = 'running' and lease_until < now())
+            order by id
+            limit p_limit
+              for update skip locked)
+    returning q.*;
+$$;
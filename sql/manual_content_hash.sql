@@ -0,0 +1,5 @@
+-- [V258] 매뉴얼 청크 content_hash (재업로드 시 바뀐 청크만 처리)
+-- Supabase SQL Editor 에서 1회 실행합니다.
+
+alter table manual_base add column if not exists content_hash text;
+create index if not exists manual_base_file_hash_idx on manual_base (file_name, domain, content_hash);
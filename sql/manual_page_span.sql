@@ -0,0 +1,5 @@
+-- [V259] 매뉴얼 청크의 원문 페이지 범위 (1부터, 청크가 걸친 첫/마지막 페이지)
+-- Supabase SQL Editor 에서 1회 실행합니다.
+
+alter table manual_base add column if not exists page_start integer;
+alter table manual_base add column if not exists page_end integer;
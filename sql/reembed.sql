@@ -0,0 +1,40 @@
+-- [V261] 재임베딩 작업: 행별 임베딩 모델 버전 + 일괄 갱신 RPC
+-- Supabase SQL Editor 에서 1회 실행합니다.
+
+alter table manual_base add column if not exists embedding_model text;
+alter table knowledge_base add column if not exists embedding_model text;
+
+-- 지금까지의 벡터는 모두 gemini-embedding-001 (768차원) 으로 생성됨
+update manual_base set embedding_model = 'gemini-embedding-001@768'
+ where embedding is not null and embedding_model is null;
+update knowledge_base set embedding_model = 'gemini-embedding-001@768'
+ where embedding is not null and embedding_model is null;
+
+-- 키셋 페이지네이션용 (id 순서로 대상 행만 훑음)
+create index if not exists manual_base_embedding_model_idx on manual_base (embedding_model, id);
+create index if not exists knowledge_base_embedding_model_idx on knowledge_base (embedding_model, id);
+
+-- p_rows: [{"id": 1, "embedding": [...]}, ...] 를 한 번의 요청으로 갱신
+create or replace function bulk_update_embeddings(p_table text, p_rows jsonb, p_model text)
+returns integer
+language plpgsql
+as $$
+declare
+    updated integer;
+begin
+    if p_table not in ('manual_base', 'knowledge_base') then
+        raise exception 'unsupported table: %', p_table;
+    end if;
+
+    execute format(
+        'update %I t
+            set embedding = (r.value->>''embedding'')::vector,
+                embedding_model = $2
+           from jsonb_array_elements($1) r
+          where t.id = (r.value->>''id'')::bigint', p_table)
+    using p_rows, p_model;
+
+    get diagnostics updated = row_count;
+    return updated;
+end;
+$$;
@@ -0,0 +1,156 @@
+-- [V267] 재고 입/출고 원자 처리 RPC
+-- Supabase SQL Editor 에서 1회 실행합니다.
+
+-- ---------------------------------------------------------------
+-- 기존 이력 → 수량 트리거 확인 (RPC 설치 전에 먼저)
+-- 예전에는 inventory_logs 에 행만 넣으면 별도 트리거가 current_qty 를 바꿨고, 그 트리거가 남으면
+-- 아래 RPC 와 함께 같은 이동이 두 번 반영됩니다. 이름은 배포마다 달라 추측해서 지우지 않습니다.
+-- legacy_triggers 가 비어 있는데 current_qty 를 건드리는 트리거가 있으면 후보를 보여주고 멈춥니다.
+-- 확인 후 지울 이중 반영 트리거는 legacy_triggers 에, 관계없는 트리거(감사/검증 등)는
+-- keep_triggers 에 적고 다시 실행하세요. (후보가 없으면 그대로 진행)
+-- ---------------------------------------------------------------
+do $$
+declare
+    legacy_triggers text[] := array[]::text[];   -- 예: array['on_inventory_log_insert']
+    keep_triggers   text[] := array[]::text[];
+    name text;
+    pending text;
+begin
+    foreach name in array legacy_triggers loop
+        raise notice '기존 이력→수량 트리거 제거: %', name;
+        execute format('drop trigger if exists %I on inventory_logs', name);
+    end loop;
+
+    select string_agg(tg.tgname || ' (' || p.proname || ')', ', ')
+      into pending
+      from pg_trigger tg
+      join pg_proc p on p.oid = tg.tgfoid
+     where tg.tgrelid = 'inventory_logs'::regclass
+       and not tg.tgisinternal
+       and tg.tgname <> 'inventory_logs_apply_qty_trg'
+       and tg.tgname <> all(keep_triggers)
+       and p.prosrc ilike '%current_qty%';
+    if pending is not null then
+        raise exception 'current_qty 를 바꾸는 inventory_logs 트리거 확인 필요: %', pending
+            using hint = '이중 반영 트리거는 legacy_triggers 에, 관계없는 트리거는 keep_triggers 에 적고 다시 실행하세요.';
+    end if;
+end;
+$$;
+
+-- p_movements: [{"item_id", "change_type", "quantity", "worker_name", "reason",
+--                "expected_qty"(선택), "allow_negative"(선택)}]
+--   change_type: 입고(+quantity) / 출고(-quantity) / 설정(current_qty = quantity)
+--   expected_qty: 처리 직전 수량이 이 값이 아니면 거부 (화면에서 본 수량 기준 낙관적 잠금)
+-- 전체가 한 트랜잭션: 하나라도 조건(재고 부족 등)에 걸리면 아무것도 반영하지 않고
+--   {"ok": false, "error": {"index", "item_id", "error", "current_qty"}} 반환
+-- 성공: {"ok": true, "results": [{"index", "item_id", "before", "after", "log_id"}]}
+create or replace function apply_stock_movements(p_movements jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+    m        jsonb;
+    idx      integer := -1;
+    v_item   bigint;
+    v_type   text;
+    v_qty    integer;
+    v_old    integer;
+    v_new    integer;
+    v_reason text;
+    v_log_id bigint;
+    v_results jsonb := '[]'::jsonb;
+begin
+    -- 아래 inventory_logs 트리거가 같은 이동을 다시 반영하지 않도록 표시 (트랜잭션 한정)
+    perform set_config('inventory.movement_rpc', 'on', true);
+
+    begin
+        -- 관련 품목을 id 순으로 한 번에 잠금 (동시 요청 간 교착 방지, 이후 읽기-수정-쓰기 안전)
+        perform 1 from inventory_items
+         where id in (select (e->>'item_id')::bigint from jsonb_array_elements(p_movements) e)
+         order by id
+           for update;
+
+        for m in select * from jsonb_array_elements(p_movements) loop
+            idx := idx + 1;
+            v_item := (m->>'item_id')::bigint;
+            v_type := m->>'change_type';
+            v_qty  := coalesce((m->>'quantity')::integer, 0);
+
+            select current_qty into v_old from inventory_items where id = v_item;
+            if not found then
+                raise exception '%', jsonb_build_object('index', idx, 'item_id', v_item, 'error', '품목을 찾을 수 없음');
+            end if;
+            v_old := coalesce(v_old, 0);
+
+            if v_qty < 0 then
+                raise exception '%', jsonb_build_object('index', idx, 'item_id', v_item, 'error', '수량은 0 이상이어야 함');
+            end if;
+            if m ? 'expected_qty' and (m->>'expected_qty')::integer <> v_old then
+                raise exception '%', jsonb_build_object('index', idx, 'item_id', v_item, 'current_qty', v_old,
+                                                        'error', '다른 작업자가 먼저 수량을 변경함');
+            end if;
+
+            if v_type = '입고' then v_new := v_old + v_qty;
+            elsif v_type = '출고' then v_new := v_old - v_qty;
+            elsif v_type = '설정' then v_new := v_qty;
+            else
+                raise exception '%', jsonb_build_object('index', idx, 'item_id', v_item, 'error', '알 수 없는 구분: ' || coalesce(v_type, ''));
+            end if;
+
+            if v_new < 0 and not coalesce((m->>'allow_negative')::boolean, false) then
+                raise exception '%', jsonb_build_object('index', idx, 'item_id', v_item, 'current_qty', v_old,
+                                                        'error', '재고 부족');
+            end if;
+
+            v_log_id := null;
+            if v_new <> v_old then
+                update inventory_items set current_qty = v_new where id = v_item;
+                v_reason := m->>'reason';
+                if v_type = '설정' then
+                    v_reason := coalesce(nullif(v_reason, ''), '수량 설정') || ' (' || v_old || ' → ' || v_new || ')';
+                end if;
+                insert into inventory_logs (item_id, change_type, quantity, worker_name, reason)
+                values (v_item, case when v_new > v_old then '입고' else '출고' end, abs(v_new - v_old),
+                        m->>'worker_name', v_reason)
+                returning id into v_log_id;
+            end if;
+
+            v_results := v_results || jsonb_build_object('index', idx, 'item_id', v_item,
+                                                         'before', v_old, 'after', v_new, 'log_id', v_log_id);
+        end loop;
+    exception when raise_exception then
+        -- 블록 안의 변경은 모두 롤백됨
+        return jsonb_build_object('ok', false, 'error', sqlerrm::jsonb);
+    end;
+
+    return jsonb_build_object('ok', true, 'results', v_results);
+end;
+$$;
+
+-- ---------------------------------------------------------------
+-- 이력 → 수량 반영 트리거
+-- 이전에는 inventory_logs 에 행만 넣으면 별도 트리거가 current_qty 를 바꿨습니다.
+-- RPC 는 수량을 직접 바꾸므로, 그 트리거가 남아 있으면 같은 이동이 두 번 반영됩니다.
+-- → 기존 트리거는 파일 맨 앞 do 블록에서 이름으로 지우고, RPC 호출 중에는 건너뛰는 트리거로 교체합니다.
+--   (앱 구버전처럼 이력만 넣는 클라이언트도 계속 동작)
+-- ---------------------------------------------------------------
+create or replace function inventory_logs_apply_qty()
+returns trigger
+language plpgsql
+as $$
+begin
+    if current_setting('inventory.movement_rpc', true) = 'on' then
+        return new;
+    end if;
+    update inventory_items
+       set current_qty = coalesce(current_qty, 0)
+                         + case new.change_type when '입고' then new.quantity when '출고' then -new.quantity else 0 end
+     where id = new.item_id;
+    return new;
+end;
+$$;
+
+drop trigger if exists inventory_logs_apply_qty_trg on inventory_logs;
+create trigger inventory_logs_apply_qty_trg
+after insert on inventory_logs
+for each row execute function inventory_logs_apply_qty();
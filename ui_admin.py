@@ -1,17 +1,15 @@
 import streamlit as st
-import io
 import time
-import pdfplumber 
+import threading
+from datetime import datetime, timezone, timedelta
 
-# OCR 라이브러리 (없으면 비활성화)
-try:
-    import pytesseract
-    from pdf2image import convert_from_bytes
-    OCR_AVAILABLE = True
-except ImportError:
-    OCR_AVAILABLE = False
-
-from logic_ai import extract_metadata_ai, get_embedding, clean_text_for_db, semantic_split_v143, extract_triples_from_text, REL_MAP
+from logic_ai import REL_MAP, EMBEDDING_PROFILES, embedding_profile
+from llm_scheduler import get_scheduler
+from ingest_pipeline import IngestionEngine, IngestError, OCR_AVAILABLE, JOB_STALE_SEC
+from reembed_pipeline import ReembedEngine
+from embedding_migration import profile_status, validate, set_shadow, switch_profile
+from graph_etl import GraphETL, compact_graph
+from knowledge_promotion import kick as kick_promotion
 
 _CUSTOM_KEY = "__custom__"
 
@@ -41,6 +39,19 @@ def show_admin_ui(ai_model, db):
         except:
             st.warning("DB 연결 상태를 확인해주세요.")
 
+        # [V249] LLM 스케줄러 (쿼터 공유 현황)
+        st.markdown("#### 🚦 Gemini 호출 스케줄러")
+        metrics = get_scheduler().metrics()
+        if metrics["paused_sec"] > 0:
+            st.warning(f"⏸️ 429 백오프 중 (남은 시간 {metrics['paused_sec']}초)")
+        st.dataframe(
+            [{"클래스": k, "대기열": v["queue_depth"], "처리": v["granted"], "429": v["rate_limited"],
+              "오류": v["errors"], "평균 대기(ms)": v["avg_wait_ms"]} for k, v in metrics["classes"].items()],
+            use_container_width=True, hide_index=True
+        )
+
+        show_promotion_queue_ui(db)
+
     # 2. 매뉴얼 학습 (Graph 기능 추가됨)
     with tabs[1]:
         show_manual_upload_ui(ai_model, db)
@@ -89,14 +100,22 @@ def show_admin_ui(ai_model, db):
         # [A] 기존 기능: 벡터 임베딩 재생성
         with c_rb1:
             st.info("🔢 **벡터 인덱스(검색용)** 재구성")
+            active_profile = db.get_active_embedding_profile()
+            re_profile = st.selectbox("대상 임베딩 프로필", list(EMBEDDING_PROFILES),
+                                      index=list(EMBEDDING_PROFILES).index(active_profile) if active_profile in EMBEDDING_PROFILES else 0,
+                                      format_func=lambda n: f"{n} ({embedding_profile(n)['version']})" + (" · 검색 중" if n == active_profile else ""))
+            st.caption(f"임베딩이 없거나 `{embedding_profile(re_profile)['version']}` 이 아닌 행만 매뉴얼·지식 DB 모두 갱신합니다.")
             if st.button("🛠️ 벡터 재임베딩 시작", type="primary", use_container_width=True):
-                rows = db.supabase.table("manual_base").select("id, content").execute().data
-                if rows:
-                    pb = st.progress(0)
-                    for i, r in enumerate(rows):
-                        db.update_vector("manual_base", r['id'], get_embedding(r['content']))
-                        pb.progress((i+1)/len(rows))
-                    st.success("매뉴얼 벡터 갱신 완료!")
+                # [V261] 백그라운드 작업 (키셋 페이지 + 배치 임베딩 + 일괄 갱신, 체크포인트로 재개)
+                try:
+                    engine = ReembedEngine(ai_model, db)
+                    job = engine.create_job(re_profile)
+                    engine.start_background(job['id'])
+                    st.success(f"🔢 재임베딩 작업 #{job['id']} 시작!")
+                except IngestError as e:
+                    st.error(f"오류 발생: {str(e)}")
+            show_ingest_jobs(ai_model, db, kind="reembed")
+            show_embedding_migration_ui(db)
         
         # [B] 신규 기능: 지식 그래프 일괄 생성 (경험 데이터 포함)
         with c_rb2:
@@ -104,39 +123,21 @@ def show_admin_ui(ai_model, db):
             
             target_src = st.selectbox("변환 대상 선택", ["사람이 입력한 지식 (knowledge_base)", "PDF 매뉴얼 (manual_base)"])
             
+            st.caption("새로 들어왔거나 내용이 바뀐 문서만 추출합니다. (graph_build_ledger 기준)")
             if st.button("🚀 그래프 변환 시작 (Graph ETL)", type="secondary", use_container_width=True):
                 table = "knowledge_base" if "사람" in target_src else "manual_base"
-                source_type_val = "knowledge" if "사람" in target_src else "manual"
                 
                 with st.status(f"'{table}' 데이터를 분석하여 연결 고리를 추출합니다...", expanded=True) as status:
-                    data = db.supabase.table(table).select("*").execute().data
-                    if not data:
-                        st.warning("데이터가 없습니다.")
-                    else:
-                        total = len(data)
-                        count = 0
-                        pb2 = st.progress(0)
-                        
-                        for i, row in enumerate(data):
-                            if table == "knowledge_base":
-                                text_input = f"증상/이슈: {row.get('issue','')}\n해결책/노하우: {row.get('solution','')}"
-                            else:
-                                text_input = row.get('content', '')
-                            
-                            triples = extract_triples_from_text(ai_model, text_input)
-                            
-                            if triples:
-                                db.save_knowledge_triples(row['id'], triples)
-                                db.supabase.table("knowledge_graph")\
-                                    .update({"source_type": source_type_val})\
-                                    .eq("doc_id", row['id'])\
-                                    .eq("source_type", "manual")\
-                                    .execute() 
-                                count += len(triples)
-                                status.write(f"✅ ID {row['id']}: {len(triples)}개 관계 발견")
-                            
-                            pb2.progress((i+1)/total)
-                        st.success(f"작업 끝! 총 {count}개의 새로운 지식 연결고리가 생성되었습니다.")
+                    # [V263] 증분 처리 (키셋 페이지 + 원장 비교 + 바뀐 문서 트리플 교체)
+                    try:
+                        stats = GraphETL(ai_model, db).run(table, on_progress=status.write)
+                        if stats["processed"]:
+                            st.success(f"작업 끝! {stats['processed']}/{stats['scanned']}개 문서에서 "
+                                       f"총 {stats['triples']}개의 지식 연결고리를 갱신했습니다.")
+                        else:
+                            st.info(f"변경된 문서가 없습니다. ({stats['scanned']}건 확인)")
+                    except Exception as e:
+                        st.error(f"그래프 변환 실패: {e}")
 
     # 6. 라벨 승인
     with tabs[5]:
@@ -177,6 +178,27 @@ def show_admin_ui(ai_model, db):
                 else:
                     st.warning("단어를 입력해주세요.")
 
+        # [V264] 노드 병합 / 중복 관계 정리
+        with st.expander("🧹 노드 병합 / 중복 관계 정리 (별칭 등록)", expanded=False):
+            st.caption("대소문자·띄어쓰기·구두점만 다른 노드는 자동으로 합쳐집니다. 번역어처럼 표기가 다른 경우 별칭을 등록하세요.")
+            ac1, ac2, ac3 = st.columns([2, 2, 1])
+            a_alias = ac1.text_input("별칭 (예: TOC 분석기)", key="alias_from")
+            a_canon = ac2.text_input("대표 이름 (예: TOC analyzer)", key="alias_to")
+            if ac3.button("➕ 별칭 등록", use_container_width=True):
+                if a_alias and a_canon and db.upsert_entity_aliases({a_alias: a_canon}):
+                    st.success(f"'{a_alias}' ➡️ '{a_canon}' 등록 (아래 정리 실행 시 기존 관계에도 반영)")
+                else:
+                    st.warning("별칭과 대표 이름을 입력해주세요.")
+
+            if st.button("🧹 그래프 정리 실행", use_container_width=True):
+                with st.status("노드 병합 및 중복 관계 정리 중...", expanded=True) as status:
+                    try:
+                        stats = compact_graph(db, on_progress=status.write)
+                        st.success(f"노드 {stats['nodes_before']} → {stats['nodes_after']}개, "
+                                   f"관계 {stats['merged_edges']}개 병합 · {stats['renamed']}개 갱신")
+                    except Exception as e:
+                        st.error(f"정리 실패: {e}")
+
         st.markdown("---")
 
         # [B] 개별 검색 및 수정 구역
@@ -250,97 +272,144 @@ def show_admin_ui(ai_model, db):
             else:
                 st.warning("검색된 관계가 없습니다.")
 
-# [V205 -> V238] 스마트 업로드 함수 (Graph 기능 통합)
+# [V205 -> V238 -> V254] 스마트 업로드 함수 (학습은 ingest_pipeline 엔진이 백그라운드로 수행)
 def show_manual_upload_ui(ai_model, db):
     st.subheader("📂 PDF 매뉴얼 업로드 & 지식 그래프 구축")
     
     col_u1, col_u2 = st.columns([3, 1])
     up_f = col_u1.file_uploader("PDF 파일 선택", type=["pdf"])
-    use_ocr = col_u2.checkbox("강제 OCR 사용", value=False, help="글자가 드래그되지 않는 '통이미지' 파일일 때만 켜세요.")
+    use_ocr = col_u2.checkbox("강제 OCR 사용", value=False, help="텍스트가 없거나 깨진 페이지는 자동으로 OCR 합니다. 모든 페이지를 OCR 하려면 켜세요.")
     
     c1, c2 = st.columns(2)
     btn_vector = c1.button("🚀 기본 학습 (Vector RAG)", use_container_width=True, type="primary")
     btn_graph = c2.button("🕸️ 지식 그래프 생성 (Graph RAG)", use_container_width=True)
     
     if up_f and (btn_vector or btn_graph):
-        with st.status("데이터 정밀 분석 중...", expanded=True) as status:
-            try:
-                raw_text = ""
-                if use_ocr and OCR_AVAILABLE:
-                    status.write("📷 OCR 엔진 강제 구동 (이미지 스캔 중)...")
-                    images = convert_from_bytes(up_f.read())
-                    total_pages = len(images)
-                    prog = st.progress(0)
-                    for idx, img in enumerate(images):
-                        raw_text += pytesseract.image_to_string(img, lang='kor+eng') + "\n"
-                        prog.progress((idx+1)/total_pages)
-                else:
-                    status.write("📖 고정밀 텍스트 추출 중 (pdfplumber)...")
-                    with pdfplumber.open(up_f) as pdf:
-                        pages = pdf.pages
-                        total_pages = len(pages)
-                        prog = st.progress(0)
-                        for idx, page in enumerate(pages):
-                            page_text = page.extract_text()
-                            if page_text: raw_text += page_text + "\n"
-                            else: status.write(f"⚠️ {idx+1}페이지 텍스트 없음")
-                            prog.progress((idx+1)/total_pages)
-
-                if len(raw_text.strip()) < 100:
-                    st.error("❌ 텍스트 추출 실패")
-                    st.stop()
-
-                status.write("✂️ 문맥 단위 분할 중...")
-                chunks = semantic_split_v143(raw_text)
-                total = len(chunks)
-                progress_bar = st.progress(0)
-
-                if btn_vector:
-                    for i, chunk in enumerate(chunks):
-                        status.write(f"🧠 [Vector] 지식 생성 중 ({i+1}/{total})...")
-                        meta = extract_metadata_ai(ai_model, chunk)
-                        if isinstance(meta, list): meta = meta[0] if meta else {}
-                        if not isinstance(meta, dict): meta = {}
-
-                        db.supabase.table("manual_base").insert({
-                            "domain": "기술지식", 
-                            "content": clean_text_for_db(chunk), 
-                            "file_name": up_f.name, 
-                            "manufacturer": db._clean_text(meta.get('manufacturer')), 
-                            "model_name": db._clean_text(meta.get('model_name')), 
-                            "measurement_item": db._normalize_tags(meta.get('measurement_item')), 
-                            "embedding": get_embedding(chunk), 
-                            "semantic_version": 2
-                        }).execute()
-                        progress_bar.progress((i + 1) / total)
-                    st.success(f"✅ [Vector] 총 {total}개의 지식 블록이 생성되었습니다.")
-
-                elif btn_graph:
-                    status.write("🕸️ [Graph] 관계 데이터 추출 시작 (시간이 걸릴 수 있습니다)...")
-                    graph_count = 0
-                    for i, chunk in enumerate(chunks):
-                        res = db.supabase.table("manual_base").insert({
-                            "domain": "기술지식_GraphSource", 
-                            "content": clean_text_for_db(chunk),
-                            "file_name": up_f.name,
-                            "semantic_version": 2
-                        }).select("id").execute()
-                        
-                        if res.data:
-                            doc_id = res.data[0]['id']
-                            triples = extract_triples_from_text(ai_model, chunk)
-                            if triples:
-                                if db.save_knowledge_triples(doc_id, triples):
-                                    graph_count += len(triples)
-                                    status.write(f"🔗 {len(triples)}개의 관계 발견! -> DB 저장 완료")
-                        progress_bar.progress((i + 1) / total)
-                    st.success(f"✅ [Graph] 총 {graph_count}개의 인과관계 데이터(Triple)가 구축되었습니다!")
-
-                time.sleep(1)
-                st.rerun()
-                
-            except Exception as e:
-                st.error(f"오류 발생: {str(e)}")
+        engine = IngestionEngine(ai_model, db)
+        try:
+            job = engine.create_job(up_f.name, "vector" if btn_vector else "graph", use_ocr and OCR_AVAILABLE)
+            engine.start_background(job['id'], up_f.getvalue())
+            st.success(f"📥 작업 #{job['id']} 시작! 화면을 닫아도 서버에서 계속 진행됩니다.")
+        except IngestError as e:
+            st.error(f"오류 발생: {str(e)}")
+
+    show_ingest_jobs(ai_model, db, up_f)
+
+def _is_job_alive(job):
+    """이 프로세스에서 실행 중이거나, 다른 서버(API 등)에서 최근까지 갱신 중인 작업인지"""
+    if any(t.name == f"ingest-{job['id']}" and t.is_alive() for t in threading.enumerate()):
+        return True
+    if job['status'] != "running": return False
+    try:
+        updated = datetime.fromisoformat(str(job.get('updated_at')))
+        return datetime.now(timezone.utc) - updated < timedelta(seconds=JOB_STALE_SEC)
+    except ValueError:
+        return False
+
+def show_ingest_jobs(ai_model, db, up_f=None, kind="manual"):
+    """[V254] 최근 학습 작업 진행률 / 재개 ([V261] kind='reembed' 는 재임베딩 작업)"""
+    st.markdown("#### 📋 최근 학습 작업" if kind == "manual" else "#### 📋 최근 재임베딩 작업")
+    jobs = db.list_ingest_jobs(kind=kind, limit=10 if kind == "manual" else 3)
+    if not jobs:
+        st.caption("작업 이력이 없습니다.")
+        return
+
+    engine_cls = ReembedEngine if kind == "reembed" else IngestionEngine
+    c_r1, c_r2 = st.columns([1, 3])
+    if c_r1.button("🔄 새로고침", key=f"{kind}_jobs_refresh"): st.rerun()
+    auto_refresh = c_r2.checkbox("진행 중 작업 자동 새로고침", value=True, key=f"{kind}_jobs_auto_refresh")
+
+    icons = {"pending": "⏳", "running": "🔄", "failed": "❌", "done": "✅"}
+    any_running = False
+    for job in jobs:
+        alive = _is_job_alive(job)
+        any_running = any_running or alive
+        with st.container(border=True):
+            st.markdown(f"{icons.get(job['status'], '•')} **#{job['id']} {job.get('file_name') or '-'}** "
+                        f"({job.get('mode')}) · 단계: `{job.get('stage')}` · {job.get('message') or ''}")
+            st.progress(min(float(job.get('progress') or 0), 1.0))
+
+            # 실패했거나, 실행 중으로 남아 있지만 이 서버에서 돌고 있지 않은 작업은 재개 가능
+            if job['status'] in ("failed", "running", "pending") and not alive:
+                needs_file = kind == "manual" and job.get('stage') == "extract"
+                if needs_file and not (up_f and up_f.name == job.get('file_name')):
+                    st.caption("↪️ 재개하려면 같은 PDF 파일을 위에서 다시 선택하세요.")
+                elif st.button("▶️ 이어서 진행", key=f"resume_{job['id']}"):
+                    engine = engine_cls(ai_model, db)
+                    if engine.claim(job['id']):
+                        engine.start_background(job['id'], up_f.getvalue() if needs_file else None)
+                        st.rerun()
+                    else:
+                        st.warning("이미 다른 곳(API 등)에서 실행 중인 작업입니다.")
+
+    if any_running and auto_refresh:
+        time.sleep(2)
+        st.rerun()
+
+def show_embedding_migration_ui(db):
+    """[V262] 임베딩 프로필 섀도 기록 → 검증(dual-read) → 전환"""
+    with st.expander("🧪 임베딩 모델 교체 (섀도 컬럼 → 검증 → 전환)"):
+        status = profile_status(db)
+        st.markdown(f"검색 프로필: **{status['active']}** · 섀도(동시 기록): **{status['shadow'] or '없음'}**")
+        st.dataframe([
+            {"프로필": name, "버전": p["version"], "컬럼": p["column"],
+             **{t: f"{c['filled']}/{c['total']} ({c['ratio']:.0%})" for t, c in p["coverage"].items()}}
+            for name, p in status["profiles"].items()
+        ], use_container_width=True, hide_index=True)
+
+        others = [n for n in EMBEDDING_PROFILES if n != status["active"]]
+        if not others: return
+        cand = st.selectbox("후보 프로필", others, key="emb_mig_candidate")
+
+        c_s1, c_s2 = st.columns(2)
+        if c_s1.button("✍️ 새 데이터에 후보도 기록", use_container_width=True):
+            ok, msg = set_shadow(db, cand)
+            (st.success if ok else st.error)(msg)
+        if c_s2.button("⏹️ 섀도 기록 해제", use_container_width=True):
+            ok, msg = set_shadow(db, None)
+            (st.success if ok else st.error)(msg)
+
+        queries = st.text_area("검증 질문 (한 줄에 하나)", key="emb_mig_queries", height=120)
+        if st.button("🔍 dual-read 검증", use_container_width=True):
+            q_list = [q.strip() for q in queries.splitlines() if q.strip()]
+            if not q_list: st.warning("검증할 질문을 입력하세요.")
+            else:
+                with st.spinner("두 프로필로 동시 검색 중..."):
+                    status["last_validation"] = validate(db, q_list, cand)
+        if status.get("last_validation"):
+            st.json(status["last_validation"], expanded=False)
+
+        force = st.checkbox("채움 비율 검사 무시", key="emb_mig_force")
+        if st.button(f"🔀 검색 프로필을 {cand} 로 전환", type="primary", use_container_width=True):
+            ok, msg = switch_profile(db, cand, force)
+            (st.success if ok else st.error)(msg)
+
+def show_promotion_queue_ui(db):
+    """[V271] 커뮤니티 답변 → 지식 승격 대기열 현황 (대기/실패 확인 + 재시도)"""
+    st.markdown("#### 📮 답변 → 지식 승격 대기열")
+    try:
+        status = db.get_promotion_status()
+    except Exception as e:
+        st.info(f"대기열을 조회할 수 없습니다. (sql/knowledge_promotions.sql 적용 여부 확인) {e}")
+        return
+    counts = status["counts"]
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("대기", counts.get("pending") or 0)
+    c2.metric("처리 중", counts.get("running") or 0)
+    c3.metric("완료", counts.get("done") or 0)
+    c4.metric("실패", counts.get("failed") or 0)
+    if status["items"]:
+        st.dataframe([
+            {"ID": r["id"], "글:답변": r["idem_key"], "상태": r["status"], "시도": r["attempts"],
+             "다음 시도": str(r.get("next_attempt_at") or "")[:16].replace("T", " "), "오류": r.get("last_error") or ""}
+            for r in status["items"]
+        ], use_container_width=True, hide_index=True)
+    b1, b2 = st.columns(2)
+    if b1.button("▶️ 지금 처리", key="promo_run", use_container_width=True):
+        kick_promotion(db); st.toast("승격 워커 시작")
+    if counts.get("failed") and b2.button("🔁 실패 건 재시도", key="promo_retry", use_container_width=True):
+        n = db.retry_knowledge_promotions()
+        kick_promotion(db); st.success(f"{n}건 재시도 대상으로 변경"); time.sleep(0.5); st.rerun()
 
 def show_knowledge_reg_ui(ai_model, db):
     st.subheader("📝 지식 직접 등록")
@@ -1,5 +1,32 @@
 import streamlit as st
 import time
+from knowledge_promotion import kick as kick_promotion
+
+SIMILAR_MIN_CHARS = 10
+
+
+def show_similar_questions(db, title, content):
+    """[V272] 작성 중인 질문과 비슷한 기존 질문 / 해결 지식 (같은 글이면 다시 조회하지 않음)"""
+    query = f"{title}\n{content}".strip()
+    if len(query) < SIMILAR_MIN_CHARS: return
+    cache = st.session_state.get("similar_q_cache")
+    if not cache or cache[0] != query:
+        try: cache = (query, db.find_similar_questions(query))
+        except Exception as e:
+            print(f"유사 질문 검색 실패: {e}")
+            return
+        st.session_state.similar_q_cache = cache
+    found = cache[1]
+    if not found["posts"] and not found["knowledge"]: return
+
+    st.info("💡 비슷한 문제가 이미 있습니다. 등록 전에 확인해 보세요.")
+    for k in found["knowledge"][:3]:
+        with st.expander(f"✅ [해결 지식] {k.get('issue', '')} ({k.get('similarity', 0):.0%})"):
+            st.write(k.get('solution', ''))
+            st.caption(f"제조사: {k.get('manufacturer') or '미지정'} | 모델: {k.get('model_name') or '-'}")
+    for p in found["posts"][:3]:
+        st.markdown(f"- 💬 **{p.get('title', '')}** (답변 {p.get('comment_count', 0)}개 · 유사도 {p.get('similarity', 0):.0%})")
+
 
 def show_community_ui(ai_model, db):
     # ----------------------------------------------------------------------
@@ -41,12 +68,15 @@ def show_community_ui(ai_model, db):
         is_edit = st.session_state.community_mode == "edit"
         post_data = st.session_state.get("editing_post", {})
         
+        st.markdown(f"### 📝 {'질문 수정' if is_edit else '새로운 질문 등록'}")
+        # [V272] 제목/내용은 폼 밖 → 입력을 마칠 때마다 비슷한 기존 질문/지식을 바로 보여줌
+        key_sfx = post_data.get("id", "new") if is_edit else "new"
+        title = st.text_input("질문 제목 (필수)", value=post_data.get("title", ""), key=f"post_title_{key_sfx}")
+        content = st.text_area("고장 현상 및 내용 (필수)", value=post_data.get("content", ""), height=150, key=f"post_content_{key_sfx}")
+        if not is_edit: show_similar_questions(db, title, content)
+        
         with st.form("post_form_v168"):
-            st.markdown(f"### 📝 {'질문 수정' if is_edit else '새로운 질문 등록'}")
-            
             author = st.text_input("작성자 (필수)", value=post_data.get("author", ""), disabled=is_edit, placeholder="닉네임을 입력하세요")
-            title = st.text_input("질문 제목 (필수)", value=post_data.get("title", ""))
-            content = st.text_area("고장 현상 및 내용 (필수)", value=post_data.get("content", ""), height=150)
             
             st.markdown("---")
             st.markdown("🏷️ **장비 라벨링 정보 (필수)**")
@@ -63,6 +93,7 @@ def show_community_ui(ai_model, db):
                     
                     if success:
                         st.success("반영 완료!")
+                        for k in (f"post_title_{key_sfx}", f"post_content_{key_sfx}"): st.session_state.pop(k, None)
                         time.sleep(0.5)
                         st.session_state.community_mode = "list"
                         st.rerun()
@@ -77,12 +108,25 @@ def show_community_ui(ai_model, db):
     # [UI] 게시글 목록 모드
     # ----------------------------------------------------------------------
     else:
-        posts = db.get_community_posts()
+        # [V270] 전체 글 + 글마다 댓글 조회 대신, 보이는 페이지만 (댓글 수는 같은 요청으로)
+        posts, cursor = [], None
+        try:
+            for _ in range(st.session_state.get("community_pages", 1)):
+                page, cursor = db.get_community_feed(limit=20, before_id=cursor)
+                posts.extend(page)
+                if cursor is None: break
+        except Exception as e:
+            st.error(f"게시글 조회 실패: {e}")
+
+        # 댓글은 '답변 보기' 를 누른 글만, 보이는 글 전체를 요청 1회로
+        opened = st.session_state.setdefault("community_open_comments", set())
+        comments_by_post = db.get_comments_for_posts([p['id'] for p in posts if p['id'] in opened])
+
         if not posts: st.warning("등록된 질문이 없습니다.")
         else:
             for p in posts:
                 label_tag = f"[{p.get('measurement_item') or '-'}] {p.get('model_name') or '공통'}"
-                with st.expander(f"📌 {label_tag} {p['title']} (작성자: {p.get('author', '익명')})"):
+                with st.expander(f"📌 {label_tag} {p['title']} (작성자: {p.get('author', '익명')}) 💬{p.get('comment_count', 0)}"):
                     st.write(p['content'])
                     st.caption(f"제조사: {p.get('manufacturer') or '미지정'} | 작성일: {str(p.get('created_at', ''))[:10]}")
                     
@@ -93,13 +137,16 @@ def show_community_ui(ai_model, db):
                         if db.delete_community_post(p['id']): st.warning("삭제됨"); time.sleep(0.5); st.rerun()
                     
                     st.divider()
-                    comments = db.get_comments(p['id'])
-                    if comments:
-                        st.markdown("#### 💬 현장 대원 답변 (AI 지식 자동 동기화)")
-                        for c in comments:
-                            st.markdown(f"""<div class="comment-box">
-                                <strong>{c['author']} 대원:</strong><br>{c['content']}
-                            </div>""", unsafe_allow_html=True)
+                    if p.get('comment_count'):
+                        if p['id'] not in opened:
+                            if st.button(f"💬 답변 {p['comment_count']}개 보기", key=f"oc_{p['id']}"):
+                                opened.add(p['id']); st.rerun()
+                        else:
+                            st.markdown("#### 💬 현장 대원 답변 (AI 지식 자동 동기화)")
+                            for c in comments_by_post.get(p['id'], []):
+                                st.markdown(f"""<div class="comment-box">
+                                    <strong>{c['author']} 대원:</strong><br>{c['content']}
+                                </div>""", unsafe_allow_html=True)
 
                     # [UI 개선] 답변 작성 폼 (가독성 및 필수 입력 강조)
                     st.markdown("#### 💡 답변 남기기")
@@ -111,20 +158,17 @@ def show_community_ui(ai_model, db):
                         if st.form_submit_button("🚀 답변 등록 (AI 지식으로 자동 저장)"):
                             # [유효성 검사] 이름 필수
                             if c_author.strip() and c_content.strip():
-                                if db.add_comment(p['id'], c_author, c_content):
-                                    # [핵심 수정] c_author(작성자)를 마지막 인자로 반드시 전달!
-                                    success, msg = db.promote_to_knowledge(
-                                        p['title'], 
-                                        c_content, 
-                                        p.get('manufacturer','미지정'), 
-                                        p.get('model_name','미지정'), 
-                                        p.get('measurement_item','공통'),
-                                        c_author # <--- [여기!] 입력한 이름 전달
-                                    )
-                                    if success:
-                                        st.success(f"🎉 {c_author}님의 답변이 등록되고, AI 지식베이스에 추가되었습니다!")
-                                        time.sleep(1.5)
-                                        st.rerun()
-                                    else: st.error(f"지식 동기화 실패: {msg}")
+                                # [V271] 답변만 저장하고 지식 승격(임베딩 + 저장)은 대기열 워커가 처리
+                                if db.add_comment(p['id'], c_author, c_content, promote=True):
+                                    kick_promotion(db)
+                                    opened.add(p['id'])
+                                    st.success(f"🎉 {c_author}님의 답변이 등록되었습니다! (AI 지식베이스에는 잠시 후 자동 반영)")
+                                    time.sleep(1.0)
+                                    st.rerun()
+                                else: st.error("답변 저장 실패")
                             else:
                                 st.error("⚠️ [답변자 닉네임]과 [내용]을 모두 입력해야 등록됩니다!")
+
+            if cursor is not None and st.button("⬇️ 이전 질문 더 보기", key="more_posts"):
+                st.session_state.community_pages = st.session_state.get("community_pages", 1) + 1
+                st.rerun()
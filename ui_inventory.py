@@ -1,6 +1,7 @@
 import streamlit as st
 import time
 import pandas as pd
+from inventory_analytics import inventory_forecast, LEAD_TIME_DAYS, STATUS_OUT, STATUS_REORDER
 
 def show_inventory_ui(db):
     """
@@ -13,12 +14,14 @@ def show_inventory_ui(db):
     # 상단 메뉴 구성
     tab1, tab2, tab3, tab4 = st.tabs(["📊 재고 현황판", "⚡ 입/출고(현장용)", "⚙️ 품목 등록/관리", "📜 이력 조회"])
 
+    # [V269] 품목 목록은 rerun 당 1회만 조회해 현황판/입출고 탭이 함께 사용
+    items = db.get_inventory_items()
+
     # ------------------------------------------------------------------
     # [Tab 1] 재고 현황판
     # ------------------------------------------------------------------
     with tab1:
         st.markdown("### 🚦 실시간 재고 목록")
-        items = db.get_inventory_items()
         
         if not items:
             st.info("등록된 품목이 없습니다. [⚙️ 품목 등록/관리] 탭에서 품목을 등록해주세요.")
@@ -57,19 +60,45 @@ def show_inventory_ui(db):
             else:
                 st.info("해당 카테고리의 품목이 없습니다.")
 
+            # [V268] 소모 속도 기반 소진 예측 (일별 집계는 새 로그만 증분 반영)
+            st.divider()
+            st.markdown("### 📈 소진 예측 / 재주문 알림")
+            lead_days = st.number_input("조달 기간 (일)", min_value=1, max_value=120, value=LEAD_TIME_DAYS,
+                                        help="주문 후 입고까지 걸리는 기간. 재주문점 = 일평균 소모 × 조달 기간 + 안전재고")
+            try:
+                fc = inventory_forecast(db, lead_time_days=lead_days, items=items)
+            except Exception as e:
+                fc = None
+                st.warning(f"예측을 계산할 수 없습니다. (sql/inventory_usage.sql 적용 여부 확인) {e}")
+            if fc is not None and not fc.empty:
+                if selected_cat != "전체": fc = fc[fc['category'] == selected_cat]
+                alerts = fc[fc['status'].isin([STATUS_OUT, STATUS_REORDER])]
+                if not alerts.empty:
+                    st.error(f"🚨 품절/재주문 필요 {len(alerts)}건: " + ", ".join(alerts['item_name'].head(10)))
+                fc_show = fc[['status', 'item_name', 'model_name', 'current_qty', 'daily_rate', 'days_left',
+                              'stockout_date', 'reorder_point', 'reorder_qty']].copy()
+                fc_show.columns = ['상태', '품명', '측정기기 모델', '현재 수량', '일평균 소모', '남은 일수',
+                                   '소진 예상일', '재주문점', '권장 주문량']
+                st.dataframe(fc_show, use_container_width=True, hide_index=True)
+
     # ------------------------------------------------------------------
     # [Tab 2] 간편 입/출고
     # ------------------------------------------------------------------
     with tab2:
         st.markdown("### ⚡ 현장 입/출고 처리")
-        items = db.get_inventory_items()
         if not items:
             st.warning("품목을 먼저 등록해주세요.")
         else:
             search_txt = st.text_input("🔍 품명 또는 모델명 검색", placeholder="예: 시약, TOC-L...")
             target_items = items
             if search_txt:
-                target_items = [i for i in items if search_txt.lower() in i['item_name'].lower() or search_txt.lower() in (i['model_name'] or "").lower()]
+                # [V265] 오타 허용 인덱스 검색 (관련도 순), 한 글자 검색은 기존 부분 일치
+                ranked = db.get_inventory_index().search(search_txt, limit=None)
+                if ranked or len(search_txt.strip()) >= 2:
+                    by_id = {i['id']: i for i in items}
+                    target_items = [by_id[item['id']] for item, _, _ in ranked if item['id'] in by_id]
+                else:
+                    target_items = [i for i in items if search_txt.lower() in i['item_name'].lower() or search_txt.lower() in (i['model_name'] or "").lower()]
             
             if not target_items: st.warning("검색 결과가 없습니다.")
             
@@ -96,17 +125,23 @@ def show_inventory_ui(db):
                     if b1.button("📥 입고 (+)", key=f"in_{item['id']}", use_container_width=True):
                         if not worker: st.error("작업자 이름을 입력하세요.")
                         else:
-                            if db.log_inventory_change(item['id'], "입고", qty, worker, reason):
-                                st.success(f"{qty}개 입고 완료!"); time.sleep(0.5); st.rerun()
-                            else: st.error("처리 실패")
+                            # [V267] 수량 반영 + 이력 기록을 서버에서 한 번에 (동시 작업자 간 유실 방지)
+                            ok, res = db.apply_stock_movements([{"item_id": item['id'], "change_type": "입고", "quantity": qty,
+                                                                 "worker_name": worker, "reason": reason}])
+                            if ok:
+                                st.success(f"{qty}개 입고 완료! (현재 {res[0]['after']}개)"); time.sleep(0.5); st.rerun()
+                            else: st.error(f"처리 실패: {db.stock_movement_error(res)}")
                     
                     if b2.button("📤 출고 (-)", key=f"out_{item['id']}", use_container_width=True):
                         if not worker: st.error("작업자 이름을 입력하세요.")
-                        elif item['current_qty'] < qty: st.error(f"재고가 부족합니다! (현재 {item['current_qty']}개)")
                         else:
-                            if db.log_inventory_change(item['id'], "출고", qty, worker, reason):
-                                st.success(f"{qty}개 출고 완료!"); time.sleep(0.5); st.rerun()
-                            else: st.error("처리 실패")
+                            # 재고 부족 여부는 화면의 수량이 아니라 서버에서 잠근 최신 수량으로 판정
+                            ok, res = db.apply_stock_movements([{"item_id": item['id'], "change_type": "출고", "quantity": qty,
+                                                                 "worker_name": worker, "reason": reason}])
+                            if ok:
+                                st.success(f"{qty}개 출고 완료! (현재 {res[0]['after']}개)"); time.sleep(0.5); st.rerun()
+                            elif res.get("error") == "재고 부족": st.error(f"재고가 부족합니다! (현재 {res.get('current_qty')}개)")
+                            else: st.error(f"처리 실패: {db.stock_movement_error(res)}")
 
     # ------------------------------------------------------------------
     # [Tab 3] 품목 등록 및 관리
@@ -204,47 +239,23 @@ def show_inventory_ui(db):
                         if st.button("🚀 일괄 등록 및 갱신 시작"):
                             if not batch_worker: st.error("등록자 이름을 입력해주세요.")
                             else:
-                                success_count = 0
-                                update_count = 0
-                                fail_count = 0
+                                # [V266] 기존 품목 1회 조회 + 배치 등록/갱신 (행별 왕복 제거)
                                 progress_bar = st.progress(0)
-                                total_rows = len(df_upload)
-                                
-                                for idx, row in df_upload.iterrows():
-                                    cat = row.get('category', '기타 소모품') if not pd.isna(row.get('category')) else '기타 소모품'
-                                    name = str(row.get('item_name')).strip()
-                                    if not name or name == 'nan': continue 
-                                    
-                                    # [매핑 확인]
-                                    # model_name 컬럼 값 -> 기기모델
-                                    # description 컬럼 값 -> 규격
-                                    model = str(row.get('model_name', '')).strip() if not pd.isna(row.get('model_name')) else ''
-                                    desc = str(row.get('description', '')).strip() if not pd.isna(row.get('description')) else ''
-                                    
-                                    loc = str(row.get('location', '')).strip() if not pd.isna(row.get('location')) else ''
-                                    mfr = str(row.get('manufacturer', '')).strip() if not pd.isna(row.get('manufacturer')) else ''
-                                    measure_val = str(row.get('measurement_item', '공통')).strip() if not pd.isna(row.get('measurement_item')) else '공통'
-                                    qty = int(row.get('qty', 0)) if not pd.isna(row.get('qty')) else 0
-                                    
-                                    # 중복 체크 기준: 품명 + 기기모델(model)
-                                    existing_item = db.check_item_exists(name, model)
-                                    
-                                    if existing_item:
-                                        res, _ = db.update_inventory_qty(existing_item['id'], qty, batch_worker)
-                                        if res: update_count += 1
-                                        else: fail_count += 1
-                                    else:
-                                        # DB 함수 인자 순서: ..., model, ..., desc, ...
-                                        res = db.add_inventory_item(cat, name, model, loc, mfr, measure_val, desc, qty, batch_worker)
-                                        if isinstance(res, tuple) and res[0]: success_count += 1
-                                        elif isinstance(res, bool) and res: success_count += 1
-                                        else: fail_count += 1
-                                    
-                                    progress_bar.progress((idx + 1) / total_rows)
+                                report = db.bulk_import_inventory(
+                                    df_upload, batch_worker,
+                                    on_progress=lambda done, total: progress_bar.progress(done / total))
+                                progress_bar.progress(1.0)
                                 
-                                st.success(f"✅ 완료! (신규: {success_count}건, 갱신: {update_count}건, 실패: {fail_count}건)")
-                                time.sleep(2)
-                                st.rerun()
+                                counts = report["status"].value_counts()
+                                st.success(f"✅ 완료! (신규: {counts.get('신규', 0)}건, 갱신: {counts.get('갱신', 0)}건, "
+                                           f"변경 없음: {counts.get('변경 없음', 0)}건, 건너뜀: {counts.get('건너뜀', 0)}건, 실패: {counts.get('실패', 0)}건)")
+                                problems = report[report["status"].isin(["건너뜀", "실패"]) | (report["message"] != "")]
+                                if problems.empty:
+                                    time.sleep(2)
+                                    st.rerun()
+                                else:
+                                    st.warning("⚠️ 확인이 필요한 행이 있습니다.")
+                                    st.dataframe(problems, use_container_width=True, hide_index=True)
 
                 except Exception as e:
                     st.error(f"파일 처리 중 에러 발생: {e}")
@@ -255,12 +266,21 @@ def show_inventory_ui(db):
     with tab4:
         st.markdown("### 📜 입/출고 전체 이력")
         if st.button("🔄 새로고침", key="refresh_logs"):
+            st.session_state.inv_log_pages = 1
             st.rerun()
             
-        logs = db.get_inventory_logs()
+        # [V269] 50건 고정 대신 키셋 페이지로 '더 보기'
+        logs, cursor = [], None
+        try:
+            for _ in range(st.session_state.get("inv_log_pages", 1)):
+                page, cursor = db.list_inventory_logs(before_id=cursor, limit=50)
+                logs.extend(page)
+                if cursor is None: break
+        except Exception as e:
+            st.error(f"이력 조회 실패: {e}")
         if logs:
             for log in logs:
-                item_name = log['inventory_items']['item_name'] if log.get('inventory_items') else "삭제된 품목"
+                item_name = log.get('item_name') or "삭제된 품목"
                 icon = "📥" if log['change_type'] == "입고" else "📤" if log['change_type'] == "출고" else "🔄"
                 color = "blue" if log['change_type'] == "입고" else "red" if log['change_type'] == "출고" else "green"
                 
@@ -272,5 +292,8 @@ def show_inventory_ui(db):
                     by <strong>{log['worker_name']}</strong> <span style="color:gray;">- {log.get('reason') or ''}</span>
                 </div>
                 """, unsafe_allow_html=True)
+            if cursor is not None and st.button("⬇️ 더 보기", key="more_logs"):
+                st.session_state.inv_log_pages = st.session_state.get("inv_log_pages", 1) + 1
+                st.rerun()
         else:
             st.info("아직 기록된 이력이 없습니다.")
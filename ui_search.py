@@ -3,6 +3,7 @@ import time
 import json
 import re
 from logic_ai import *
+from logic_ai import _apply_rerank_scores
 from utils_search import perform_unified_search
 
 # =========================================================================
@@ -72,6 +73,7 @@ def show_search_ui(ai_model, db):
             st.session_state.last_query = user_q
             if "full_report" in st.session_state: del st.session_state.full_report
             if "streamed_summary" in st.session_state: del st.session_state.streamed_summary
+            if "streamed_scores" in st.session_state: del st.session_state.streamed_scores
 
         # =========================================================
         # [CASE 1] 소모품 재고 검색 모드
@@ -107,15 +109,19 @@ def show_search_ui(ai_model, db):
                 summary_placeholder = st.empty()
                 
                 if "streamed_summary" in st.session_state:
+                      # rerank_summary 모드: 스트림에서 받은 채점을 재실행 때도 그대로 적용 (순서/연관도 유지)
+                      if st.session_state.get("streamed_scores"): _apply_rerank_scores(final, st.session_state.streamed_scores)
                       summary_placeholder.markdown(f'<div class="summary-box">{st.session_state.streamed_summary.replace("\\n", "<br>")}</div>', unsafe_allow_html=True)
                 else:
                     try:
-                        stream_gen = generate_3line_summary_stream(ai_model, user_q, final)
+                        stream_gen = stream_answer(ai_model, user_q, final)
                         full_text = ""
                         for chunk in stream_gen:
                             full_text += chunk
                             summary_placeholder.markdown(f'<div class="summary-box">{full_text.replace("\\n", "<br>")}</div>', unsafe_allow_html=True)
                         st.session_state.streamed_summary = full_text
+                        if get_pipeline_mode() == "rerank_summary":
+                            st.session_state.streamed_scores = [{"id": d['id'], "score": d.get('rerank_score', 0)} for d in final]
                     except Exception as e:
                         summary_placeholder.error(f"요약 중 오류: {str(e)}")
 
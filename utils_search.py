@@ -130,17 +130,29 @@ def filter_candidates_logic(candidates, intent, penalties, strict_mode=True):
         
     return sorted(filtered, key=lambda x: x['final_score'], reverse=True)[:8]
 
-def perform_unified_search(ai_model, db, user_q, u_threshold):
+def perform_unified_search(ai_model, db, user_q, u_threshold, mode=None):
     """
     [V248] 4단 하이브리드 검색 (Graph + Vector + Metadata + Keyword)
     - 그래프에서 발견된 지식의 '원본 문서'를 강제 소환하여 결과에 포함 (Missing Link 해결)
+    [V251] mode (classic / intent_rerank / rerank_summary) 에 따라 LLM 호출을 합칩니다.
+    - intent_rerank  : 의도 분석 없이 검색한 뒤, 의도+채점을 1회로 처리
+    - rerank_summary : 채점을 생략하고 stream_answer()에서 채점+요약을 1회로 처리
     """
+    mode = mode or get_pipeline_mode()
+    # [V262] 질의 벡터와 검색 RPC 는 항상 같은 프로필 (전환 중에도 질의 하나 안에서는 섞이지 않음)
+    profile = embedding_profile(db.get_active_embedding_profile())
+    rpc_manual, rpc_knowledge = f"match_manual{profile['rpc_suffix']}", f"match_knowledge{profile['rpc_suffix']}"
+
     # 1. 초기 진입 (병렬 처리)
     with ThreadPoolExecutor() as executor:
-        future_vec = executor.submit(get_embedding, user_q)
-        future_intent = executor.submit(analyze_search_intent, ai_model, user_q)
+        future_vec = executor.submit(get_embedding, user_q, profile["name"])
+        # 피드백(relevance_feedback) 벡터는 v1 고정 → 다른 프로필로 검색 중이면 따로 계산
+        future_fb_vec = None if profile["name"] == FEEDBACK_EMBEDDING_PROFILE else \
+            executor.submit(get_embedding, user_q, FEEDBACK_EMBEDDING_PROFILE)
+        future_intent = None if mode == "intent_rerank" else executor.submit(analyze_search_intent, ai_model, user_q)
         q_vec = future_vec.result()
-        intent = future_intent.result()
+        fb_vec = future_fb_vec.result() if future_fb_vec else q_vec
+        intent = future_intent.result() if future_intent else None
     
     if not intent or not isinstance(intent, dict):
         intent = {"target_mfr": "미지정", "target_model": "미지정", "target_item": "공통"}
@@ -150,7 +162,7 @@ def perform_unified_search(ai_model, db, user_q, u_threshold):
 
     # 2. 메타데이터 조회 (병렬)
     with ThreadPoolExecutor() as executor:
-        future_blacklist = executor.submit(db.get_semantic_context_blacklist, q_vec)
+        future_blacklist = executor.submit(db.get_semantic_context_blacklist, fb_vec)
         future_penalties = executor.submit(db.get_penalty_counts)
         context_blacklist = future_blacklist.result()
         penalties = future_penalties.result()
@@ -168,21 +180,23 @@ def perform_unified_search(ai_model, db, user_q, u_threshold):
 
     if keywords:
         graph_relations = []
-        for kw in set(keywords):
+        # [V264] 별칭으로 등록된 표기는 대표 노드 이름으로도 검색
+        for kw in set(keywords) | {db.canonical_entity(k) for k in keywords}:
             # db_services에 있는 그래프 검색 함수 호출
             rels = db.search_graph_relations(kw)
             if rels: graph_relations.extend(rels)
         
         # 중복 제거 및 원본 ID 추출
         if graph_relations:
-            unique_graphs = []
-            seen_graphs = set()
+            unique_graphs = {}
             for rel in graph_relations:
-                # 1. 그래프 노드 데이터 저장
+                # 1. 그래프 노드 데이터 저장 ([V264] 같은 관계는 문서/중복 수(weight)를 합산)
                 g_key = f"{rel['source']}_{rel['relation']}_{rel['target']}"
-                if g_key not in seen_graphs:
-                    seen_graphs.add(g_key)
-                    unique_graphs.append(rel)
+                if g_key not in unique_graphs:
+                    unique_graphs[g_key] = dict(rel, weight=0, _seen=set())
+                if rel.get('id') not in unique_graphs[g_key]['_seen']:
+                    unique_graphs[g_key]['_seen'].add(rel.get('id'))
+                    unique_graphs[g_key]['weight'] += rel.get('weight') or 1
                 
                 # 2. [V248 핵심] 원본 문서 ID 수집 (나중에 강제 소환)
                 if rel.get('doc_id'):
@@ -190,7 +204,8 @@ def perform_unified_search(ai_model, db, user_q, u_threshold):
                     if s_type == 'knowledge': graph_source_ids['knowledge'].add(rel['doc_id'])
                     else: graph_source_ids['manual'].add(rel['doc_id'])
             
-            # 그래프 데이터를 하나의 '가상 문서'로 압축
+            # 그래프 데이터를 하나의 '가상 문서'로 압축 (여러 문서에서 반복 확인된 관계 우선)
+            unique_graphs = sorted(unique_graphs.values(), key=lambda r: -r['weight'])
             if unique_graphs:
                 graph_text = "💡 [Graph DB 인과관계 분석결과]\n"
                 for rel in unique_graphs[:7]: # 너무 길어지지 않게 7개 제한
@@ -216,8 +231,8 @@ def perform_unified_search(ai_model, db, user_q, u_threshold):
     # [Step 1] 정밀 검색 (인덱스/필터 기반)
     # -----------------------------------------------------------
     with ThreadPoolExecutor() as executor:
-        future_m = executor.submit(db.match_filtered_db, "match_manual", q_vec, effective_threshold, intent, user_q, context_blacklist)
-        future_k = executor.submit(db.match_filtered_db, "match_knowledge", q_vec, effective_threshold, intent, user_q, context_blacklist)
+        future_m = executor.submit(db.match_filtered_db, rpc_manual, q_vec, effective_threshold, intent, user_q, context_blacklist)
+        future_k = executor.submit(db.match_filtered_db, rpc_knowledge, q_vec, effective_threshold, intent, user_q, context_blacklist)
         m_res = future_m.result()
         k_res = future_k.result()
 
@@ -260,8 +275,8 @@ def perform_unified_search(ai_model, db, user_q, u_threshold):
     if len(m_res) + len(k_res) < 3:
         relaxed_intent = {"target_mfr": "미지정", "target_model": "미지정", "target_item": "공통"}
         with ThreadPoolExecutor() as executor:
-            future_m_broad = executor.submit(db.match_filtered_db, "match_manual", q_vec, effective_threshold, relaxed_intent, user_q, context_blacklist)
-            future_k_broad = executor.submit(db.match_filtered_db, "match_knowledge", q_vec, effective_threshold, relaxed_intent, user_q, context_blacklist)
+            future_m_broad = executor.submit(db.match_filtered_db, rpc_manual, q_vec, effective_threshold, relaxed_intent, user_q, context_blacklist)
+            future_k_broad = executor.submit(db.match_filtered_db, rpc_knowledge, q_vec, effective_threshold, relaxed_intent, user_q, context_blacklist)
             m_res += future_m_broad.result()
             k_res += future_k_broad.result()
 
@@ -291,6 +306,15 @@ def perform_unified_search(ai_model, db, user_q, u_threshold):
             seen_uids.add(uid)
             all_docs.append(doc)
 
+    # [V251] 의도+채점 통합 모드: 느슨한 필터 상위 후보로 의도를 확정한 뒤 같은 점수를 재사용
+    fused_scores = None
+    if mode == "intent_rerank":
+        pre_candidates = filter_candidates_logic(all_docs, intent, penalties, strict_mode=False)
+        fused_intent, scored = analyze_intent_and_rerank_ai(ai_model, user_q, pre_candidates)
+        if fused_intent:
+            intent = {**intent, **fused_intent}
+            fused_scores = {d['u_key']: d.get('rerank_score', 0) for d in scored}
+
     # 5. 필터링 및 리랭킹
     raw_candidates = filter_candidates_logic(all_docs, intent, penalties, strict_mode=True)
 
@@ -311,6 +335,13 @@ def perform_unified_search(ai_model, db, user_q, u_threshold):
             raw_candidates = mfr_matched
 
     # 최종 순위 결정 (LLM Rerank)
-    final_results = quick_rerank_ai(ai_model, user_q, raw_candidates, intent)
-
-    return final_results, intent, q_vec
+    if mode == "rerank_summary":
+        # 채점은 답변 스트림(rerank_and_summary_stream)에서 함께 수행
+        final_results = raw_candidates
+    elif fused_scores is not None:
+        for d in raw_candidates: d['rerank_score'] = fused_scores.get(d['u_key'], 0)
+        final_results = sorted(raw_candidates, key=lambda x: x['rerank_score'], reverse=True)
+    else:
+        final_results = quick_rerank_ai(ai_model, user_q, raw_candidates, intent)
+
+    return final_results, intent, fb_vec